@@ -1,17 +1,33 @@
 # app.py – production-ready WSGI entrypoint
 import os
+import time
 import logging
-from flask import Flask, request, render_template, redirect, url_for, session, jsonify
+from flask import Flask, request, render_template, redirect, url_for, session, jsonify, g, Response, abort, send_file
 from flask_session import Session
 from werkzeug.middleware.proxy_fix import ProxyFix
 
-from stock_data.data_fetcher import DataFetcher
-from stock_data.plotter import Plotter
 from stock_data.demand_zone_manager import DemandZoneManager
 from stock_data.gpt_client import GPTClient
+from stock_data.metrics import metrics
+from stock_data.profiler import RequestProfiler, PROFILE_HEADER
+from stock_data.memory_probe import memory_probe, MemoryProbe
+from stock_data.logging_config import configure_logging
+from stock_data.session_store import SqliteSessionInterface, SESSION_DB_PATH
+from stock_data.zone_alerts import AlertEngine, LogSink, WebhookSink, SSESink
+from stock_data.zones_api import ZonesApi, ZonesApiError, ZONES_API_INTERVALS
+from stock_data.charts_api import ChartsApi
+from stock_data.period_cache import superset_cache
+from stock_data.static_assets import static_assets, ASSET_MAX_AGE
+from stock_data.compression import compress_response
+from stock_data.io_pool import io_pool
+from stock_data.compute_pool import ComputePoolBusy
+from stock_data.admission import admission, AdmissionController, AdmissionRejected
 from datetime import datetime
 import requests  # Added for Flowise API calls
 
+# Logging configuration – LOG_LEVEL (default INFO), handled off the request thread
+configure_logging()
+
 # ──── Load secrets from environment (must-have) ──────────────────────────────
 SECRET_KEY = os.environ.get('FLASK_SECRET_KEY')
 if not SECRET_KEY:
@@ -25,6 +41,24 @@ FLOWISE_API_URL = os.environ.get(
     'FLOWISE_API_URL',
     'http://localhost:3000/api/v1/prediction/5ddc4cb7-3544-4bce-8068-34e28f12529d'
 )
+# Seconds an LLM (OpenAI or Flowise) call may take before the user gets an error reply
+LLM_TIMEOUT = float(os.environ.get('LLM_TIMEOUT', '120'))
+
+# Optional bearer token required to scrape /metrics
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Key for signed X-Profile-Request headers (defaults to the Flask secret)
+PROFILE_SECRET = os.environ.get('PROFILE_SECRET', SECRET_KEY)
+
+# Bearer token a price feed must present to POST /alerts/prices (price push disabled when unset)
+ALERTS_TOKEN = os.environ.get('ALERTS_TOKEN')
+# Alert zones and SSE subscribers live in one process; gunicorn.conf.py turns this off
+# unless every request lands in a single (threaded) worker
+ALERTS_ENABLED = os.environ.get('ALERTS_ENABLED', 'True').lower() in ('true', '1')
+# Bearer token for /api/* clients without a browser session
+API_TOKEN = os.environ.get('API_TOKEN')
+# Seconds after a search during which the chart loads of its page are not admitted again
+ADMISSION_PAGE_GRANT = float(os.environ.get('ADMISSION_PAGE_GRANT', '300'))
 
 # ──── Flask app setup ───────────────────────────────────────────────────────
 app = Flask(__name__)
@@ -45,7 +79,9 @@ if app.config.get('ENV') == 'production':
     except ImportError:
         logging.warning("Flask-Talisman not installed; skipping security headers.")
 
-# Session configuration
+# Session configuration – 'sqlite' (default) keeps every session in one database
+# file with TTL eviction; 'filesystem' is the previous one-pickle-per-session store
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'sqlite').lower()
 app.config['SESSION_TYPE'] = 'filesystem'
 app.config['SESSION_FILE_DIR'] = './flask_session/'
 os.makedirs(app.config['SESSION_FILE_DIR'], exist_ok=True)
@@ -67,11 +103,13 @@ else:
         SESSION_COOKIE_SAMESITE=None,
     )
 # ────────────────────────────────────────────────────────────────────────
-Session(app)
+if SESSION_BACKEND == 'sqlite':
+    app.session_interface = SqliteSessionInterface(SESSION_DB_PATH)
+else:
+    Session(app)
 
-# Logging configuration – always DEBUG to console during development
-logging.basicConfig(level=logging.DEBUG, format='%(asctime)s %(levelname)s:%(message)s')
-app.logger.setLevel(logging.DEBUG)
+# Most recent chat entries kept in the session
+CHAT_HISTORY_MAX = int(os.environ.get('CHAT_HISTORY_MAX', '50'))
 
 # AI & Flowise flags
 HARDCODED_INTERVALS = ['3mo', '1mo', '1wk', '1d']
@@ -82,10 +120,10 @@ USE_FLOWISE = os.environ.get('USE_FLOWISE', 'False').lower() in ('true', '1')
 gpt_client = None
 if ENABLE_GPT:
     try:
-        gpt_client = GPTClient(api_key=OPENAI_API_KEY)
+        gpt_client = GPTClient(api_key=OPENAI_API_KEY, timeout=LLM_TIMEOUT)
         logging.debug("GPTClient initialized successfully.")
     except Exception as e:
-        logging.error(f"Failed to initialize GPTClient: {e}")
+        logging.error("Failed to initialize GPTClient: %s", e)
 
 # Stock codes list
 MULTI_STOCK_CODES = [
@@ -97,60 +135,173 @@ def call_flowise(query, zones):
     payload = {"question": f"{query}\n{zones_context}"}
 
     # Log the outgoing request
-    logging.debug(f"Calling Flowise URL: {FLOWISE_API_URL}")
-    logging.debug(f"Flowise request payload: {payload}")
+    logging.debug("Calling Flowise URL: %s", FLOWISE_API_URL)
+    logging.debug("Flowise request payload: %s", payload)
 
     try:
-        response = requests.post(FLOWISE_API_URL, json=payload)
+        response = requests.post(FLOWISE_API_URL, json=payload, timeout=LLM_TIMEOUT)
         response.raise_for_status()
         data = response.json()
-        logging.debug(f"Flowise raw response JSON: {data}")
+        logging.debug("Flowise raw response JSON: %s", data)
 
         # Try common fields in order
         for key in ('answer', 'text', 'prediction', 'data', 'result'):
             if key in data and data[key]:
-                logging.debug(f"Flowise using field `{key}` with value: {data[key]}")
+                logging.debug("Flowise using field `%s` with value: %s", key, data[key])
                 return data[key]
         # If nothing found, stringify entire response
         return str(data)
     except Exception as e:
-        logging.error(f"Error calling Flowise API: {e}")
+        logging.error("Error calling Flowise API: %s", e)
         return "Error calling Flowise API."
 
 def call_ai(query, zones):
     if USE_FLOWISE:
-        return call_flowise(query, zones)
+        with metrics.span('call_ai'):
+            return call_flowise(query, zones)
     if not (ENABLE_GPT and gpt_client):
         return "AI functionality is disabled."
     try:
-        return gpt_client.call_gpt(query, zones)
+        with metrics.span('call_ai'):
+            return gpt_client.call_gpt(query, zones)
     except Exception as e:
-        app.logger.error(f"GPT failed: {e}")
+        app.logger.error("GPT failed: %s", e)
         return "AI temporarily unavailable."
 
 
-def process_multi_stock_gpt_replies(period='2y'):
-    replies = {}
-    for code in MULTI_STOCK_CODES:
-        try:
-            dz = DemandZoneManager(code)
-            (charts, dz_info, sz_info, adz, asz,
-             monthly_zones, daily_zones,
-             price, fresh1d, wk_zones) = dz.process_all_intervals(HARDCODED_INTERVALS, period)
-
-            if USE_FLOWISE or (ENABLE_GPT and gpt_client):
+def multi_stock_gpt_reply(code, period='2y'):
+    try:
+        dz = DemandZoneManager(code)
+        (charts, dz_info, sz_info, adz, asz,
+         monthly_zones, daily_zones,
+         price, fresh1d, wk_zones) = dz.process_all_intervals(HARDCODED_INTERVALS, period, render_charts=False)
+
+        if USE_FLOWISE or (ENABLE_GPT and gpt_client):
+            with metrics.span('prepare_zones'):
                 zones = gpt_client.prepare_zones(
                     monthly_zones, fresh1d, price, wk_zones,
                     f"Stock Data for {code}"
                 )
-                reply = call_ai(f"The current market price of {code} is {price}.", {'main': zones})
-            else:
-                reply = "AI functionality is disabled."
-            replies[code] = reply
-        except Exception as e:
-            logging.error(f"Error processing stock {code}: {e}")
-            replies[code] = f"Error processing stock {code}."
-    return replies
+            return call_ai(f"The current market price of {code} is {price}.", {'main': zones})
+        return "AI functionality is disabled."
+    except Exception as e:
+        logging.error("Error processing stock %s: %s", code, e)
+        return f"Error processing stock {code}."
+
+def process_multi_stock_gpt_replies(period='2y'):
+    # One code's fetches and LLM call overlap the others' waits
+    replies = io_pool.map(lambda code: multi_stock_gpt_reply(code, period), MULTI_STOCK_CODES)
+    return dict(zip(MULTI_STOCK_CODES, replies))
+
+# ──── Request metrics & profiling ─────────────────────────────────────────
+profiler = RequestProfiler(PROFILE_SECRET)
+
+@app.before_request
+def start_request_metrics():
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    g.metrics_token = metrics.start_request(route)
+    g.memory_token = memory_probe.start_request()
+    g.profile_session = profiler.start(
+        request.path, request.headers.get(PROFILE_HEADER), request.args.get('profile')
+    )
+
+@app.after_request
+def add_server_timing(response):
+    profile_session = g.pop('profile_session', None)
+    if profile_session:
+        profiler.finish(profile_session)
+        response.headers['X-Profile-Id'] = profile_session.id
+    memory_token = g.pop('memory_token', None)
+    if memory_token:
+        MemoryProbe.record_session(session, app.session_interface)
+        memory_probe.finish_request(memory_token, request.url_rule.rule if request.url_rule else 'unmatched')
+    token = g.pop('metrics_token', None)
+    if token:
+        response.headers['Server-Timing'] = metrics.server_timing_header(token)
+        metrics.finish_request(token, request.method, response.status_code)
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    # Only reached with leftovers when the request raised before after_request
+    profile_session = g.pop('profile_session', None)
+    if profile_session:
+        profiler.finish(profile_session)
+    memory_token = g.pop('memory_token', None)
+    if memory_token:
+        memory_probe.finish_request(memory_token)
+    token = g.pop('metrics_token', None)
+    if token:
+        metrics.finish_request(token, request.method, 500)
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    if METRICS_TOKEN and request.headers.get('Authorization') != f"Bearer {METRICS_TOKEN}":
+        abort(401)
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+# ──── Admission control ────────────────────────────────────────────────────
+def admit(route, policy='queue'):
+    """
+    Admits the current request to an expensive route or raises AdmissionRejected;
+    the slot is released when the request is torn down.
+    """
+    if 'admission_ticket' in g:
+        return
+    # A session minted by this very request (the login form) would start with a full bucket
+    sid = None if getattr(session, 'new', True) else getattr(session, 'sid', None)
+    client = AdmissionController.client_key(sid, request.remote_addr)
+    g.admission_ticket = admission.acquire(route, client, policy)
+
+def grant_page_charts(symbols, period):
+    """
+    Records that the search which rendered this page was admitted: it has fetched and
+    scanned the bars of these symbols, so the page's own chart loads are not charged again.
+    """
+    session['chart_grant'] = {
+        'symbols': [symbol for symbol in symbols if symbol],
+        'period': period,
+        'expires': time.time() + ADMISSION_PAGE_GRANT
+    }
+
+def page_charts_granted(symbol, period):
+    grant = session.get('chart_grant')
+    return (bool(grant) and symbol in grant['symbols'] and period == grant['period']
+            and time.time() < grant['expires'])
+
+@app.teardown_request
+def release_admission(exc):
+    ticket = g.pop('admission_ticket', None)
+    if ticket:
+        admission.release(ticket)
+
+# ──── Static assets & compression ─────────────────────────────────────────
+@app.template_global()
+def asset_url(filename):
+    """
+    URL of a static file: its fingerprinted build when present, else the plain /static file.
+    """
+    hashed = static_assets.hashed(filename)
+    if hashed:
+        return url_for('asset', filename=hashed)
+    return static_assets.fallback(filename) or url_for('static', filename=filename)
+
+@app.route('/assets/<path:filename>', methods=['GET'])
+def asset(filename):
+    resolved = static_assets.resolve(filename, request.accept_encodings)
+    if resolved is None:
+        abort(404)
+    path, encoding, mimetype = resolved
+    response = send_file(path, mimetype=mimetype, conditional=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = f'public, max-age={ASSET_MAX_AGE}, immutable'
+    return response
+
+@app.after_request
+def compress_large_responses(response):
+    return compress_response(response, request.accept_encodings)
 
 # ──── Routes ───────────────────────────────────────────────────────────────
 @app.route('/user_info', methods=['GET', 'POST'])
@@ -158,9 +309,10 @@ def user_info():
     if request.method == 'POST':
         session['name'] = request.form.get('name')
         session['email'] = request.form.get('email')
-        logging.debug(f"User Info Submitted: {session['name']}, {session['email']}")
+        logging.debug("User Info Submitted: %s, %s", session['name'], session['email'])
         session.setdefault('chat_history', [])
         if (USE_FLOWISE or (ENABLE_GPT and gpt_client)) and 'multi_stock' not in session:
+            admit('multi_stock', policy='reject')
             session['multi_stock'] = process_multi_stock_gpt_replies()
         return redirect(url_for('index'))
     return render_template('user_info.html')
@@ -182,36 +334,51 @@ def index():
     name, email = session['name'], session['email']
 
     if request.method == 'POST':
+        admit('search')
         stock_code = request.form['stock_code'].strip().upper()
         period = request.form['period']
         prev = session.get('current_stock')
         if prev and prev != stock_code:
             session['chat_history'] = []
 
-        # Main stock data
+        # Main and index stock data, fetched side by side
         dz = DemandZoneManager(stock_code)
+        index_code = dz.get_stock_codes_to_process(stock_code)
+        main_future = io_pool.submit(dz.process_all_intervals, HARDCODED_INTERVALS, period, render_charts=False)
+        index_future = None
+        if index_code:
+            index_future = io_pool.submit(DemandZoneManager(index_code).process_all_intervals,
+                                          HARDCODED_INTERVALS, period, render_charts=False)
+
         (main_charts, main_dz, main_sz, main_adz, main_asz,
          main_monthly, main_daily, main_price,
-         main_fresh, main_wk) = dz.process_all_intervals(HARDCODED_INTERVALS, period)
+         main_fresh, main_wk) = main_future.result()
+        if ALERTS_ENABLED:
+            alert_engine.update_zones(
+                stock_code,
+                [zone for zones in main_adz.values() for zone in zones],
+                [zone for zones in main_asz.values() for zone in zones],
+                main_price
+            )
 
         # Index stock data (for toggle)
         index_charts = None
-        index_code = dz.get_stock_codes_to_process(stock_code)
-        if index_code:
-            dz2 = DemandZoneManager(index_code)
+        if index_future:
             (idx_charts, idx_dz, idx_sz, idx_adz, idx_asz,
              idx_monthly, idx_daily, idx_price,
-             idx_fresh, idx_wk) = dz2.process_all_intervals(HARDCODED_INTERVALS, period)
+             idx_fresh, idx_wk) = index_future.result()
             index_charts = idx_charts
 
         # AI zones & reply
         zones = {}
         ai_answer = None
         if USE_FLOWISE or (ENABLE_GPT and gpt_client):
-            mz = gpt_client.prepare_zones(main_monthly, main_fresh, main_price, main_wk, "Main Stock Data")
+            with metrics.span('prepare_zones'):
+                mz = gpt_client.prepare_zones(main_monthly, main_fresh, main_price, main_wk, "Main Stock Data")
             zones['main'] = mz
             if index_charts:
-                iz = gpt_client.prepare_zones(idx_monthly, idx_fresh, idx_price, idx_wk, "Index Data")
+                with metrics.span('prepare_zones'):
+                    iz = gpt_client.prepare_zones(idx_monthly, idx_fresh, idx_price, idx_wk, "Index Data")
                 zones['index'] = iz
             ai_answer = call_ai(
                 f"Price {main_price}." + (f" Index {index_code} price {idx_price}.") if index_charts else "",
@@ -220,6 +387,7 @@ def index():
             session['gpt_auto'] = ai_answer
 
         # Save session context
+        grant_page_charts([stock_code, index_code], period)
         session['current_stock'] = stock_code
         session['gpt_dto'] = zones
         chat = session.setdefault('chat_history', [])
@@ -229,6 +397,7 @@ def index():
             'query': f"Searched {stock_code} period {period}",
             'gpt_answer': ai_answer or ''
         })
+        chat = chat[-CHAT_HISTORY_MAX:]
         session['chat_history'] = chat
 
         return render_template(
@@ -241,7 +410,9 @@ def index():
             email=email,
             chat_history=chat,
             gpt_auto_answer=ai_answer,
-            index_code=index_code
+            stock_code=stock_code,
+            index_code=index_code,
+            period=period
         )
 
     # GET
@@ -271,18 +442,156 @@ def send_message():
 def multi_stock():
     if 'name' not in session:
         return redirect(url_for('user_info'))
-    replies = session.get('multi_stock') or process_multi_stock_gpt_replies()
+    replies = session.get('multi_stock')
+    if not replies:
+        # One LLM call per code: shed rather than queue when the server is full
+        admit('multi_stock', policy='reject')
+        replies = process_multi_stock_gpt_replies()
     session['multi_stock'] = replies
     return render_template('multi_stock.html', gpt_replies=replies)
 
+# ──── Zone alerts ──────────────────────────────────────────────────────────
+# Searched symbols' fresh zones are tracked per worker; a price feed pushes
+# prices and browsers follow alerts over Server-Sent Events.
+alert_stream = SSESink()
+alert_engine = AlertEngine(sinks=[LogSink(), WebhookSink(), alert_stream])
+
+def alerts_unavailable():
+    return jsonify({'error': 'Alerts need a single threaded worker (WEB_CONCURRENCY=1, SERVING_MODE=threaded).'}), 503
+
+@app.route('/alerts/prices', methods=['POST'])
+def push_prices():
+    if not ALERTS_ENABLED:
+        return alerts_unavailable()
+    if not ALERTS_TOKEN or request.headers.get('Authorization') != f"Bearer {ALERTS_TOKEN}":
+        abort(401)
+    prices = request.get_json(silent=True) or {}
+    try:
+        alerts = alert_engine.check_many({str(symbol).upper(): float(price) for symbol, price in prices.items()})
+    except (TypeError, ValueError, AttributeError):
+        return jsonify({'error': 'Expected {"SYMBOL": price, ...}.'}), 400
+    return jsonify({'alerts': alerts})
+
+@app.route('/alerts/stream', methods=['GET'])
+def stream_alerts():
+    if 'name' not in session:
+        abort(401)
+    if not ALERTS_ENABLED:
+        return alerts_unavailable()
+    symbols = {s.strip().upper() for s in request.args.get('symbols', '').split(',') if s.strip()}
+    # Holds a worker thread until the stream's lifetime ends and the client reconnects
+    return Response(alert_stream.stream(symbols or None), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/alerts/stats', methods=['GET'])
+def alert_stats():
+    if 'name' not in session:
+        abort(401)
+    if not ALERTS_ENABLED:
+        return alerts_unavailable()
+    return jsonify(alert_engine.stats())
+
+# ──── Zones API ─────────────────────────────────────────────────────────────
+zones_api = ZonesApi()
+charts_api = ChartsApi()
+
+@app.route('/api/zones/<symbol>', methods=['GET'])
+def api_zones(symbol):
+    token_ok = API_TOKEN and request.headers.get('Authorization') == f"Bearer {API_TOKEN}"
+    if not token_ok and 'name' not in session:
+        abort(401)
+    try:
+        intervals = ZonesApi.parse_intervals(request.args.get('intervals'))
+        fresh = request.args.get('fresh', 'false').lower() in ('true', '1')
+        etag, body = zones_api.get(symbol.strip().upper(), intervals, request.args.get('period', '2y'), fresh,
+                                   request.if_none_match.as_set(include_weak=True),
+                                   admit=lambda: admit('zones_api', policy='reject'))
+    except ZonesApiError as e:
+        return jsonify({'error': e.message}), e.status
+
+    if body is None:
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@app.route('/api/charts/<symbol>', methods=['GET'])
+def api_charts(symbol):
+    token_ok = API_TOKEN and request.headers.get('Authorization') == f"Bearer {API_TOKEN}"
+    if not token_ok and 'name' not in session:
+        abort(401)
+    symbol = symbol.strip().upper()
+    period = request.args.get('period', '2y')
+    # The page's own charts were paid for by the search that rendered it
+    charge = None if page_charts_granted(symbol, period) else (lambda: admit('charts_api', policy='reject'))
+    try:
+        etag, body = charts_api.get_chart(symbol, request.args.get('interval', '1d'), period,
+                                          request.if_none_match.as_set(include_weak=True), admit=charge)
+    except ZonesApiError as e:
+        return jsonify({'error': e.message}), e.status
+
+    if body is None:
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@app.route('/api/bars/<symbol>', methods=['GET'])
+def api_bars(symbol):
+    token_ok = API_TOKEN and request.headers.get('Authorization') == f"Bearer {API_TOKEN}"
+    if not token_ok and 'name' not in session:
+        abort(401)
+    interval = request.args.get('interval', '1d')
+    if interval not in ZONES_API_INTERVALS:
+        return jsonify({'error': f"Unsupported interval: {interval}"}), 400
+    try:
+        width = min(max(int(request.args.get('width', '1200')), 50), 8000)
+        symbol = symbol.strip().upper()
+        if not superset_cache.cached(symbol, interval):
+            # A miss fetches the full history from Yahoo and scans it
+            admit('bars_api', policy='reject')
+        pyramid = superset_cache.superset(symbol, interval).pyramid
+        number, level = pyramid.query(request.args.get('start'), request.args.get('end'), width)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    response = jsonify(pyramid.to_json(number, level))
+    response.headers['Cache-Control'] = 'private, max-age=60'
+    return response
+
 # Error handlers
+def retry_later(message, status, retry_after):
+    if request.path.startswith('/api/'):
+        response = jsonify({'error': message})
+    else:
+        response = Response(message, mimetype='text/plain')
+    response.status_code = status
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+@app.errorhandler(ComputePoolBusy)
+def compute_pool_busy(e):
+    # Back-pressure from the compute pool: shed the request rather than queue it
+    logging.warning("Shedding %s: %s", request.path, e)
+    return retry_later("Server busy, retry shortly.", 503, e.retry_after)
+
+@app.errorhandler(AdmissionRejected)
+def admission_rejected(e):
+    logging.debug("Not admitted %s: %s", request.path, e)
+    if e.status == 429:
+        return retry_later("Too many requests, slow down.", 429, e.retry_after)
+    return retry_later("Server busy, retry shortly.", 503, e.retry_after)
+
 @app.errorhandler(404)
 def not_found(e):
     return render_template('404.html'), 404
 
 @app.errorhandler(500)
 def internal_error(e):
-    logging.error(f"Internal server error: {e}")
+    logging.error("Internal server error: %s", e)
     return render_template('500.html'), 500
 
 # Expose for WSGI servers (Gunicorn, uWSGI, mod_wsgi…)
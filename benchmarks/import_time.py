@@ -0,0 +1,167 @@
+"""
+Import-time report for the web app.
+
+Runs ``python -X importtime -c "import app"`` in fresh interpreters, keeps the
+fastest of the runs for each module, and prints the total, the slowest modules
+and a per-package breakdown, plus the interpreter's RSS right after the
+import. It fails (exit 1) when a module that must load lazily is imported at
+start-up, or when the total exceeds --max-ms or a saved --baseline by more
+than --tolerance.
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --runs 5 --json import_time.json
+    python -m benchmarks.import_time --baseline import_time.json --tolerance 0.25
+"""
+import os
+import re
+import sys
+import json
+import argparse
+import subprocess
+
+DEFAULT_TARGET = 'app'
+# Packages only needed on first use (charts, Yahoo fetches, GPT calls)
+LAZY_MODULES = ['yfinance', 'plotly', 'openai', 'curl_cffi', 'IPython']
+_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$')
+_RSS_SNIPPET = "import resource, {target}; print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+
+
+def child_env():
+    env = dict(os.environ)
+    # app.py refuses to import without a secret; the value is irrelevant here
+    env.setdefault('FLASK_SECRET_KEY', 'import-time-benchmark')
+    env.setdefault('LOG_LEVEL', 'ERROR')
+    # With a key set the GPT client is built at import; it must still not load openai
+    env.setdefault('OPENAI_API_KEY', 'import-time-benchmark')
+    return env
+
+
+def parse_importtime(text):
+    """
+    :param text: stderr of ``python -X importtime``.
+    :return: [(module, self_us, cumulative_us, depth)] in output order.
+    """
+    rows = []
+    for line in text.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def measure(target, runs):
+    """
+    :return: {module: {'self_us', 'cumulative_us', 'depth'}} keeping each module's fastest run.
+    """
+    best = {}
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {target}'],
+                                capture_output=True, text=True, env=child_env())
+        if result.returncode != 0:
+            raise RuntimeError(f"import {target} failed:\n{result.stderr[-2000:]}")
+        for module, self_us, cumulative_us, depth in parse_importtime(result.stderr):
+            current = best.get(module)
+            if current is None or cumulative_us < current['cumulative_us']:
+                best[module] = {'self_us': self_us, 'cumulative_us': cumulative_us, 'depth': depth}
+    return best
+
+
+def measure_rss(target):
+    """
+    :return: Peak RSS in MB of an interpreter that has imported target.
+    """
+    result = subprocess.run([sys.executable, '-c', _RSS_SNIPPET.format(target=target)],
+                            capture_output=True, text=True, env=child_env())
+    if result.returncode != 0:
+        raise RuntimeError(f"import {target} failed:\n{result.stderr[-2000:]}")
+    # ru_maxrss is in KB on Linux
+    return int(result.stdout.strip().splitlines()[-1]) / 1024.0
+
+
+def build_report(target, modules, rss_mb, top):
+    packages = {}
+    for module, row in modules.items():
+        package = module.split('.')[0]
+        packages[package] = packages.get(package, 0) + row['self_us']
+    total_us = modules[target]['cumulative_us'] if target in modules else sum(packages.values())
+    slowest = sorted(((module, row) for module, row in modules.items() if module != target),
+                     key=lambda item: item[1]['cumulative_us'], reverse=True)[:top]
+    return {
+        'target': target,
+        'total_ms': total_us / 1000.0,
+        'modules': len(modules),
+        'rss_mb': rss_mb,
+        'slowest': [{'module': module, 'cumulative_ms': row['cumulative_us'] / 1000.0,
+                     'self_ms': row['self_us'] / 1000.0} for module, row in slowest],
+        'packages': {package: us / 1000.0 for package, us in
+                     sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]},
+        'lazy_imported': sorted(package for package in LAZY_MODULES if package in modules),
+    }
+
+
+def check(report, max_ms=None, baseline=None, tolerance=0.2):
+    """
+    :return: List of regression messages (empty when the report passes).
+    """
+    failures = []
+    if report['lazy_imported']:
+        failures.append(f"imported at start-up but should load on first use: {', '.join(report['lazy_imported'])}")
+    if max_ms is not None and report['total_ms'] > max_ms:
+        failures.append(f"total {report['total_ms']:.0f} ms exceeds --max-ms {max_ms:.0f}")
+    if baseline is not None:
+        limit = baseline['total_ms'] * (1 + tolerance)
+        if report['total_ms'] > limit:
+            failures.append(f"total {report['total_ms']:.0f} ms exceeds baseline {baseline['total_ms']:.0f} ms "
+                            f"+{tolerance:.0%}")
+        new_modules = report['modules'] - baseline['modules']
+        if new_modules > baseline['modules'] * tolerance:
+            failures.append(f"{new_modules} more modules than the baseline ({baseline['modules']})")
+    return failures
+
+
+def format_report(report):
+    lines = [
+        f"import {report['target']}: {report['total_ms']:.0f} ms, {report['modules']} modules, "
+        f"RSS {report['rss_mb']:.1f} MB",
+        "",
+        f"{'slowest modules':<50}{'cumulative ms':>15}{'self ms':>10}",
+    ]
+    for row in report['slowest']:
+        lines.append(f"{row['module']:<50}{row['cumulative_ms']:>15.1f}{row['self_ms']:>10.1f}")
+    lines += ["", f"{'package':<50}{'self ms':>15}"]
+    for package, ms in report['packages'].items():
+        lines.append(f"{package:<50}{ms:>15.1f}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="python -X importtime report for the app.")
+    parser.add_argument('--target', default=DEFAULT_TARGET, help="Module to import.")
+    parser.add_argument('--runs', type=int, default=3, help="Fresh interpreters; the fastest run per module counts.")
+    parser.add_argument('--top', type=int, default=20, help="Rows in the slowest-module and package tables.")
+    parser.add_argument('--max-ms', type=float, help="Fail when the total import time exceeds this.")
+    parser.add_argument('--baseline', help="Report JSON to compare against.")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed growth over the baseline.")
+    parser.add_argument('--json', help="Also write the report to this file.")
+    args = parser.parse_args(argv)
+
+    modules = measure(args.target, max(args.runs, 1))
+    report = build_report(args.target, modules, measure_rss(args.target), args.top)
+    print(format_report(report))
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump(report, handle, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as handle:
+            baseline = json.load(handle)
+    failures = check(report, args.max_ms, baseline, args.tolerance)
+    for failure in failures:
+        print(f"REGRESSION: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,299 @@
+"""
+End-to-end HTTP load test.
+
+Boots the app under gunicorn against the replay data provider and the mock LLM,
+drives a login -> search -> chat -> multi_stock traffic mix at a target request
+rate and reports latency percentiles, throughput, error rates and per-worker RSS.
+
+    python -m benchmarks.load_test --workers 2 --rps 5 --duration 60 \
+        --llm-latency-ms 1500 --mix search=4,chat=3,multi_stock=1
+
+Use --url to drive an already running instance instead of booting one (worker
+memory is then only reported when --master-pid is given).
+"""
+import os
+import sys
+import json
+import time
+import random
+import signal
+import socket
+import argparse
+import threading
+import subprocess
+import requests
+from benchmarks.mock_llm import start_mock_llm
+
+ROUTES = ['login', 'search', 'chat', 'multi_stock']
+DEFAULT_MIX = 'search=4,chat=3,multi_stock=1'
+DEFAULT_SYMBOLS = ['TCS', 'INFY', 'RELIANCE', 'HDFCBANK', 'ITC', 'SBIN']
+PERIODS = ['6mo', '1y', '2y']
+
+
+class RateLimiter:
+    """
+    Spaces request starts evenly so that the whole test runs at `rps`.
+    """
+
+    def __init__(self, rps):
+        self.interval = 1.0 / rps if rps > 0 else 0
+        self.next_slot = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            slot = max(self.next_slot, time.perf_counter())
+            self.next_slot = slot + self.interval
+        delay = slot - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class LoadTest:
+    def __init__(self, base_url, mix, rps, duration, users, symbols, timeout=180):
+        self.base_url = base_url.rstrip('/')
+        self.mix = mix
+        self.rps = rps
+        self.duration = duration
+        self.users = users
+        self.symbols = symbols
+        self.timeout = timeout
+        self.limiter = RateLimiter(rps)
+        self.samples = []  # (route, seconds, ok, status)
+        self.lock = threading.Lock()
+
+    def run(self):
+        deadline = time.perf_counter() + self.duration
+        threads = [threading.Thread(target=self._user, args=(deadline,), daemon=True)
+                   for _ in range(self.users)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started
+
+    def _user(self, deadline):
+        session = requests.Session()
+        self._request(session, 'login')
+        routes, weights = zip(*self.mix.items())
+        while time.perf_counter() < deadline:
+            self._request(session, random.choices(routes, weights)[0])
+
+    def _request(self, session, route):
+        self.limiter.wait()
+        started = time.perf_counter()
+        status = None
+        try:
+            if route == 'login':
+                response = session.post(f"{self.base_url}/user_info", timeout=self.timeout, data={
+                    'name': 'Load Test', 'email': 'load@example.com'})
+            elif route == 'search':
+                response = session.post(f"{self.base_url}/", timeout=self.timeout, data={
+                    'stock_code': random.choice(self.symbols), 'period': random.choice(PERIODS)})
+            elif route == 'chat':
+                response = session.post(f"{self.base_url}/send_message", timeout=self.timeout, data={
+                    'message': 'Where should I enter?'})
+            else:
+                response = session.get(f"{self.base_url}/multi_stock", timeout=self.timeout)
+            status = response.status_code
+            ok = status < 400
+        except requests.RequestException:
+            ok = False
+        with self.lock:
+            self.samples.append((route, time.perf_counter() - started, ok, status))
+
+    def report(self, elapsed):
+        routes = {}
+        for route in ROUTES + ['all']:
+            samples = [s for s in self.samples if route in ('all', s[0])]
+            if not samples:
+                continue
+            latencies = sorted(s[1] for s in samples)
+            errors = sum(1 for s in samples if not s[2])
+            routes[route] = {
+                'requests': len(samples),
+                'throughput_rps': len(samples) / elapsed,
+                'error_rate': errors / len(samples),
+                'p50_ms': percentile(latencies, 50) * 1000,
+                'p95_ms': percentile(latencies, 95) * 1000,
+                'p99_ms': percentile(latencies, 99) * 1000,
+            }
+        return {'elapsed_s': elapsed, 'target_rps': self.rps, 'routes': routes}
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        route, _, weight = part.partition('=')
+        route = route.strip()
+        if route not in ROUTES:
+            raise ValueError(f"Unknown route '{route}' in mix; expected one of {ROUTES}")
+        mix[route] = float(weight or 1)
+    return mix
+
+
+def worker_rss(master_pid):
+    """
+    Returns {pid: rss_mb} for the direct children of master_pid (Linux /proc only).
+    """
+    rss = {}
+    if not os.path.isdir('/proc'):
+        return rss
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/status") as status:
+                fields = dict(line.split(':', 1) for line in status if ':' in line)
+        except OSError:
+            continue
+        if fields.get('PPid', '').strip() == str(master_pid) and 'VmRSS' in fields:
+            rss[int(entry)] = int(fields['VmRSS'].split()[0]) / 1024.0
+    return rss
+
+
+class MemorySampler(threading.Thread):
+    """
+    Tracks the peak RSS of each gunicorn worker while the test runs.
+    """
+
+    def __init__(self, master_pid, period=1.0):
+        super().__init__(daemon=True)
+        self.master_pid = master_pid
+        self.period = period
+        self.peak = {}
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.period):
+            for pid, rss in worker_rss(self.master_pid).items():
+                self.peak[pid] = max(rss, self.peak.get(pid, 0.0))
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        return {'peak_rss_mb': self.peak, 'final_rss_mb': worker_rss(self.master_pid)}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def boot_app(port, llm_url, workers, worker_class, threads, use_flowise, replay_dir, timeout):
+    env = dict(os.environ)
+    env.update({
+        'FLASK_SECRET_KEY': env.get('FLASK_SECRET_KEY', 'load-test-secret'),
+        'DATA_PROVIDER': 'replay',
+        'REPLAY_DATA_DIR': replay_dir,
+        'REPLAY_SYNTHESIZE': 'true',
+        'OPENAI_API_KEY': 'mock-key',
+        'OPENAI_BASE_URL': f"{llm_url}/v1",
+        'USE_FLOWISE': 'true' if use_flowise else 'false',
+        'FLOWISE_API_URL': f"{llm_url}/api/v1/prediction/mock",
+    })
+    command = [sys.executable, '-m', 'gunicorn', 'app:application',
+               '--bind', f"127.0.0.1:{port}",
+               '--workers', str(workers),
+               '--worker-class', worker_class,
+               '--threads', str(threads),
+               '--timeout', str(timeout)]
+    process = subprocess.Popen(command, env=env)
+
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            requests.get(f"http://127.0.0.1:{port}/user_info", timeout=2)
+            return process
+        except requests.RequestException:
+            if process.poll() is not None:
+                raise RuntimeError("gunicorn exited during startup")
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("Timed out waiting for the app to start")
+
+
+def format_report(report):
+    lines = [f"Elapsed {report['elapsed_s']:.1f}s, target {report['target_rps']} rps"]
+    lines.append(f"{'route':<12}{'reqs':>7}{'rps':>8}{'err%':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for route, stats in report['routes'].items():
+        lines.append(
+            f"{route:<12}{stats['requests']:>7}{stats['throughput_rps']:>8.2f}"
+            f"{stats['error_rate'] * 100:>7.1f}{stats['p50_ms']:>10.0f}"
+            f"{stats['p95_ms']:>10.0f}{stats['p99_ms']:>10.0f}"
+        )
+    memory = report.get('memory')
+    if memory:
+        for pid, peak in sorted(memory['peak_rss_mb'].items()):
+            lines.append(f"worker {pid}: peak RSS {peak:.1f} MB")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP load test with mock LLM and replay data.")
+    parser.add_argument('--url', help="Drive an already running app instead of booting one.")
+    parser.add_argument('--master-pid', type=int, help="gunicorn master pid for memory sampling with --url.")
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--worker-class', default='sync')
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--timeout', type=int, default=180)
+    parser.add_argument('--rps', type=float, default=2.0, help="Target request rate (0 = unthrottled).")
+    parser.add_argument('--duration', type=float, default=60.0, help="Seconds of traffic.")
+    parser.add_argument('--users', type=int, default=10, help="Concurrent virtual users.")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="Weighted route mix after login.")
+    parser.add_argument('--symbols', default=','.join(DEFAULT_SYMBOLS))
+    parser.add_argument('--llm-latency-ms', type=float, default=1000)
+    parser.add_argument('--llm-jitter-ms', type=float, default=250)
+    parser.add_argument('--flowise', action='store_true', help="Route AI calls through the Flowise mock.")
+    parser.add_argument('--replay-dir', default='./replay_data/')
+    parser.add_argument('--json', help="Also write the report to this file.")
+    args = parser.parse_args(argv)
+
+    llm_server, llm_url = start_mock_llm(0, args.llm_latency_ms, args.llm_jitter_ms)
+    app_process = None
+    master_pid = args.master_pid
+    base_url = args.url
+    if not base_url:
+        port = free_port()
+        app_process = boot_app(port, llm_url, args.workers, args.worker_class, args.threads,
+                               args.flowise, args.replay_dir, args.timeout)
+        master_pid = app_process.pid
+        base_url = f"http://127.0.0.1:{port}"
+
+    sampler = MemorySampler(master_pid) if master_pid else None
+    try:
+        if sampler:
+            sampler.start()
+        test = LoadTest(base_url, parse_mix(args.mix), args.rps, args.duration, args.users,
+                        [s.strip().upper() for s in args.symbols.split(',') if s.strip()], args.timeout)
+        report = test.report(test.run())
+        if sampler:
+            report['memory'] = sampler.stop()
+    finally:
+        if app_process:
+            app_process.send_signal(signal.SIGTERM)
+            app_process.wait(timeout=30)
+        llm_server.shutdown()
+
+    print(format_report(report))
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump(report, handle, indent=2, default=str)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
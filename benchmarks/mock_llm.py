@@ -0,0 +1,109 @@
+"""
+Local stand-in for the OpenAI chat completions API and a Flowise prediction
+endpoint, with configurable latency. Used by the load test so that LLM time is
+realistic but free and deterministic.
+
+    python -m benchmarks.mock_llm --port 8900 --latency-ms 1500 --jitter-ms 500
+
+Point the app at it with OPENAI_BASE_URL=http://127.0.0.1:8900/v1 (and any
+OPENAI_API_KEY), or USE_FLOWISE=true FLOWISE_API_URL=http://127.0.0.1:8900/api/v1/prediction/mock.
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MOCK_ANSWER = (
+    "The main buying range sits in the highlighted demand zone. Consider staggered "
+    "entries inside it with a stop-loss just below the zone, and a first target at "
+    "the nearest supply zone above the current price."
+)
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    latency_ms = 0
+    jitter_ms = 0
+    error_rate = 0.0
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        time.sleep(max(delay, 0) / 1000.0)
+
+        if random.random() < self.error_rate:
+            self._send(500, {'error': {'message': 'mock failure'}})
+            return
+
+        if self.path.rstrip('/').endswith('/chat/completions'):
+            try:
+                model = json.loads(body or b'{}').get('model', 'mock')
+            except ValueError:
+                model = 'mock'
+            self._send(200, {
+                'id': 'chatcmpl-mock',
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': MOCK_ANSWER},
+                    'finish_reason': 'stop'
+                }],
+                'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+            })
+        elif '/prediction/' in self.path:
+            self._send(200, {'text': MOCK_ANSWER})
+        else:
+            self._send(404, {'error': {'message': f'unknown path {self.path}'}})
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_mock_llm(port=0, latency_ms=0, jitter_ms=0, error_rate=0.0):
+    """
+    Starts the mock server on a background thread.
+
+    :return: (server, base_url) – call server.shutdown() to stop it.
+    """
+    handler = type('ConfiguredMockLLMHandler', (MockLLMHandler,), {
+        'latency_ms': latency_ms,
+        'jitter_ms': jitter_ms,
+        'error_rate': error_rate,
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mock OpenAI/Flowise server.")
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--latency-ms', type=float, default=1000)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    server, url = start_mock_llm(args.port, args.latency_ms, args.jitter_ms, args.error_rate)
+    print(f"Mock LLM listening on {url} (OpenAI base URL {url}/v1)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Gunicorn settings, read automatically from the working directory.
+
+With GUNICORN_PRELOAD on (the default) the master imports the app once, warms
+the superset and zones caches for the universe (stock_data.warmup) and freezes
+the GC before forking. The first workers start with hot caches and share those
+pages copy-on-write; workers forked after the cache TTLs have run out (e.g.
+replacing recycled ones) keep the imported modules but refetch their data.
+
+SERVING_MODE=threaded runs gthread workers instead of sync ones: each worker
+serves GUNICORN_THREADS requests at once, so users waiting on Yahoo or the LLM
+(threads blocked in socket reads, GIL released) no longer hold a whole worker,
+and an instance handles workers x threads concurrent requests. The shared
+state the app keeps per process (superset/zones caches, metrics, alert engine,
+session store connections) is lock- or thread-local-protected for this.
+
+Zone alerts (/alerts/*) keep their zones and SSE subscribers in one process, so
+they are switched off (ALERTS_ENABLED=False) unless there is a single threaded
+worker: a price pushed to one worker never reaches another's subscribers.
+
+    gunicorn app:application
+    WARMUP_SYMBOLS=TCS,INFY WEB_CONCURRENCY=4 gunicorn app:application
+    SERVING_MODE=threaded GUNICORN_THREADS=100 gunicorn app:application
+
+Each worker forks its compute pool (stock_data.compute_pool) right after it
+starts, before any of its threads exist.
+"""
+import os
+import gc
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '180'))
+# 'sync' (one request per worker) or 'threaded' (gthread, GUNICORN_THREADS requests per worker)
+SERVING_MODE = os.environ.get('SERVING_MODE', 'sync').lower()
+if SERVING_MODE == 'threaded':
+    worker_class = 'gthread'
+    threads = int(os.environ.get('GUNICORN_THREADS', '64'))
+    # Idle keep-alive connections park in the worker's poller, not on a thread
+    keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '5'))
+else:
+    worker_class = 'sync'
+    threads = 1
+if not (workers == 1 and SERVING_MODE == 'threaded'):
+    os.environ['ALERTS_ENABLED'] = 'False'
+# Import and warm the app in the master, then fork warmed workers
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'True').lower() in ('true', '1')
+# Recycle a worker after this many requests (0 disables); a replacement forks with the modules
+# loaded but, once the warm-up has expired, refetches each symbol on its first request
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '0'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', '0'))
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    # Already imported by the preload; this only looks the module up
+    import app
+    from stock_data.warmup import Warmup
+    Warmup.run(Warmup.symbols(default=app.MULTI_STOCK_CODES), zones_api=app.zones_api)
+    Warmup.freeze()
+
+
+def pre_fork(server, worker):
+    if preload_app:
+        # Also covers whatever the master allocated since the warm-up freeze
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    from stock_data.logging_config import LoggingPipeline
+    from stock_data.metrics import metrics
+    from stock_data.compute_pool import compute_pool
+    from stock_data.data_fetcher import DataFetcher
+    # First, so nothing below logs to the master's queue, which has no reader here; the
+    # new listener thread waits until the pool has forked from a single-threaded worker
+    LoggingPipeline.restart_after_fork(start=False)
+    compute_pool.start()
+    LoggingPipeline.start_listener()
+    # The warm-up's Yahoo session and sockets belong to the master
+    DataFetcher.reset_after_fork()
+    # Each worker reports its own traffic, not the master's warm-up
+    metrics.reset()
@@ -84,4 +84,168 @@ function toggleFreshZones(chatId, interval) {
         }
       });
     });
-  });
\ No newline at end of file
+  });
+/**
+ * IndexedDB cache of /api/charts payloads. One record per symbol/interval/period
+ * holds the payload with its data version and the ETag it was served with; the
+ * copy is revalidated with If-None-Match and reused as-is on a 304.
+ */
+const ChartCache = (function() {
+  const DB_NAME = 'priceaction-charts';
+  const DB_VERSION = 1;
+  const STORE = 'charts';
+  // Records kept; the least recently used are dropped beyond this
+  const MAX_ENTRIES = 200;
+  // Attempts after a 429/503 before a chart is reported unavailable, and the longest wait
+  const MAX_RETRIES = 3;
+  const MAX_RETRY_SECONDS = 30;
+  let dbPromise = null;
+
+  /**
+   * Opens the database once; resolves to null where IndexedDB is unavailable
+   * (e.g. some private modes), in which case charts are simply fetched.
+   */
+  function openDb() {
+    if (!dbPromise) {
+      dbPromise = new Promise(function(resolve) {
+        if (!window.indexedDB) {
+          resolve(null);
+          return;
+        }
+        const request = indexedDB.open(DB_NAME, DB_VERSION);
+        request.onupgradeneeded = function() {
+          const store = request.result.createObjectStore(STORE, { keyPath: 'key' });
+          store.createIndex('usedAt', 'usedAt');
+        };
+        request.onsuccess = function() { resolve(request.result); };
+        request.onerror = function() { resolve(null); };
+        request.onblocked = function() { resolve(null); };
+      });
+    }
+    return dbPromise;
+  }
+
+  function withStore(db, mode, action) {
+    return new Promise(function(resolve) {
+      const tx = db.transaction(STORE, mode);
+      const result = action(tx.objectStore(STORE));
+      tx.oncomplete = function() { resolve(result && 'result' in result ? result.result : null); };
+      tx.onerror = tx.onabort = function() { resolve(null); };
+    });
+  }
+
+  function prune(db) {
+    return withStore(db, 'readwrite', function(store) {
+      const count = store.count();
+      count.onsuccess = function() {
+        let excess = count.result - MAX_ENTRIES;
+        if (excess <= 0) return;
+        store.index('usedAt').openCursor().onsuccess = function(event) {
+          const cursor = event.target.result;
+          if (!cursor || excess-- <= 0) return;
+          cursor.delete();
+          cursor.continue();
+        };
+      };
+    });
+  }
+
+  function sleep(seconds) {
+    return new Promise(resolve => setTimeout(resolve, seconds * 1000));
+  }
+
+  /**
+   * Seconds to wait before retrying a throttled request: its Retry-After, capped.
+   */
+  function retryDelay(response) {
+    const seconds = parseFloat(response.headers.get('Retry-After'));
+    return Math.min(isFinite(seconds) && seconds > 0 ? seconds : 1, MAX_RETRY_SECONDS);
+  }
+
+  /**
+   * Chart payload for a symbol/interval/period, from the cache when the server
+   * answers 304. Falls back to the cached copy when the network is unavailable;
+   * a 429 or 503 is retried after its Retry-After.
+   * @returns {Promise<Object|null>} The /api/charts payload, or null.
+   */
+  async function load(symbol, interval, period) {
+    const db = await openDb();
+    const key = [symbol, interval, period].join('|');
+    const cached = db ? await withStore(db, 'readonly', store => store.get(key)) : null;
+
+    const params = new URLSearchParams({ interval: interval, period: period });
+    const headers = {};
+    if (cached && cached.etag) headers['If-None-Match'] = cached.etag;
+    let response;
+    for (let attempt = 0; ; attempt++) {
+      try {
+        // The browser's HTTP cache is bypassed so the 304 reaches this code
+        response = await fetch(`/api/charts/${encodeURIComponent(symbol)}?${params}`,
+                               { headers: headers, cache: 'no-store', credentials: 'same-origin' });
+      } catch (err) {
+        return cached ? cached.payload : null;
+      }
+      if ((response.status !== 429 && response.status !== 503) || attempt >= MAX_RETRIES) break;
+      await sleep(retryDelay(response));
+    }
+
+    if (response.status === 304 && cached) {
+      cached.usedAt = Date.now();
+      withStore(db, 'readwrite', store => store.put(cached));
+      return cached.payload;
+    }
+    if (!response.ok) return cached ? cached.payload : null;
+
+    const payload = await response.json();
+    if (db) {
+      const record = {
+        key: key,
+        symbol: symbol,
+        interval: interval,
+        period: period,
+        version: payload.data_version,
+        etag: response.headers.get('ETag'),
+        payload: payload,
+        usedAt: Date.now()
+      };
+      withStore(db, 'readwrite', store => store.put(record)).then(() => prune(db));
+    }
+    return payload;
+  }
+
+  return { load: load };
+})();
+
+/**
+ * Draws every chart the page left empty (data-chart placeholders) from /api/charts.
+ * Each drawn chart dispatches a bubbling 'chart:rendered' event.
+ */
+function renderZoneCharts() {
+  if (typeof Plotly === 'undefined') return;
+  document.querySelectorAll('.chart-container[data-symbol][data-period]').forEach(function(container) {
+    const targets = Array.from(container.querySelectorAll('[data-chart]'))
+      .filter(target => !target.querySelector('.plotly-graph-div'));
+    if (!targets.length) return;
+    const { symbol, interval, period } = container.dataset;
+    ChartCache.load(symbol, interval, period).then(function(payload) {
+      if (!payload) {
+        targets.forEach(function(target) {
+          target.textContent = 'Chart unavailable right now; search again to reload it.';
+        });
+        return;
+      }
+      targets.forEach(function(target) {
+        const figure = payload.charts[target.dataset.chart];
+        if (!figure) return;
+        const gd = document.createElement('div');
+        gd.className = 'plotly-graph-div';
+        target.appendChild(gd);
+        Plotly.newPlot(gd, figure.data, figure.layout, { responsive: true }).then(function() {
+          gd.dispatchEvent(new CustomEvent('chart:rendered', { bubbles: true }));
+        });
+      });
+    });
+  });
+}
+
+document.addEventListener("DOMContentLoaded", renderZoneCharts);
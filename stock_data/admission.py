@@ -0,0 +1,189 @@
+"""
+Admission control for the expensive work: the search POST, the multi-stock LLM
+replies (/multi_stock and the login form) and the API requests that miss their
+caches and fetch from Yahoo.
+
+Every client (its session id, or its IP before it has one) has a token bucket
+refilled at ADMISSION_RATE requests per second up to ADMISSION_BURST, and may
+run at most ADMISSION_CLIENT_CONCURRENCY expensive requests at once; beyond
+either it gets 429 with the Retry-After its bucket needs. Admitted requests
+then take one of ADMISSION_MAX_CONCURRENT slots. With the 'queue' policy a
+request waits up to ADMISSION_QUEUE_TIMEOUT for a slot behind at most
+ADMISSION_MAX_QUEUE others, with 'reject' it does not wait; either way a
+request that gets no slot is answered 503 with Retry-After rather than left
+to pile up. A burst therefore costs at most the queue timeout plus the work
+itself, and one client cannot take every slot.
+
+Work that does not call acquire() (static files, 304s and cache hits of the
+JSON APIs, metrics) is not limited, and neither are the chart loads of a page
+for ADMISSION_PAGE_GRANT seconds after the search that rendered it (app.py):
+one admission is charged per search. State is per process, so with several
+gunicorn workers the effective limits are per worker.
+"""
+import os
+import math
+import time
+import threading
+from collections import OrderedDict
+from stock_data.metrics import metrics
+
+# Sustained expensive requests per second per client, and the burst allowed on top;
+# a page view (login, a search, and its eight chart loads should they be charged) fits in one burst
+ADMISSION_RATE = float(os.environ.get('ADMISSION_RATE', '0.2'))
+ADMISSION_BURST = float(os.environ.get('ADMISSION_BURST', '12'))
+# Expensive requests one client may have in flight (the page loads its charts in parallel)
+ADMISSION_CLIENT_CONCURRENCY = int(os.environ.get('ADMISSION_CLIENT_CONCURRENCY', '4'))
+# Expensive requests in flight per process, across all clients
+ADMISSION_MAX_CONCURRENT = int(os.environ.get('ADMISSION_MAX_CONCURRENT', '8'))
+# Requests allowed to wait for a slot, and for how long (the bound on queueing delay)
+ADMISSION_MAX_QUEUE = int(os.environ.get('ADMISSION_MAX_QUEUE', '16'))
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', '2'))
+# Client buckets kept; the least recently seen are dropped (a dropped client starts full)
+ADMISSION_MAX_CLIENTS = int(os.environ.get('ADMISSION_MAX_CLIENTS', '10000'))
+
+POLICIES = ('queue', 'reject')
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status, retry_after, reason):
+        """
+        :param status: 429 (this client is over its limits) or 503 (the server is full).
+        """
+        super().__init__(f"Request not admitted ({reason}); retry in {retry_after}s")
+        self.status = status
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class AdmissionTicket:
+    def __init__(self, route, client):
+        self.route = route
+        self.client = client
+        self.admitted_at = time.monotonic()
+
+
+class AdmissionController:
+    def __init__(self, rate=ADMISSION_RATE, burst=ADMISSION_BURST, client_concurrency=ADMISSION_CLIENT_CONCURRENCY,
+                 max_concurrent=ADMISSION_MAX_CONCURRENT, max_queue=ADMISSION_MAX_QUEUE,
+                 queue_timeout=ADMISSION_QUEUE_TIMEOUT, max_clients=ADMISSION_MAX_CLIENTS):
+        self.rate = rate
+        self.burst = burst
+        self.client_concurrency = client_concurrency
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()  # client -> [tokens, last refill, requests in flight]
+        self._in_flight = 0
+        self._queued = 0
+        self._lock = threading.Lock()
+        self._slot_freed = threading.Condition(self._lock)
+
+    @staticmethod
+    def client_key(sid, remote_addr):
+        return f"session:{sid}" if sid else f"ip:{remote_addr or 'unknown'}"
+
+    # ------------------------------------------------------------------
+    #                   ADMISSION
+    # ------------------------------------------------------------------
+
+    def acquire(self, route, client, policy='queue'):
+        """
+        Admits one expensive request or raises. Every ticket must be release()d.
+
+        :param policy: 'queue' waits up to queue_timeout for a free slot, 'reject' does not.
+        :raise AdmissionRejected: 429 when the client is over its rate or concurrency,
+                                  503 when no slot freed up.
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown admission policy: {policy}")
+        with self._lock:
+            bucket = self._take_token(route, client)
+            try:
+                waited = self._take_slot(route, policy)
+            except AdmissionRejected:
+                # The server was full, not the client over its limit: give the token back
+                bucket[0] = min(self.burst, bucket[0] + 1)
+                raise
+            bucket[2] += 1
+            self._publish()
+        metrics.observe('admission_queue_wait_seconds', waited, route=route)
+        metrics.inc('admission_admitted_total', route=route)
+        return AdmissionTicket(route, client)
+
+    def release(self, ticket):
+        with self._lock:
+            self._in_flight -= 1
+            bucket = self._buckets.get(ticket.client)
+            if bucket is not None:
+                bucket[2] = max(0, bucket[2] - 1)
+            self._slot_freed.notify()
+            self._publish()
+
+    def _take_token(self, route, client):
+        # Called with the lock held
+        now = time.monotonic()
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = [self.burst, now, 0]
+            while len(self._buckets) > self.max_clients:
+                self._evict_one()
+        else:
+            self._buckets.move_to_end(client)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+
+        if bucket[2] >= self.client_concurrency:
+            self._reject(route, 429, 1, 'client_concurrency')
+        if bucket[0] < 1:
+            retry_after = math.ceil((1 - bucket[0]) / self.rate) if self.rate > 0 else 60
+            self._reject(route, 429, retry_after, 'rate')
+        bucket[0] -= 1
+        return bucket
+
+    def _take_slot(self, route, policy):
+        """
+        :return: Seconds spent queueing. Called with the lock held.
+        """
+        if self._in_flight < self.max_concurrent:
+            self._in_flight += 1
+            return 0.0
+        if policy == 'reject' or self._queued >= self.max_queue:
+            self._reject(route, 503, self._retry_after(), 'overloaded')
+
+        started = time.monotonic()
+        deadline = started + self.queue_timeout
+        self._queued += 1
+        self._publish()
+        try:
+            while self._in_flight >= self.max_concurrent:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._reject(route, 503, self._retry_after(), 'queue_timeout')
+                self._slot_freed.wait(remaining)
+        finally:
+            self._queued -= 1
+        self._in_flight += 1
+        return time.monotonic() - started
+
+    def _evict_one(self):
+        # Oldest idle bucket first; one with requests in flight is kept for release()
+        for client, bucket in self._buckets.items():
+            if not bucket[2]:
+                del self._buckets[client]
+                return
+        self._buckets.popitem(last=False)
+
+    def _retry_after(self):
+        return max(1, math.ceil(self.queue_timeout))
+
+    def _reject(self, route, status, retry_after, reason):
+        metrics.inc('admission_rejected_total', route=route, reason=reason)
+        raise AdmissionRejected(status, retry_after, reason)
+
+    def _publish(self):
+        metrics.set_gauge('admission_in_flight', self._in_flight)
+        metrics.set_gauge('admission_queued', self._queued)
+
+
+admission = AdmissionController()
@@ -0,0 +1,329 @@
+"""
+Zone backtester.
+
+Replays every demand and supply zone the identifiers produce against the price
+action that followed it, the way build_zones_dto would trade it: a demand zone is
+a long entry at its proximal line with the stoploss at its distal line and the
+target at the nearest supply zone above (a supply zone is the mirrored short).
+Entry-touch, stop-hit and target-hit bars are found with vectorised searches over
+the bars after the zone formed, and symbols are processed in parallel.
+
+    python -m stock_data.backtest --synthetic 50 --bars 2520 --workers 8
+    python -m stock_data.backtest --symbols TCS,INFY,ITC --period 10y
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from stock_data.zone_scanner import ZoneScanner, ScanState
+from stock_data.candlestick_utils import (
+    CandleStickUtils, BASE_CANDLE_THRESHOLD, EXCITING_CANDLE_THRESHOLD, GAP_THRESHOLD
+)
+from stock_data.data_fetcher import DataFetcher
+from stock_data.replay_data import synthetic_ohlcv
+
+# Target as a multiple of risk when no opposing zone exists at entry time
+DEFAULT_TARGET_R = 2.0
+BACKTEST_WORKERS = int(os.environ.get('BACKTEST_WORKERS', str(os.cpu_count() or 1)))
+
+OUTCOMES = ['target', 'stop', 'open', 'untouched']
+
+
+class ZoneBacktester:
+    def __init__(self, interval='1d', base_candle_threshold=BASE_CANDLE_THRESHOLD,
+                 exciting_candle_threshold=EXCITING_CANDLE_THRESHOLD, gap_threshold=GAP_THRESHOLD,
+                 target_r=DEFAULT_TARGET_R):
+        """
+        :param interval: Interval the frames are in (drives the identifiers' base rules).
+        :param base_candle_threshold: Passed to CandleStickUtils.add_candle_identifiers.
+        :param exciting_candle_threshold: Passed to CandleStickUtils.add_candle_identifiers.
+        :param gap_threshold: Passed to CandleStickUtils.add_candle_identifiers.
+        :param target_r: Fallback target in multiples of risk.
+        """
+        self.interval = interval
+        self.base_candle_threshold = base_candle_threshold
+        self.exciting_candle_threshold = exciting_candle_threshold
+        self.gap_threshold = gap_threshold
+        self.target_r = target_r
+
+    # ------------------------------------------------------------------
+    #                   SINGLE FRAME
+    # ------------------------------------------------------------------
+
+    def run_frame(self, stock_data, stock_code=''):
+        """
+        Backtests every zone in one OHLC frame.
+
+        :return: List of trade dicts (see simulate).
+        """
+        stock_data = CandleStickUtils.add_candle_identifiers(
+            stock_data.copy(), self.base_candle_threshold, self.exciting_candle_threshold, self.gap_threshold)
+        return self.run_arrays(ZoneScanner.candle_arrays(stock_data), stock_data.index, stock_code)
+
+    def run_arrays(self, arrays, dates, stock_code=''):
+        """
+        Backtests every zone in one frame given as ZoneScanner.candle_arrays.
+
+        :param dates: Bar timestamps, used to label when each zone formed.
+        :return: List of trade dicts (see simulate).
+        """
+        specs = {}
+        for zone_type in ('Demand', 'Supply'):
+            state = ScanState(zone_type, self.interval)
+            ZoneScanner.advance(state, arrays)
+            specs[zone_type] = state.specs
+
+        trades = []
+        for zone_type, opposite in (('Demand', 'Supply'), ('Supply', 'Demand')):
+            # Opposing zones as (formed-at bar, proximal) for target lookups
+            opposing = np.array([[s['end'], s['proximal']] for s in specs[opposite]], dtype=float).reshape(-1, 2)
+            for spec in specs[zone_type]:
+                trade = self.simulate(arrays, zone_type, spec, opposing)
+                if trade is None:
+                    continue
+                trade['symbol'] = stock_code
+                trade['formed'] = dates[spec['end']].isoformat()
+                trades.append(trade)
+        return trades
+
+    def simulate(self, arrays, zone_type, spec, opposing):
+        """
+        Replays one zone against the bars after it formed.
+
+        Long (Demand): entry on the first low at or below proximal, filled at the
+        open when the bar gaps through; stop on a low at or below distal; target on
+        a high at or above the target from the next bar on. Short (Supply) mirrors
+        this. When stop and target fall on the same bar the stop is assumed to come first.
+
+        :return: Trade dict with 'zone_type', 'zone_id', 'entry', 'stoploss', 'target',
+                 'outcome', 'r_multiple' and bar offsets 'touch_bars', 'exit_bars',
+                 or None when the zone has no risk (proximal == distal).
+        """
+        high, low, open_, close = arrays['high'], arrays['low'], arrays['open'], arrays['close']
+        n = len(close)
+        long = zone_type == 'Demand'
+        entry = float(spec['proximal'])
+        stop = float(spec['distal'])
+        risk = entry - stop if long else stop - entry
+        if risk <= 0:
+            return None
+
+        formed = spec['end']
+        start = formed + 1
+        touch_mask = low[start:] <= entry if long else high[start:] >= entry
+        touch = _first(touch_mask)
+
+        trade = {
+            'zone_type': zone_type,
+            'zone_id': spec['zone_id'],
+            'entry': round(entry, 2),
+            'stoploss': round(stop, 2),
+            'target': None,
+            'outcome': 'untouched',
+            'r_multiple': 0.0,
+            'touch_bars': None,
+            'exit_bars': None,
+        }
+        if touch is None:
+            return trade
+
+        j = start + touch
+        target = self.target_for(zone_type, entry, risk, opposing, j)
+        fill = min(open_[j], entry) if long else max(open_[j], entry)
+        trade.update(target=round(target, 2), touch_bars=touch + 1)
+
+        # The target only counts from the bar after entry: within the entry bar the
+        # extreme beyond the entry may well have printed before the fill
+        if long:
+            stop_hit = _first(low[j:] <= stop)
+            target_hit = _first(high[j + 1:] >= target)
+        else:
+            stop_hit = _first(high[j:] >= stop)
+            target_hit = _first(low[j + 1:] <= target)
+        if target_hit is not None:
+            target_hit += 1
+
+        if stop_hit is not None and (target_hit is None or stop_hit <= target_hit):
+            k = j + stop_hit
+            exit_price = (min(open_[k], stop) if long else max(open_[k], stop)) if k > j else stop
+            trade.update(outcome='stop', exit_bars=stop_hit)
+        elif target_hit is not None:
+            k = j + target_hit
+            exit_price = max(open_[k], target) if long else min(open_[k], target)
+            trade.update(outcome='target', exit_bars=target_hit)
+        else:
+            # Still open at the end of the data: mark to the last close
+            exit_price = close[n - 1]
+            trade.update(outcome='open', exit_bars=n - 1 - j)
+
+        pnl = exit_price - fill if long else fill - exit_price
+        trade['r_multiple'] = round(float(pnl / risk), 3)
+        return trade
+
+    def target_for(self, zone_type, entry, risk, opposing, entry_bar):
+        """
+        Nearest opposing zone proximal beyond the entry among zones formed before the
+        entry bar, else entry ± target_r × risk.
+        """
+        if len(opposing):
+            known = opposing[opposing[:, 0] < entry_bar, 1]
+            beyond = known[known > entry] if zone_type == 'Demand' else known[known < entry]
+            if len(beyond):
+                return float(beyond.min() if zone_type == 'Demand' else beyond.max())
+        return entry + self.target_r * risk if zone_type == 'Demand' else entry - self.target_r * risk
+
+    # ------------------------------------------------------------------
+    #                   UNIVERSE
+    # ------------------------------------------------------------------
+
+    def run_symbol(self, source):
+        """
+        Loads and backtests one symbol. Runs inside worker processes.
+
+        :param source: ('synthetic', code, bars, seed) or ('fetch', code, period).
+        """
+        try:
+            return self.run_frame(self.load_frame(source, self.interval), source[1])
+        except Exception as e:
+            logging.error("Backtest failed for %s: %s", source[1], e)
+            return []
+
+    @staticmethod
+    def load_frame(source, interval='1d'):
+        """
+        Loads the OHLC columns for one universe entry.
+
+        :param source: ('synthetic', code, bars, seed) or ('fetch', code, period).
+        """
+        if source[0] == 'synthetic':
+            frame = synthetic_ohlcv(source[1], interval, source[2], seed=source[3])
+        else:
+            frame = DataFetcher.fetch_stock_data(source[1], interval=interval, period=source[2])
+        return frame[['Open', 'High', 'Low', 'Close']]
+
+    def run(self, sources, workers=BACKTEST_WORKERS):
+        """
+        Backtests a universe of symbols, in parallel when workers > 1.
+
+        :return: Flat list of trades across all symbols.
+        """
+        sources = list(sources)
+        if workers <= 1 or len(sources) <= 1:
+            results = [self.run_symbol(source) for source in sources]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                chunksize = max(1, len(sources) // (workers * 4))
+                results = list(pool.map(self.run_symbol, sources, chunksize=chunksize))
+        return [trade for trades in results for trade in trades]
+
+    # ------------------------------------------------------------------
+    #                   REPORTING
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def summarize(trades):
+        """
+        Aggregates trades per zone type.
+
+        :return: {zone_type: {'zones', 'touched', outcome counts, 'hit_rate' (targets over
+                 closed trades), 'avg_r', 'total_r', 'median_touch_bars', 'median_exit_bars'}}
+        """
+        summary = {}
+        for zone_type in ('Demand', 'Supply', 'All'):
+            rows = [t for t in trades if zone_type in ('All', t['zone_type'])]
+            touched = [t for t in rows if t['outcome'] != 'untouched']
+            counts = {outcome: sum(1 for t in rows if t['outcome'] == outcome) for outcome in OUTCOMES}
+            closed = counts['target'] + counts['stop']
+            r_values = np.array([t['r_multiple'] for t in touched], dtype=float)
+            summary[zone_type] = {
+                'zones': len(rows),
+                'touched': len(touched),
+                **counts,
+                'hit_rate': counts['target'] / closed if closed else None,
+                'avg_r': float(r_values.mean()) if len(r_values) else None,
+                'total_r': float(r_values.sum()),
+                'median_touch_bars': _median([t['touch_bars'] for t in touched]),
+                'median_exit_bars': _median([t['exit_bars'] for t in touched]),
+            }
+        return summary
+
+    @staticmethod
+    def format_report(summary, symbols, elapsed):
+        lines = [f"Backtested {symbols} symbols in {elapsed:.1f}s"]
+        lines.append(f"{'zones':<8}{'count':>7}{'touched':>9}{'target':>8}{'stop':>7}{'open':>7}"
+                     f"{'hit%':>7}{'avg R':>8}{'total R':>9}{'touch bars':>12}{'exit bars':>11}")
+        for zone_type, row in summary.items():
+            hit_rate = f"{row['hit_rate'] * 100:.1f}" if row['hit_rate'] is not None else '-'
+            avg_r = f"{row['avg_r']:.2f}" if row['avg_r'] is not None else '-'
+            lines.append(
+                f"{zone_type:<8}{row['zones']:>7}{row['touched']:>9}{row['target']:>8}{row['stop']:>7}"
+                f"{row['open']:>7}{hit_rate:>7}{avg_r:>8}{row['total_r']:>9.1f}"
+                f"{_text(row['median_touch_bars']):>12}{_text(row['median_exit_bars']):>11}"
+            )
+        return "\n".join(lines)
+
+
+def universe_sources(symbols=None, period='10y', synthetic=0, bars=2520):
+    """
+    Builds load_frame sources from a comma-separated symbol list plus synthetic symbols.
+    """
+    sources = []
+    if symbols:
+        sources += [('fetch', s.strip().upper(), period) for s in symbols.split(',') if s.strip()]
+    sources += [('synthetic', f"SYN{seed}", bars, seed) for seed in range(synthetic)]
+    return sources
+
+
+def _first(mask):
+    """
+    Offset of the first True in a boolean array, or None.
+    """
+    if not len(mask):
+        return None
+    idx = int(np.argmax(mask))
+    return idx if mask[idx] else None
+
+
+def _median(values):
+    values = [v for v in values if v is not None]
+    return float(np.median(values)) if values else None
+
+
+def _text(value):
+    return '-' if value is None else f"{value:.0f}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest demand/supply zones against later price action.")
+    parser.add_argument('--symbols', help="Comma-separated symbols fetched through DataFetcher.")
+    parser.add_argument('--period', default='10y', help="History period for --symbols.")
+    parser.add_argument('--synthetic', type=int, default=0, help="Number of synthetic symbols to add.")
+    parser.add_argument('--bars', type=int, default=2520, help="Bars per synthetic symbol.")
+    parser.add_argument('--interval', default='1d')
+    parser.add_argument('--target-r', type=float, default=DEFAULT_TARGET_R)
+    parser.add_argument('--workers', type=int, default=BACKTEST_WORKERS)
+    parser.add_argument('--json', help="Write the summary and all trades to this file.")
+    args = parser.parse_args(argv)
+
+    sources = universe_sources(args.symbols, args.period, args.synthetic, args.bars)
+    if not sources:
+        parser.error("give --symbols and/or --synthetic")
+
+    backtester = ZoneBacktester(interval=args.interval, target_r=args.target_r)
+    started = time.perf_counter()
+    trades = backtester.run(sources, args.workers)
+    summary = ZoneBacktester.summarize(trades)
+    print(ZoneBacktester.format_report(summary, len(sources), time.perf_counter() - started))
+
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump({'summary': summary, 'trades': trades}, handle, indent=2, default=str)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
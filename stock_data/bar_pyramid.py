@@ -0,0 +1,103 @@
+"""
+Multi-resolution OHLC pyramid for zoom and pan.
+
+Level 0 holds every bar; each further level merges PYRAMID_FACTOR consecutive
+buckets of the level below (first open, highest high, lowest low, last close),
+down to about PYRAMID_MIN_BARS buckets. A range query picks the finest level
+whose bars in [start, end] still fit the requested pixel width, so an initial
+chart can stay small while a zoomed-in view is served at full resolution.
+"""
+import os
+import numpy as np
+import pandas as pd
+
+PYRAMID_FACTOR = int(os.environ.get('PYRAMID_FACTOR', '4'))
+PYRAMID_MIN_BARS = int(os.environ.get('PYRAMID_MIN_BARS', '256'))
+# Horizontal pixels a candle needs to stay readable
+PIXELS_PER_BAR = float(os.environ.get('PIXELS_PER_BAR', '2'))
+
+
+class BarPyramid:
+    def __init__(self, stock_data, factor=PYRAMID_FACTOR, min_bars=PYRAMID_MIN_BARS):
+        """
+        :param stock_data: Frame with Open/High/Low/Close and a DatetimeIndex.
+        """
+        index = pd.DatetimeIndex(stock_data.index)
+        self.tz = index.tz
+        level = {
+            'times': (index.tz_convert('UTC') if index.tz is not None else index).asi8,
+            'open': stock_data['Open'].to_numpy(dtype=float),
+            'high': stock_data['High'].to_numpy(dtype=float),
+            'low': stock_data['Low'].to_numpy(dtype=float),
+            'close': stock_data['Close'].to_numpy(dtype=float),
+            'bars': np.ones(len(index), dtype=np.int64),
+        }
+        self.levels = [level]
+        while len(level['times']) > min_bars and factor > 1:
+            level = self.merge(level, factor)
+            self.levels.append(level)
+
+    @staticmethod
+    def merge(level, factor):
+        """
+        Next coarser level: every factor consecutive buckets become one.
+        """
+        n = len(level['times'])
+        starts = np.arange(0, n, factor)
+        ends = np.r_[starts[1:], n]
+        return {
+            'times': level['times'][starts],
+            'open': level['open'][starts],
+            'high': np.maximum.reduceat(level['high'], starts),
+            'low': np.minimum.reduceat(level['low'], starts),
+            'close': level['close'][ends - 1],
+            'bars': np.add.reduceat(level['bars'], starts),
+        }
+
+    def timestamp(self, value):
+        """
+        Nanosecond UTC time of value; naive values are read in the frame's timezone,
+        which is how Plotly reports axis ranges.
+        """
+        stamp = pd.Timestamp(value)
+        if stamp.tz is None and self.tz is not None:
+            stamp = stamp.tz_localize(self.tz)
+        elif stamp.tz is not None and self.tz is None:
+            stamp = stamp.tz_convert(None)
+        return stamp.value
+
+    def query(self, start=None, end=None, width=1200):
+        """
+        Bars covering [start, end] at the finest level that fits width pixels, plus
+        one bucket either side so the visible range is fully covered while panning.
+
+        :return: (level number, level dict sliced to the range)
+        """
+        max_bars = max(int(width / PIXELS_PER_BAR), 1)
+        lo_time = self.timestamp(start) if start is not None else None
+        hi_time = self.timestamp(end) if end is not None else None
+
+        for number, level in enumerate(self.levels):
+            times = level['times']
+            lo = 0 if lo_time is None else max(int(np.searchsorted(times, lo_time, side='right')) - 1, 0)
+            hi = len(times) if hi_time is None else int(np.searchsorted(times, hi_time, side='right'))
+            if hi - lo <= max_bars or number == len(self.levels) - 1:
+                lo = max(lo - 1, 0)
+                hi = min(hi + 1, len(times))
+                return number, {key: values[lo:hi] for key, values in level.items()}
+
+    def to_json(self, number, level):
+        index = pd.DatetimeIndex(level['times'])
+        if self.tz is not None:
+            # Wall-clock times, as Plotly draws the chart's own (timezone-aware) dates
+            index = index.tz_localize('UTC').tz_convert(self.tz).tz_localize(None)
+        return {
+            'level': number,
+            'levels': len(self.levels),
+            'x': [stamp.isoformat() for stamp in index],
+            'open': level['open'].tolist(),
+            'high': level['high'].tolist(),
+            'low': level['low'].tolist(),
+            'close': level['close'].tolist(),
+            'bars': level['bars'].tolist(),
+        }
@@ -1,12 +1,20 @@
 
-import plotly.graph_objects as go
+import os
+import numpy as np
 import logging
 
+# Candle classification parameters (see python -m stock_data.param_sweep for tuning)
+BASE_CANDLE_THRESHOLD = float(os.environ.get('BASE_CANDLE_THRESHOLD', '0.5'))
+EXCITING_CANDLE_THRESHOLD = float(os.environ.get('EXCITING_CANDLE_THRESHOLD', '0.5'))
+# Open beyond the previous close by this fraction marks a gap candle
+GAP_THRESHOLD = float(os.environ.get('GAP_THRESHOLD', '0.03'))
+
 
 class CandleStickUtils:
 
     @staticmethod
-    def add_candle_identifiers(stock_data, base_candle_threshold, exciting_candle_threshold):
+    def add_candle_identifiers(stock_data, base_candle_threshold, exciting_candle_threshold,
+                               gap_threshold=GAP_THRESHOLD):
     
        stock_data['Body'] = abs(stock_data['Close'] - stock_data['Open'])
        stock_data['UpperWick'] = stock_data['High'] - stock_data[['Close', 'Open']].max(axis=1)
@@ -18,12 +26,12 @@ class CandleStickUtils:
        )
     
        stock_data['GapUp'] = (
-           stock_data['Open'] >= stock_data['Close'].shift(1) * 1.03
+           stock_data['Open'] >= stock_data['Close'].shift(1) * (1 + gap_threshold)
        )
     
        # Add GapDown identifier
        stock_data['GapDown'] = (
-           stock_data['Open'] <= stock_data['Close'].shift(1) * 0.97
+           stock_data['Open'] <= stock_data['Close'].shift(1) * (1 - gap_threshold)
        )
     
        stock_data['ExcitingCandle'] = (
@@ -34,8 +42,32 @@ class CandleStickUtils:
     
        return stock_data
 
+    @staticmethod
+    def identifier_arrays(open_, high, low, close, prev_close, base_candle_threshold,
+                          exciting_candle_threshold, gap_threshold=GAP_THRESHOLD):
+        """
+        numpy equivalent of add_candle_identifiers for callers holding raw arrays.
+
+        :param prev_close: Close of the preceding bar for each bar (NaN for the first).
+        :return: Dict of boolean arrays 'base', 'exciting', 'gap_up', 'gap_down'.
+        """
+        body = np.abs(close - open_)
+        upper_wick = high - np.maximum(close, open_)
+        lower_wick = np.minimum(close, open_) - low
+
+        # A NaN previous close compares False, as the pandas shift does
+        with np.errstate(invalid='ignore'):
+            gap_up = open_ >= prev_close * (1 + gap_threshold)
+            gap_down = open_ <= prev_close * (1 - gap_threshold)
+        base = (upper_wick > base_candle_threshold * body) | (lower_wick > base_candle_threshold * body)
+        exciting = (
+            (upper_wick < exciting_candle_threshold * body) & (lower_wick < exciting_candle_threshold * body)
+        ) | gap_up
+        return {'base': base, 'exciting': exciting, 'gap_up': gap_up, 'gap_down': gap_down}
+
     @staticmethod
     def highlightCandlesAsExcitingOrBase(stock_data):
+        import plotly.graph_objects as go
         fig = go.Figure(data=[go.Candlestick(
             x=stock_data.index,
             open=stock_data['Open'],
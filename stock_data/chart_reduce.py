@@ -0,0 +1,126 @@
+"""
+Chart-data reduction for long candlestick charts.
+
+Candles are aggregated into OHLC buckets (first open, highest high, lowest low,
+last close) sized so a chart carries about CHART_MAX_POINTS candles, and line
+traces such as the EMA are thinned with Largest-Triangle-Three-Buckets, which
+keeps the visual extremes of the line. Bars that form zones are never merged:
+each is kept as its own bucket so the zone rectangles line up with real candles.
+"""
+import os
+import numpy as np
+import pandas as pd
+
+# Candles (and line points) per chart before reduction kicks in; 0 disables it
+CHART_MAX_POINTS = int(os.environ.get('CHART_MAX_POINTS', '1500'))
+
+
+class ChartReducer:
+
+    @staticmethod
+    def keep_positions(index, zones):
+        """
+        Positions in index of every bar that forms one of the zones.
+
+        :param zones: Zone dicts with 'dates'; dates not on index (e.g. merged monthly
+                      zones on a daily chart) are ignored.
+        """
+        dates = [date for zone in zones for date in zone.get('dates', [])]
+        if not dates:
+            return np.array([], dtype=np.int64)
+        positions = index.get_indexer(pd.DatetimeIndex(dates))
+        return np.unique(positions[positions >= 0])
+
+    @staticmethod
+    def bucket_starts(n, max_points, keep=()):
+        """
+        Start positions of the buckets covering n bars: regular buckets sized for
+        max_points, split so that every kept position is a bucket of its own. Only
+        when the kept bars alone need more than max_points buckets is it exceeded.
+        """
+        if max_points <= 0 or n <= max_points:
+            return np.arange(n)
+        keep = np.asarray(keep, dtype=np.int64)
+        # Each kept bar starts a bucket and the one after it; those come out of the budget
+        boundaries = np.union1d(keep, keep + 1)
+        boundaries = boundaries[boundaries < n]
+        regular = max(max_points - len(boundaries), 1)
+        starts = np.unique(np.linspace(0, n, regular, endpoint=False).astype(np.int64))
+        return np.union1d(starts, boundaries)
+
+    @staticmethod
+    def ohlc_buckets(stock_data, max_points=CHART_MAX_POINTS, keep=()):
+        """
+        Aggregates candles into buckets.
+
+        :param stock_data: Frame with Open/High/Low/Close (plus, optionally, the
+                           BaseCandle/ExcitingCandle flags).
+        :param keep: Positions that must stay single-bar buckets.
+        :return: Frame indexed by each bucket's first timestamp with Open/High/Low/Close,
+                 'Bars' (bars per bucket) and the candle flags, which are only kept
+                 on single-bar buckets.
+        """
+        n = len(stock_data)
+        starts = ChartReducer.bucket_starts(n, max_points, keep)
+        if len(starts) == n:
+            return stock_data
+
+        ends = np.r_[starts[1:], n]
+        high = stock_data['High'].to_numpy()
+        low = stock_data['Low'].to_numpy()
+        bucket = pd.DataFrame({
+            'Open': stock_data['Open'].to_numpy()[starts],
+            'High': np.maximum.reduceat(high, starts),
+            'Low': np.minimum.reduceat(low, starts),
+            'Close': stock_data['Close'].to_numpy()[ends - 1],
+            'Bars': ends - starts,
+        }, index=stock_data.index[starts])
+
+        single = bucket['Bars'].to_numpy() == 1
+        for column in ('BaseCandle', 'ExcitingCandle'):
+            if column in stock_data:
+                bucket[column] = stock_data[column].to_numpy(dtype=bool)[starts] & single
+        return bucket
+
+    @staticmethod
+    def lttb_indices(y, threshold, keep=()):
+        """
+        Largest-Triangle-Three-Buckets over evenly spaced points.
+
+        :param y: Values of the line (x is taken as the position).
+        :param threshold: Number of points to keep; 0, or at least len(y), keeps all.
+        :param keep: Positions always included in the result.
+        :return: Sorted positions of the selected points.
+        """
+        y = np.asarray(y, dtype=float)
+        n = len(y)
+        if threshold <= 0 or n <= threshold or threshold < 3:
+            return np.arange(n)
+        keep = np.unique(np.asarray(keep, dtype=np.int64))
+        keep = keep[(keep >= 0) & (keep < n)]
+        # Kept points come out of the budget
+        threshold = max(threshold - len(keep), 3)
+
+        selected = np.empty(threshold, dtype=np.int64)
+        selected[0] = 0
+        selected[-1] = n - 1
+        # Interior points split into threshold - 2 buckets
+        edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+        a = 0
+        for b in range(threshold - 2):
+            start, end = edges[b], max(edges[b + 1], edges[b] + 1)
+            if b + 2 < len(edges):
+                next_start, next_end = edges[b + 1], max(edges[b + 2], edges[b + 1] + 1)
+            else:
+                next_start, next_end = n - 1, n
+            avg_x = (next_start + next_end - 1) / 2.0
+            avg_y = np.nanmean(y[next_start:next_end])
+
+            xs = np.arange(start, end)
+            areas = np.abs((a - avg_x) * (y[start:end] - y[a]) - (a - xs) * (avg_y - y[a]))
+            a = start + int(np.nanargmax(areas)) if np.isfinite(areas).any() else start
+            selected[b + 1] = a
+
+        if len(keep):
+            selected = np.union1d(selected, keep)
+        return np.unique(selected)
@@ -0,0 +1,66 @@
+"""
+Chart payloads for the client-side chart cache.
+
+/api/charts/<symbol> returns the all-zones and fresh-zones figures of one
+interval as Plotly JSON, with the same versioning as the zones API: the ETag
+covers the request and the data version of every frame the chart is drawn
+from, and a client holding the current ETag gets a 304 without any chart being
+built. The browser keeps the payloads in IndexedDB (static/js/main.js), so
+revisiting a symbol costs one conditional request per chart. Large charts are
+encoded in the compute pool (stock_data.compute_pool).
+"""
+from stock_data.demand_zone_manager import DemandZoneManager
+from stock_data.compute_pool import compute_pool
+from stock_data.zones_api import ZonesApi, ZonesApiError, ZONES_API_INTERVALS
+
+# Bump when the payload layout changes so old ETags stop matching
+CHARTS_API_SCHEMA = 1
+# Intervals whose zones are merged into another interval's chart
+MERGED_INTERVALS = {'1d': ['1mo']}
+
+
+class ChartsApi(ZonesApi):
+    schema = ('charts', CHARTS_API_SCHEMA)
+    metrics_name = 'charts_api'
+
+    @staticmethod
+    def chart_intervals(interval):
+        """
+        :return: The intervals a chart of interval is drawn from, in processing order
+                 (the chart's own interval last).
+        """
+        if interval not in ZONES_API_INTERVALS:
+            raise ZonesApiError(f"Unsupported interval: {interval}")
+        return MERGED_INTERVALS.get(interval, []) + [interval]
+
+    def get_chart(self, symbol, interval, period, if_none_match=None, admit=None):
+        """
+        :return: (etag, body) where body is None when the client's copy is current.
+        """
+        return self.get(symbol, self.chart_intervals(interval), period, False, if_none_match, admit)
+
+    def build(self, symbol, intervals, period, fresh, slices, versions):
+        """
+        Figures of the last of intervals; the ones before it only contribute merged zones.
+        """
+        interval = intervals[-1]
+        if interval not in slices:
+            raise ZonesApiError(f"No {interval} data for {symbol}", status=404)
+        manager = DemandZoneManager(symbol)
+        zones = None
+        for name in intervals:
+            if name in slices:
+                zones = manager.compute_zones(slices[name], name)
+        return {
+            'symbol': symbol,
+            'interval': interval,
+            'period': period,
+            'data_version': versions,
+            'charts': manager.chart_figures(slices[interval], interval, zones),
+        }
+
+    def serialize(self, payload):
+        # Plotly's encoder writes the numpy arrays and dates exactly as the inline charts did
+        from plotly.io.json import to_json_plotly
+        candles = payload['charts']['all_zones']['data'][0]['x']
+        return compute_pool.run(to_json_plotly, payload, bars=len(candles))
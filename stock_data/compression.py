@@ -0,0 +1,89 @@
+"""
+Content-Encoding negotiation and on-the-fly response compression.
+
+HTML and JSON responses of at least COMPRESS_MIN_SIZE bytes are compressed
+with brotli when the client accepts it and the ``brotli`` package is
+installed, and with gzip otherwise. Streamed responses (SSE, file downloads)
+and responses that already carry a Content-Encoding are left alone.
+"""
+import os
+import gzip
+import logging
+from stock_data.metrics import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent as-is (roughly one TCP segment)
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', '1400'))
+# Per-request levels; static assets are compressed at the maximum levels at build time
+COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', '6'))
+COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', '5'))
+COMPRESSIBLE_TYPES = {'text/html', 'application/json', 'text/plain', 'text/css',
+                      'text/javascript', 'application/javascript', 'image/svg+xml'}
+
+
+def available_encodings():
+    """
+    Encodings this process can produce, most preferred first.
+    """
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def choose_encoding(accept_encodings, encodings=None):
+    """
+    :param accept_encodings: The request's parsed Accept-Encoding (werkzeug Accept).
+    :param encodings: Candidate encodings, most preferred first (default: available_encodings()).
+    :return: The encoding to use, or None for identity.
+    """
+    for encoding in encodings if encodings is not None else available_encodings():
+        # Accept's item lookup is the quality, 0 when not acceptable
+        if accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+
+def compress(data, encoding, build=False):
+    """
+    :param build: Use the slow maximum levels of the build-time asset step.
+    """
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if build else COMPRESS_BROTLI_QUALITY)
+    if encoding == 'gzip':
+        # mtime=0 keeps the output reproducible, so asset builds are byte-identical
+        return gzip.compress(data, compresslevel=9 if build else COMPRESS_GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def compress_response(response, accept_encodings):
+    """
+    Compresses a Flask response in place when it is worth it.
+
+    :return: The response.
+    """
+    if (response.direct_passthrough or response.is_streamed or response.status_code < 200
+            or response.status_code in (204, 206, 304) or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+    encoding = choose_encoding(accept_encodings)
+    if encoding is None:
+        return response
+
+    body = compress(data, encoding)
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    # The compressed body is a different byte sequence; keep the validator, but as a weak one
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    metrics.inc('response_compressed_total', encoding=encoding)
+    metrics.inc('response_compressed_bytes_saved_total', len(data) - len(body))
+    logging.debug("Compressed %s response %s -> %s bytes (%s)", response.mimetype, len(data), len(body), encoding)
+    return response
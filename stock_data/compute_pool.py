@@ -0,0 +1,169 @@
+"""
+Process pool for the CPU-bound stages of a request.
+
+Zone scanning and chart serialization hold the GIL, so under the threaded
+serving mode one large symbol stalls every other request of the worker. Those
+stages are sent here instead and run in COMPUTE_WORKERS forked processes that
+are started with the web worker (gunicorn.conf.py post_fork), so they inherit
+its imported modules and warmed caches. The pool is only forked by start() in a
+still single-threaded process, since forking next to running threads can
+leave a child holding a lock nobody will release; until then (and in the dev
+server or scripts) every task runs inline.
+
+Bars travel through shared memory (stock_data.shared_ohlcv): the parent copies
+a frame into a block once and the child maps it, so only a block name and the
+small results cross the pipe.
+
+At most COMPUTE_WORKERS + COMPUTE_QUEUE_DEPTH tasks are in flight per worker.
+A caller that finds the pool full waits up to COMPUTE_SUBMIT_TIMEOUT seconds
+for a slot and then gets ComputePoolBusy, which the app answers with 503 and
+Retry-After instead of queueing without bound. Work smaller than
+COMPUTE_MIN_BARS runs inline, as does everything when COMPUTE_WORKERS is 0.
+"""
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from multiprocessing import resource_tracker
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from stock_data.metrics import metrics
+
+# Processes per web worker; 0 runs every task inline
+COMPUTE_WORKERS = int(os.environ.get('COMPUTE_WORKERS', '2'))
+# Tasks allowed to wait for a busy process before callers are held back
+COMPUTE_QUEUE_DEPTH = int(os.environ.get('COMPUTE_QUEUE_DEPTH', '8'))
+# Seconds a caller waits for a free slot before ComputePoolBusy
+COMPUTE_SUBMIT_TIMEOUT = float(os.environ.get('COMPUTE_SUBMIT_TIMEOUT', '5'))
+# Tasks over fewer bars than this are cheaper inline than through the pool
+COMPUTE_MIN_BARS = int(os.environ.get('COMPUTE_MIN_BARS', '1000'))
+
+# Set in the pool's own processes, which always run tasks inline
+_in_child = False
+
+
+class ComputePoolBusy(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Compute pool saturated; retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _init_child():
+    global _in_child
+    _in_child = True
+    # The forked logging listener thread is gone; records would pile up unwritten
+    from stock_data.logging_config import LoggingPipeline
+    LoggingPipeline.restart_after_fork()
+
+
+def _noop():
+    return os.getpid()
+
+
+class ComputePool:
+    def __init__(self, workers=COMPUTE_WORKERS, queue_depth=COMPUTE_QUEUE_DEPTH,
+                 submit_timeout=COMPUTE_SUBMIT_TIMEOUT, min_bars=COMPUTE_MIN_BARS):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.submit_timeout = submit_timeout
+        self.min_bars = min_bars
+        self._executor = None
+        self._pid = None
+        self._slots = threading.BoundedSemaphore(max(workers, 1) + max(queue_depth, 0))
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    #                   LIFECYCLE
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """
+        Forks the pool's processes (a fork-context pool starts all of them on its first
+        task). Call it before the process starts any threads; in a process that already
+        has some the pool is left off and tasks keep running inline.
+        """
+        if self.workers <= 0 or _in_child or self.started():
+            return
+        if threading.active_count() > 1:
+            logging.warning("Compute pool not started: %s threads already running", threading.active_count())
+            return
+        # Children must share the parent's tracker, not start their own, or every block
+        # they map is reported leaked and unlinked twice
+        resource_tracker.ensure_running()
+        executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('fork'),
+                                       initializer=_init_child)
+        executor.submit(_noop).result()
+        with self._lock:
+            self._executor = executor
+            self._pid = os.getpid()
+        logging.info("Compute pool started with %s processes", self.workers)
+
+    def started(self):
+        """
+        Whether this process has its own pool (a forked web worker does not own its
+        parent's).
+        """
+        return self._executor is not None and self._pid == os.getpid()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None and self._pid == os.getpid():
+            executor.shutdown(wait=True)
+
+    # ------------------------------------------------------------------
+    #                   TASKS
+    # ------------------------------------------------------------------
+
+    def offloads(self, bars=None):
+        """
+        Whether a task of this many bars would go to the pool rather than run inline.
+        """
+        return self.started() and (bars is None or bars >= self.min_bars)
+
+    def run(self, fn, *args, bars=None):
+        """
+        fn(*args) in a pool process, or inline when the pool is off or the task small.
+        fn and args must be picklable; the call blocks until the result is back.
+
+        :param bars: Size of the task in bars, compared with min_bars.
+        :raise ComputePoolBusy: No slot freed up within submit_timeout.
+        """
+        if not self.offloads(bars):
+            metrics.inc('compute_pool_tasks_total', mode='inline')
+            return fn(*args)
+
+        executor, slots = self._executor, self._slots
+        waited = time.perf_counter()
+        if not slots.acquire(timeout=self.submit_timeout):
+            metrics.inc('compute_pool_rejected_total')
+            raise ComputePoolBusy(max(1, round(self.submit_timeout)))
+        metrics.observe('compute_pool_slot_wait_seconds', time.perf_counter() - waited)
+        self._track(1)
+        try:
+            metrics.inc('compute_pool_tasks_total', mode='pool')
+            return executor.submit(fn, *args).result()
+        except BrokenProcessPool:
+            # A process died (e.g. OOM-killed). Re-forking from this threaded process is
+            # not safe, so the worker computes inline until it is recycled
+            logging.error("Compute pool broken; running tasks inline from now on")
+            metrics.inc('compute_pool_broken_total')
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            raise
+        finally:
+            self._track(-1)
+            slots.release()
+
+    def _track(self, delta):
+        with self._lock:
+            self._in_flight += delta
+            in_flight = self._in_flight
+        metrics.set_gauge('compute_pool_in_flight', in_flight)
+        metrics.set_gauge('compute_pool_queue_depth', max(0, in_flight - self.workers))
+
+
+compute_pool = ComputePool()
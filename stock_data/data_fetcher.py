@@ -1,10 +1,44 @@
-import yfinance as yf
+import os
+import sys
 import pandas as pd
 import logging
+from stock_data.replay_data import ReplayDataProvider
+
+# 'yahoo' (default) or 'replay' to serve recorded/synthetic frames from REPLAY_DATA_DIR
+DATA_PROVIDER = os.environ.get('DATA_PROVIDER', 'yahoo').lower()
+REPLAY_DATA_DIR = os.environ.get('REPLAY_DATA_DIR', './replay_data/')
+REPLAY_SYNTHESIZE = os.environ.get('REPLAY_SYNTHESIZE', 'False').lower() in ('true', '1')
+# When set, every frame fetched from Yahoo is also recorded here for later replay
+RECORD_DATA_DIR = os.environ.get('RECORD_DATA_DIR')
 
 class DataFetcher:
+    replay_provider = None
+    # yfinance sessions inherited over a fork; kept referenced so they are never closed here
+    _inherited_sessions = []
+
+    @staticmethod
+    def reset_after_fork():
+        """
+        Makes yfinance open its own HTTP session in a forked worker. A preloaded master
+        that fetched during warm-up hands every worker the same curl session (cookie,
+        crumb and keep-alive sockets); two workers must not talk TLS over one socket.
+        The inherited session is only dropped, not closed, as closing it would shut the
+        connections its siblings still hold.
+        """
+        yf_data = sys.modules.get('yfinance.data')
+        if yf_data is None:
+            return
+        instance = yf_data.SingletonMeta._instances.pop(yf_data.YfData, None)
+        if instance is not None:
+            DataFetcher._inherited_sessions.append(instance)
+
     @staticmethod
     def fetch_stock_data(stock_code, interval='1d', period='1y'):
+        if DATA_PROVIDER == 'replay':
+            if DataFetcher.replay_provider is None:
+                DataFetcher.replay_provider = ReplayDataProvider(REPLAY_DATA_DIR, synthesize=REPLAY_SYNTHESIZE)
+            return DataFetcher.replay_provider.fetch_stock_data(stock_code, interval=interval, period=period)
+
         # Mapping for known indices
         index_mapping = {
             "NIFTY50": "^NSEI",
@@ -27,14 +61,18 @@ class DataFetcher:
         else:
             ticker_symbol = f"{stock_code}.NS"
 
-        logging.debug(f"Fetching data for {ticker_symbol} from Yahoo Finance with interval {interval} and period {period}")
+        # yfinance (with curl_cffi) is only loaded once data is actually fetched from Yahoo
+        import yfinance as yf
+        logging.debug("Fetching data for %s from Yahoo Finance with interval %s and period %s", ticker_symbol, interval, period)
         data = yf.Ticker(ticker_symbol).history(period=period, interval=interval)
 
         if not data.empty:
             logging.debug("Data fetched successfully")
+            if RECORD_DATA_DIR:
+                ReplayDataProvider(RECORD_DATA_DIR).record(stock_code, interval, period, data)
             return data
         else:
-            logging.error(f"Failed to fetch data for {stock_code}")
+            logging.error("Failed to fetch data for %s", stock_code)
             raise ValueError(f"Failed to fetch data for {stock_code}")
 
 # Example usage:
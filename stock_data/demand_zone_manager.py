@@ -2,12 +2,14 @@ import itertools
 from stock_data.demand_zone_identifier import DemandZoneIdentifier
 from stock_data.supply_zone_identifier import SupplyZoneIdentifier
 from stock_data.demand_zone_utils import DemandZoneUtils
-from stock_data.candlestick_utils import CandleStickUtils
-from stock_data.plotter import Plotter
-from stock_data.data_fetcher import DataFetcher
+from stock_data.figure_builder import FigureBuilder
+from stock_data.period_cache import superset_cache
 from stock_data.stocks_config import special_stocks_map
+from stock_data.zone_engine_diff import ZoneEngineDiff
+from stock_data.compute_pool import compute_pool
+from stock_data.metrics import metrics
+from stock_data.memory_probe import MemoryProbe
 import logging
-import plotly.io as pio
 
 class DemandZoneManager:
     def __init__(self, stock_code, fig=None):
@@ -85,74 +87,6 @@ class DemandZoneManager:
 
         return zones
 
-    def identify_demand_zones(self, stock_data, interval, fresh=False):
-        """
-        Identifies demand zones from the stock data.
-
-        :param stock_data: DataFrame containing stock OHLC data.
-        :param interval: The interval for demand zone identification.
-        :param fresh: Boolean indicating whether to filter for fresh demand zones.
-        :return: List of identified demand zones.
-        """
-        demand_zones = DemandZoneIdentifier.identify_demand_zones(stock_data, interval)
-
-        if fresh:
-            demand_zones = [
-                zone for zone in demand_zones
-                if DemandZoneUtils.is_fresh_demand_zone(stock_data, zone)
-            ]
-
-        return demand_zones
-
-    def identify_supply_zones(self, stock_data, interval, fresh=False):
-        """
-        Identifies supply zones from the stock data.
-
-        :param stock_data: DataFrame containing stock OHLC data.
-        :param interval: The interval for supply zone identification.
-        :param fresh: Boolean indicating whether to filter for fresh supply zones.
-        :return: List of identified supply zones.
-        """
-        supply_zones = SupplyZoneIdentifier.identify_supply_zones(stock_data, interval)
-
-        if fresh:
-            supply_zones = [
-                zone for zone in supply_zones
-                if DemandZoneUtils.is_fresh_supply_zone(stock_data, zone)  # Ensure this utility exists
-            ]
-
-        return supply_zones
-
-    def mark_demand_zones_on_chart(self, demand_zones):
-        """
-        Marks the identified demand zones on the current Plotly figure.
-
-        :param demand_zones: List of demand zones to mark.
-        :return: Annotated Plotly figure.
-        """
-        CandleStickUtils.markDemandZoneInfoOnChart(
-            self.stock_code,
-            self.fig,
-            demand_zones,
-            self.colors
-        )
-        return self.fig
-
-    def mark_supply_zones_on_chart(self, supply_zones):
-        """
-        Marks the identified supply zones on the current Plotly figure.
-
-        :param supply_zones: List of supply zones to mark.
-        :return: Annotated Plotly figure.
-        """
-        CandleStickUtils.markDemandZoneInfoOnChart(
-            self.stock_code,
-            self.fig,
-            supply_zones,
-            self.supply_colors
-        )
-        return self.fig
-
     def generate_demand_zones_info(self, demand_zones):
         """
         Generates informational text about the identified demand zones.
@@ -171,17 +105,37 @@ class DemandZoneManager:
         """
         return DemandZoneUtils.generate_demand_zones_info(supply_zones)  # Ensure this utility exists
 
-    def process_single_interval(self, interval, period):
+    def shadow_check_slice(self, stock_data, interval, period_slice):
+        """
+        Compares the zones sliced from the superset scan with the legacy identifiers
+        run on the same bars, logging any difference. Never raises.
         """
-        Fetches stock data for the given interval & period, creates candlestick charts,
-        identifies and merges demand and supply zones, and returns all necessary components.
+        label = f"{self.stock_code}:{interval}"
+        try:
+            for zone_type, identify in (('Demand', DemandZoneIdentifier.identify_demand_zones),
+                                        ('Supply', SupplyZoneIdentifier.identify_supply_zones)):
+                stage = f"{zone_type.lower()}_slice"
+                mismatches = ZoneEngineDiff.diff_zones(identify(stock_data, interval), period_slice.all_zones(zone_type),
+                                                       label, interval, stage)
+                if mismatches:
+                    logging.warning("Superset slice mismatch for %s (%s): %d differences, first: %s",
+                                    label, stage, len(mismatches), mismatches[0])
+        except Exception as e:
+            logging.error("Superset slice shadow check failed for %s: %s", label, e)
+
+    def process_single_interval(self, interval, period, render_charts=True):
+        """
+        Slices the bars and zones for the given interval & period from the superset cache,
+        creates candlestick charts, merges demand and supply zones, and returns all necessary components.
 
         :param interval: The interval (e.g., '1mo', '1wk', '1d').
         :param period: The period over which to fetch data (e.g., '6mo', '1y').
+        :param render_charts: Build the chart HTML; when False both charts are None
+                              (the page loads them from /api/charts instead).
         :return: A dictionary containing:
             {
-                'chart_all_zones': (str) HTML of chart with all zones,
-                'chart_fresh_zones': (str) HTML of chart with fresh zones,
+                'chart_all_zones': (str|None) HTML of chart with all zones,
+                'chart_fresh_zones': (str|None) HTML of chart with fresh zones,
                 'all_zones_info': (str) info about all zones,
                 'fresh_zones_info': (str) info about fresh zones,
                 'all_zones': {'demand': list, 'supply': list},
@@ -189,66 +143,97 @@ class DemandZoneManager:
                 'current_price': (float|None) last close if interval == '1d', else None
             }
         """
-        stock_data = DataFetcher.fetch_stock_data(self.stock_code, interval=interval, period=period)
+        with metrics.span('slice', interval):
+            period_slice = superset_cache.slice(self.stock_code, interval, period)
+        stock_data = period_slice.frame
         if stock_data.empty:
             return {}
 
-        plotter = Plotter()
-        base_fig = plotter.create_candlestick_chart(stock_data, self.stock_code, interval)
-        self.fig = base_fig
-
-        demand_zones_all = self.identify_demand_zones(stock_data, interval, fresh=False)
-        demand_zones_all = self.include_higher_tf_zones_in_lower_tf_zones(interval, demand_zones_all, 'all', 'demand')
+        if ZoneEngineDiff.shadow_sampled():
+            self.shadow_check_slice(stock_data, interval, period_slice)
 
-        supply_zones_all = self.identify_supply_zones(stock_data, interval, fresh=False)
-        supply_zones_all = self.include_higher_tf_zones_in_lower_tf_zones(interval, supply_zones_all, 'all', 'supply')
+        zones = self.compute_zones(period_slice, interval)
+        demand_zones_all, supply_zones_all = zones['all_zones']['demand'], zones['all_zones']['supply']
+        demand_zones_fresh, supply_zones_fresh = zones['fresh_zones']['demand'], zones['fresh_zones']['supply']
 
-        fig_all_zones = self.mark_demand_zones_on_chart(demand_zones_all)
-        fig_all_zones = self.mark_supply_zones_on_chart(supply_zones_all)
-        chart_all_zones = pio.to_html(fig_all_zones, full_html=False)
-        all_zones_info = self.generate_demand_zones_info(demand_zones_all) + "\n" + self.generate_supply_zones_info(supply_zones_all)
+        chart_all_zones = chart_fresh_zones = None
+        if render_charts:
+            figures = self.chart_figures(period_slice, interval, zones)
+            with metrics.span('to_html', interval):
+                chart_all_zones, chart_fresh_zones = compute_pool.run(
+                    FigureBuilder.to_html_many, [figures['all_zones'], figures['fresh_zones']], bars=len(stock_data))
+            MemoryProbe.record_size('figure', figures['all_zones'], interval)
+            MemoryProbe.record_size('figure', figures['fresh_zones'], interval)
+            MemoryProbe.record_size('chart_html', chart_all_zones, interval)
+            MemoryProbe.record_size('chart_html', chart_fresh_zones, interval)
 
-        demand_zones_fresh = self.identify_demand_zones(stock_data, interval, fresh=True)
-        demand_zones_fresh = self.include_higher_tf_zones_in_lower_tf_zones(interval, demand_zones_fresh, 'fresh', 'demand')
+        with metrics.span('zones_info', interval):
+            all_zones_info = self.generate_demand_zones_info(demand_zones_all) + "\n" + self.generate_supply_zones_info(supply_zones_all)
+            fresh_zones_info = self.generate_demand_zones_info(demand_zones_fresh) + "\n" + self.generate_supply_zones_info(supply_zones_fresh)
 
-        supply_zones_fresh = self.identify_supply_zones(stock_data, interval, fresh=True)
-        supply_zones_fresh = self.include_higher_tf_zones_in_lower_tf_zones(interval, supply_zones_fresh, 'fresh', 'supply')
-
-        fig_fresh_zones = plotter.create_candlestick_chart(stock_data, self.stock_code, interval)
-        self.fig = fig_fresh_zones
-
-        fig_fresh_zones = self.mark_demand_zones_on_chart(demand_zones_fresh)
-        fig_fresh_zones = self.mark_supply_zones_on_chart(supply_zones_fresh)
-        chart_fresh_zones = pio.to_html(fig_fresh_zones, full_html=False)
-        fresh_zones_info = self.generate_demand_zones_info(demand_zones_fresh) + "\n" + self.generate_supply_zones_info(supply_zones_fresh)
-
-        current_price = None
-        if interval == '1d':
-            current_price = stock_data.iloc[-1]['Close']
+        MemoryProbe.record_size('dataframe', stock_data, interval)
+        MemoryProbe.record_size('zones', [demand_zones_all, supply_zones_all], interval)
+        MemoryProbe.record_size('zones', [demand_zones_fresh, supply_zones_fresh], interval)
 
         return {
             'chart_all_zones': chart_all_zones,
             'chart_fresh_zones': chart_fresh_zones,
             'all_zones_info': all_zones_info,
             'fresh_zones_info': fresh_zones_info,
-            'all_zones': {
-                'demand': demand_zones_all,
-                'supply': supply_zones_all
-            },
-            'fresh_zones': {
-                'demand': demand_zones_fresh,
-                'supply': supply_zones_fresh
-            },
-            'current_price': current_price
+            'all_zones': zones['all_zones'],
+            'fresh_zones': zones['fresh_zones'],
+            'current_price': zones['current_price']
         }
 
-    def process_all_intervals(self, intervals, period):
+    def chart_figures(self, period_slice, interval, zones):
+        """
+        The all-zones and fresh-zones figures of one interval, sharing one set of traces.
+
+        :param period_slice: PeriodSlice for the interval.
+        :param zones: compute_zones result for the same slice (merged zones included).
+        :return: {'all_zones': figure dict, 'fresh_zones': figure dict}
+        """
+        # The zones' own bars survive the chart's data reduction
+        chart_zones = period_slice.all_zones('Demand') + period_slice.all_zones('Supply')
+        with metrics.span('chart', interval):
+            base_fig = FigureBuilder.candlestick(period_slice.frame, self.stock_code, interval, chart_zones)
+        figures = {}
+        with metrics.span('mark_zones', interval):
+            for key in ('all_zones', 'fresh_zones'):
+                figures[key] = FigureBuilder.with_zones(base_fig, self.stock_code, zones[key]['demand'],
+                                                        zones[key]['supply'], self.colors, self.supply_colors)
+        return figures
+
+    def compute_zones(self, period_slice, interval):
+        """
+        Zones-only counterpart of process_single_interval: the same zones and
+        higher-timeframe merging, without charts or info HTML.
+
+        :param period_slice: PeriodSlice for the interval (see superset_cache.slice).
+        :param interval: The interval (e.g., '1mo', '1wk', '1d').
+        :return: {'all_zones': {'demand', 'supply'}, 'fresh_zones': {'demand', 'supply'},
+                  'current_price': last close if interval == '1d', else None}
+        """
+        zones = {'all_zones': {}, 'fresh_zones': {}}
+        for zone_type, key in (('all', 'all_zones'), ('fresh', 'fresh_zones')):
+            for category, zone_kind in (('demand', 'Demand'), ('supply', 'Supply')):
+                if zone_type == 'all':
+                    found = period_slice.all_zones(zone_kind)
+                else:
+                    found = period_slice.fresh_zones(zone_kind)
+                zones[key][category] = self.include_higher_tf_zones_in_lower_tf_zones(interval, found, zone_type, category)
+
+        zones['current_price'] = period_slice.frame.iloc[-1]['Close'] if interval == '1d' else None
+        return zones
+
+    def process_all_intervals(self, intervals, period, render_charts=True):
         """
         Runs process_single_interval across all specified intervals in ascending order
         (e.g., ['3mo', '1mo', '1wk', '1d']), returning consolidated charts and zone info.
 
         :param intervals: List of intervals, e.g. ['3mo', '1mo', '1wk', '1d'].
         :param period: Period to fetch data for, e.g. '1y'.
+        :param render_charts: Passed to process_single_interval; without it the charts are None.
         :return: A tuple of:
           - charts (dict) with keys = interval, containing 'all_zones' and 'fresh_zones' charts,
           - demand_zones_info (dict) similar structure,
@@ -271,7 +256,8 @@ class DemandZoneManager:
         wk_demand_zones = []
 
         for interval in intervals:
-            result = self.process_single_interval(interval, period)
+            with metrics.span('process_single_interval', interval):
+                result = self.process_single_interval(interval, period, render_charts)
             if not result:
                 continue
 
@@ -306,9 +292,9 @@ class DemandZoneManager:
                     # Combine demand and supply zones
                     aggregated_zones = demand_zones + supply_zones
                     monthly_all_zones.extend(aggregated_zones)  # Append to the list
-                    logging.debug(f"Aggregated zones for {interval}: {aggregated_zones}")
+                    logging.debug("Aggregated zones for %s: %s", interval, aggregated_zones)
                 else:
-                    logging.warning(f"Invalid zone format for {interval}")
+                    logging.warning("Invalid zone format for %s", interval)
 
             if interval == '1d':
                 if isinstance(result['all_zones'], dict):
@@ -0,0 +1,178 @@
+"""
+Plain-dict figure construction for the zone charts.
+
+Builds the same figure Plotter and CandleStickUtils produce, but as the
+{'data': [...], 'layout': {...}} dicts Plotly.js consumes: traces and zone
+shapes are assembled in one pass and serialized with validation off, instead
+of going through validated ``go`` objects and one ``fig.add_shape`` per zone.
+Only use it for trusted internal data.
+
+plotly itself is imported on first use, not when this module loads.
+"""
+import copy
+import logging
+import itertools
+from stock_data.candlestick_utils import CandleStickUtils, BASE_CANDLE_THRESHOLD, EXCITING_CANDLE_THRESHOLD
+from stock_data.chart_reduce import ChartReducer, CHART_MAX_POINTS
+
+CHART_TEMPLATE = 'plotly_white'
+
+_template = None
+
+
+def template():
+    """
+    The chart template as a plain dict (named templates are resolved by validation,
+    which this builder skips).
+    """
+    global _template
+    if _template is None:
+        import plotly.io as pio
+        _template = pio.templates[CHART_TEMPLATE].to_plotly_json()
+    return _template
+
+
+class FigureBuilder:
+
+    @staticmethod
+    def candlestick(stock_data, stock_code, interval, zones=None, max_points=CHART_MAX_POINTS):
+        """
+        Dict equivalent of Plotter.create_candlestick_chart (adds the same columns to stock_data).
+
+        :param zones: Zones drawn on the chart later; their bars survive the data reduction.
+        """
+        stock_data = CandleStickUtils.add_candle_identifiers(
+            stock_data, BASE_CANDLE_THRESHOLD, EXCITING_CANDLE_THRESHOLD
+        )
+        stock_data['EMA20'] = stock_data['Close'].ewm(span=20, adjust=False).mean()
+
+        keep = ChartReducer.keep_positions(stock_data.index, zones or [])
+        candles = ChartReducer.ohlc_buckets(stock_data, max_points, keep)
+        ema_positions = ChartReducer.lttb_indices(stock_data['EMA20'].to_numpy(), max_points, keep)
+        ema = stock_data['EMA20'].iloc[ema_positions]
+        if len(candles) < len(stock_data):
+            logging.debug("Reduced %s bars to %s candles and %s EMA points", len(stock_data), len(candles), len(ema))
+
+        base = candles['BaseCandle'].to_numpy(dtype=bool)
+        exciting = candles['ExcitingCandle'].to_numpy(dtype=bool)
+        high = candles['High'].to_numpy()
+        data = [
+            {
+                'type': 'candlestick',
+                'x': candles.index,
+                'open': candles['Open'].to_numpy(),
+                'high': high,
+                'low': candles['Low'].to_numpy(),
+                'close': candles['Close'].to_numpy(),
+                'increasing': {'line': {'color': 'green'}},
+                'decreasing': {'line': {'color': 'red'}},
+                'name': 'Candlesticks',
+            },
+            {
+                'type': 'scattergl',
+                'x': candles.index[base],
+                'y': high[base],
+                'mode': 'markers',
+                'marker': {'color': 'blue', 'size': 12, 'symbol': 'circle'},
+                'name': 'Base Candles',
+            },
+            {
+                'type': 'scattergl',
+                'x': candles.index[exciting],
+                'y': high[exciting],
+                'mode': 'markers',
+                'marker': {'color': 'orange', 'size': 12, 'symbol': 'circle'},
+                'name': 'Exciting Candles',
+            },
+            {
+                'type': 'scatter',
+                'x': ema.index,
+                'y': ema.to_numpy(),
+                'mode': 'lines',
+                'name': 'EMA20',
+                'line': {'color': 'blue', 'width': 2},
+            },
+        ]
+        return {'data': data, 'layout': FigureBuilder.layout(stock_code)}
+
+    @staticmethod
+    def layout(stock_code):
+        """
+        Layout of Plotter.create_candlestick_chart.
+        """
+        spikes = {'showspikes': True, 'spikemode': 'across', 'spikesnap': 'cursor',
+                  'spikedash': 'solid', 'spikethickness': 1, 'showline': True, 'showgrid': False}
+        return {
+            'template': template(),
+            'title': {'text': f'Candlestick Chart for {stock_code}', 'font': {'color': 'black'}},
+            'hovermode': 'x unified',
+            'spikedistance': -1,
+            'hoverlabel': {'bgcolor': 'white', 'font': {'color': 'black', 'size': 12, 'family': 'Arial'}},
+            'dragmode': 'zoom',
+            'xaxis': dict(spikes, spikecolor='black', tickformat='%Y-%m-%d', tickfont={'color': 'black'},
+                          title={'font': {'color': 'black'}}, fixedrange=False, rangeslider={'visible': False}),
+            'yaxis': dict(spikes, side='right', spikecolor='rgba(0,0,0,0.3)', tickformat='.2f',
+                          tickfont={'color': 'black'}, title={'font': {'color': 'black'}}, fixedrange=False),
+            'autosize': True,
+            'height': 800,
+            'width': 1600,
+            'margin': {'l': 50, 'r': 50, 't': 50, 'b': 50},
+            'plot_bgcolor': 'rgba(0,0,0,0)',
+            'paper_bgcolor': 'rgba(0,0,0,0)',
+            'modebar': {'orientation': 'h', 'bgcolor': 'rgba(0,0,0,0)', 'color': 'black', 'activecolor': 'blue'},
+        }
+
+    @staticmethod
+    def zone_shapes(zones, colors):
+        """
+        The rectangles CandleStickUtils.markDemandZoneInfoOnChart adds, one per zone.
+
+        :param colors: Iterator of colours, one drawn per zone.
+        """
+        shapes = []
+        for zone in zones:
+            color = next(colors)
+            shapes.append({
+                'type': 'rect',
+                'x0': zone['dates'][0], 'y0': zone['distal'],
+                'x1': zone['dates'][-1], 'y1': zone['proximal'],
+                'line': {'color': color, 'width': 2},
+                'fillcolor': color, 'opacity': 0.3,
+            })
+        return shapes
+
+    @staticmethod
+    def with_zones(figure, stock_code, demand_zones, supply_zones, demand_colors=None, supply_colors=None):
+        """
+        Copy of figure with the zone rectangles and the layout markDemandZoneInfoOnChart
+        applies. The traces are shared with figure, not copied.
+        """
+        demand_colors = demand_colors or itertools.cycle(['green'])
+        supply_colors = supply_colors or itertools.cycle(['red'])
+        layout = copy.deepcopy({key: value for key, value in figure['layout'].items() if key != 'template'})
+        layout['template'] = figure['layout'].get('template')
+        layout['shapes'] = (list(layout.get('shapes', []))
+                            + FigureBuilder.zone_shapes(demand_zones, demand_colors)
+                            + FigureBuilder.zone_shapes(supply_zones, supply_colors))
+
+        # update_layout(title=..., xaxis_title=...) replaces the whole title objects
+        layout['title'] = {'text': f"Candlestick Chart for {stock_code}"}
+        layout['xaxis']['title'] = {'text': 'Date'}
+        layout['yaxis']['title'] = {'text': 'Price'}
+        layout['font'] = dict(layout.get('font', {}), size=12)
+        return {'data': figure['data'], 'layout': layout}
+
+    @staticmethod
+    def to_html(figure):
+        """
+        Chart div and script; plotly.js itself is loaded once per page by the template.
+        """
+        import plotly.io as pio
+        return pio.to_html(figure, full_html=False, include_plotlyjs=False, validate=False)
+
+    @staticmethod
+    def to_html_many(figures):
+        """
+        to_html of each figure, as one compute pool task.
+        """
+        return [FigureBuilder.to_html(figure) for figure in figures]
@@ -1,25 +1,57 @@
 import json
+import time
 import logging
-from openai import OpenAI
 from datetime import datetime
 import pandas as pd
 import numpy as np
 from datetime import datetime
 from typing import Dict, Any, List
 import math
+from stock_data.metrics import metrics
 
 class GPTClient:
-    def __init__(self, api_key):
+    def __init__(self, api_key, timeout=None):
+        """
+        :param timeout: Seconds per API call (the openai default when None).
+        """
         if not api_key:
             raise ValueError("OpenAI API key is required.")
-        self.client = OpenAI(api_key=api_key)
+        self.api_key = api_key
+        self.timeout = timeout
+        self.client = None
+
+    @classmethod
+    def offline(cls):
+        """
+        Instance for the zone preparation and DTO helpers only; call_gpt is unavailable.
+        """
+        client = cls.__new__(cls)
+        client.api_key = None
+        client.timeout = None
+        client.client = None
+        return client
+
+    def openai_client(self):
+        """
+        The OpenAI client, created on the first GPT call so that importing the app (and
+        zone preparation) never loads openai.
+        """
+        if self.client is None:
+            if not self.api_key:
+                raise ValueError("OpenAI API key is required.")
+            from openai import OpenAI
+            if self.timeout is None:
+                self.client = OpenAI(api_key=self.api_key)
+            else:
+                self.client = OpenAI(api_key=self.api_key, timeout=self.timeout)
+        return self.client
 
     def call_gpt(self, user_query, zone_dto):
         
         try:
             zone_dto_json = self.serialize_demand_zones(zone_dto)
         except Exception as e:
-            logging.error(f"Serialization error in call_gpt: {e}")
+            logging.error("Serialization error in call_gpt: %s", e)
             return f"Sorry, there was an error processing your data: {e}"
         messages = [
             {
@@ -78,12 +110,12 @@ class GPTClient:
                 logging.error("Non-string content found in message: %s", msg)
                 return "An error occurred while preparing the GPT request."
         
-        logging.info("Sending GPT request with messages: %s", messages)
+        logging.debug("Sending GPT request with messages: %s", messages)
         return self.get_gpt_response(messages)
 
     def get_gpt_response(self, messages):
         try:
-            completion = self.client.chat.completions.create(
+            completion = self.openai_client().chat.completions.create(
                 model="gpt-4o-mini-2024-07-18",
                 messages=messages,
                 max_tokens=800,
@@ -91,7 +123,7 @@ class GPTClient:
             )
             return completion.choices[0].message.content.strip()
         except Exception as e:
-            logging.error(f"Error during GPT call: {e}")
+            logging.error("Error during GPT call: %s", e)
             return f"Sorry, there was an error processing your request: {e}"
 
 
@@ -152,8 +184,8 @@ class GPTClient:
 
 
     def prepare_zones(self, monthly_fresh_zones, daily_all_zones, current_market_price, wk_demand_zones, data_type):
-        logging.debug(f"monthly fresh zones: {monthly_fresh_zones}")
-        logging.debug(f"current market price is : {current_market_price}")
+        logging.debug("monthly fresh zones: %s", monthly_fresh_zones)
+        logging.debug("current market price is : %s", current_market_price)
 
         # Early exit if required inputs are missing or not in expected format
         if not monthly_fresh_zones or not daily_all_zones:
@@ -190,12 +222,13 @@ class GPTClient:
                 except (TypeError, ValueError):
                     continue
             filtered_monthly.append(zone)
-        logging.debug(f"Filtered monthly zones: {filtered_monthly}")
+        logging.debug("Filtered monthly zones: %s", filtered_monthly)
 
         result = {
             "1mo": filtered_monthly,
             "1d": []
         }
+        started = time.perf_counter()
 
         # Helper function to extract a single date from various formats
         def extract_single_date(date_obj, label):
@@ -302,7 +335,7 @@ class GPTClient:
                     if not (monthly_first_date <= daily_first_date < monthly_last_date):
                         continue
                 except Exception as e:
-                    logging.error(f"Error comparing dates: {e}")
+                    logging.error("Error comparing dates: %s", e)
                     continue
                 
                 # Additional filter for Demand zones based on current_market_price
@@ -313,24 +346,28 @@ class GPTClient:
 
                             continue
                     except (TypeError, ValueError):
-                        logging.error(f"Invalid distal value in daily zone: {daily_dist}")
+                        logging.error("Invalid distal value in daily zone: %s", daily_dist)
                         continue
                     
                 # Append the valid daily zone to the result
-                logging.debug(f"Adding daily zone to result: {daily_zone}")
+                logging.debug("Adding daily zone to result: %s", daily_zone)
         
                 result["1d"].append(daily_zone)
+        metrics.observe_stage('match_daily_zones', '', time.perf_counter() - started)
         logging.debug("Near weekly DZ method")
         # Handle weekly demand zones if daily zones are absent
-        self.addWeeklyDzIfDailyAreAbsent(current_market_price, wk_demand_zones, filtered_monthly, result)
+        with metrics.span('add_weekly_zones'):
+            self.addWeeklyDzIfDailyAreAbsent(current_market_price, wk_demand_zones, filtered_monthly, result)
 
         # Retain only the nearest supply zone after processing all zones
-        result = self.retain_nearest_supply_zone(result, current_market_price)
+        with metrics.span('retain_nearest_supply'):
+            result = self.retain_nearest_supply_zone(result, current_market_price)
 
         # Build the final zones DTO (Data Transfer Object)
-        dto = self.build_zones_dto(result, current_market_price, data_type)
+        with metrics.span('build_zones_dto'):
+            dto = self.build_zones_dto(result, current_market_price, data_type)
 
-        logging.debug(f"Final DTO: {dto}")
+        logging.debug("Final DTO: %s", dto)
         return dto
 
     def addWeeklyDzIfDailyAreAbsent(
@@ -473,7 +510,7 @@ class GPTClient:
                             if not (float(mo_distal) < float(wk_dist) < float(mo_proximal)):
                                 continue
                         except (TypeError, ValueError):
-                            logging.error(f"Invalid proximal/distal values in weekly zone: {wk_zone}")
+                            logging.error("Invalid proximal/distal values in weekly zone: %s", wk_zone)
                             continue
 
                         # c) At least one weekly candle's low is less than the monthly zone's proximal
@@ -503,7 +540,7 @@ class GPTClient:
                                 if float(wk_dist) > current_market_price:
                                     continue
                             except (TypeError, ValueError):
-                                logging.error(f"Invalid distal value in weekly zone: {wk_zone}")
+                                logging.error("Invalid distal value in weekly zone: %s", wk_zone)
                                 continue
 
                         # Append the valid weekly zone to the result
@@ -527,8 +564,8 @@ class GPTClient:
         """
         try:
             logging.debug("Entering retain_nearest_supply_zone")
-            logging.debug(f"Initial result: {result}")
-            logging.debug(f"Current Market Price: {current_market_price}")
+            logging.debug("Initial result: %s", result)
+            logging.debug("Current Market Price: %s", current_market_price)
 
             if current_market_price is None:
                 logging.warning("current_market_price is None. Returning result unchanged.")
@@ -547,113 +584,113 @@ class GPTClient:
                                 all_zone_ids.append(zone_id)
             unique_zone_ids = set(all_zone_ids)
             is_zone_id_unique = len(all_zone_ids) == len(unique_zone_ids)
-            logging.debug(f"Zone ID uniqueness: {is_zone_id_unique} (Unique Zone IDs: {unique_zone_ids})")
+            logging.debug("Zone ID uniqueness: %s (Unique Zone IDs: %s)", is_zone_id_unique, unique_zone_ids)
 
             # Iterate through each top-level interval (e.g., '1mo', '1d')
             for top_interval, zones in result.items():
-                logging.debug(f"Processing top-level interval: '{top_interval}' with zones: {zones}")
-                logging.debug(f"Type of zones for interval '{top_interval}': {type(zones)}")
+                logging.debug("Processing top-level interval: '%s' with zones: %s", top_interval, zones)
+                logging.debug("Type of zones for interval '%s': %s", top_interval, type(zones))
 
                 # Skip 'current_market_price' if it's stored in result
                 if top_interval == 'current_market_price':
-                    logging.debug(f"Skipping top-level interval '{top_interval}' as it is 'current_market_price'")
+                    logging.debug("Skipping top-level interval '%s' as it is 'current_market_price'", top_interval)
                     continue
 
                 if not isinstance(zones, list):
-                    logging.error(f"Expected list of zones for top-level interval '{top_interval}', got {type(zones)}. Skipping.")
+                    logging.error("Expected list of zones for top-level interval '%s', got %s. Skipping.", top_interval, type(zones))
                     continue
 
                 # Group zones by their 'interval' field (sub-intervals)
                 sub_interval_groups = {}
                 for idx, zone in enumerate(zones):
-                    logging.debug(f"Processing zone {idx} in top-level interval '{top_interval}': {zone}")
-                    logging.debug(f"Type of zone: {type(zone)}")
+                    logging.debug("Processing zone %s in top-level interval '%s': %s", idx, top_interval, zone)
+                    logging.debug("Type of zone: %s", type(zone))
 
                     if not isinstance(zone, dict):
-                        logging.error(f"Expected zone to be a dict, got {type(zone)}. Skipping this zone.")
+                        logging.error("Expected zone to be a dict, got %s. Skipping this zone.", type(zone))
                         continue
 
                     zone_type = zone.get('zoneType')
                     sub_interval = zone.get('interval')
 
-                    logging.debug(f"zoneType: {zone_type}, interval: {sub_interval}")
+                    logging.debug("zoneType: %s, interval: %s", zone_type, sub_interval)
 
                     if zone_type != 'Supply':
-                        logging.debug(f"Zone is not a Supply zone (zoneType='{zone_type}'). Skipping.")
+                        logging.debug("Zone is not a Supply zone (zoneType='%s'). Skipping.", zone_type)
                         continue
 
                     if sub_interval is None:
-                        logging.warning(f"Supply zone missing 'interval' value: {zone}. Skipping.")
+                        logging.warning("Supply zone missing 'interval' value: %s. Skipping.", zone)
                         continue
 
                     if sub_interval not in sub_interval_groups:
                         sub_interval_groups[sub_interval] = []
                     sub_interval_groups[sub_interval].append(zone)
 
-                logging.debug(f"Grouped Supply zones in top-level interval '{top_interval}' by sub-interval: {sub_interval_groups}")
+                logging.debug("Grouped Supply zones in top-level interval '%s' by sub-interval: %s", top_interval, sub_interval_groups)
 
                 # Find the nearest Supply zone per sub-interval
                 nearest_zones_per_sub_interval = {}
                 for sub_interval, supply_zones in sub_interval_groups.items():
                     nearest_zone = None
                     min_distance_sub = float('inf')
-                    logging.debug(f"Finding nearest Supply zone in sub-interval '{sub_interval}' with supply_zones: {supply_zones}")
+                    logging.debug("Finding nearest Supply zone in sub-interval '%s' with supply_zones: %s", sub_interval, supply_zones)
 
                     for zone in supply_zones:
                         proximal = zone.get('proximal')
                         distal = zone.get('distal')
-                        logging.debug(f"Evaluating Supply zone: proximal={proximal} (type: {type(proximal)}), distal={distal} (type: {type(distal)})")
+                        logging.debug("Evaluating Supply zone: proximal=%s (type: %s), distal=%s (type: %s)", proximal, type(proximal), distal, type(distal))
 
                         if proximal is None or distal is None:
-                            logging.warning(f"Supply zone missing 'proximal' or 'distal': {zone}. Skipping.")
+                            logging.warning("Supply zone missing 'proximal' or 'distal': %s. Skipping.", zone)
                             continue
 
                         try:
                             proximal_float = float(proximal)
                             current_price_float = float(current_market_price)
                             distance = abs(proximal_float - current_price_float)
-                            logging.debug(f"Calculated distance: {distance} between proximal {proximal_float} and current_market_price {current_price_float}")
+                            logging.debug("Calculated distance: %s between proximal %s and current_market_price %s", distance, proximal_float, current_price_float)
                         except (TypeError, ValueError) as e:
-                            logging.error(f"Error converting proximal or current_market_price to float: {e}. Skipping this zone.")
+                            logging.error("Error converting proximal or current_market_price to float: %s. Skipping this zone.", e)
                             continue
 
                         if distance < min_distance_sub:
-                            logging.debug(f"New nearest Supply zone in sub-interval '{sub_interval}': {zone} with distance {distance}")
+                            logging.debug("New nearest Supply zone in sub-interval '%s': %s with distance %s", sub_interval, zone, distance)
                             min_distance_sub = distance
                             nearest_zone = zone
 
                     if nearest_zone:
                         nearest_zones_per_sub_interval[sub_interval] = nearest_zone
-                        logging.debug(f"Nearest Supply zone in sub-interval '{sub_interval}': {nearest_zone} with distance {min_distance_sub}")
+                        logging.debug("Nearest Supply zone in sub-interval '%s': %s with distance %s", sub_interval, nearest_zone, min_distance_sub)
                     else:
-                        logging.warning(f"No valid Supply zones found in sub-interval '{sub_interval}' within top-level interval '{top_interval}'.")
+                        logging.warning("No valid Supply zones found in sub-interval '%s' within top-level interval '%s'.", sub_interval, top_interval)
 
                 # Retain only the nearest Supply zones per sub-interval
                 for sub_interval, nearest_zone in nearest_zones_per_sub_interval.items():
-                    logging.debug(f"Retaining nearest Supply zone for sub-interval '{sub_interval}': {nearest_zone}")
+                    logging.debug("Retaining nearest Supply zone for sub-interval '%s': %s", sub_interval, nearest_zone)
 
                 # Create a new list of zones, keeping only the nearest Supply zones per sub-interval
                 filtered_zones = list(nearest_zones_per_sub_interval.values())
 
                 # Additionally, retain all non-Supply zones unchanged
                 non_supply_zones = [z for z in zones if z.get('zoneType') != 'Supply']
-                logging.debug(f"Non-Supply zones in top-level interval '{top_interval}': {non_supply_zones}")
+                logging.debug("Non-Supply zones in top-level interval '%s': %s", top_interval, non_supply_zones)
 
                 # Combine the nearest Supply zones and non-Supply zones
                 try:
                     result[top_interval] = filtered_zones + non_supply_zones
-                    logging.debug(f"Filtered zones for top-level interval '{top_interval}': {result[top_interval]}")
+                    logging.debug("Filtered zones for top-level interval '%s': %s", top_interval, result[top_interval])
                 except Exception as e:
-                    logging.error(f"Error assigning filtered zones for top-level interval '{top_interval}': {e}")
+                    logging.error("Error assigning filtered zones for top-level interval '%s': %s", top_interval, e)
                     logging.error(traceback.format_exc())
 
-            logging.debug(f"Final result after retaining nearest Supply zones: {result}")
+            logging.debug("Final result after retaining nearest Supply zones: %s", result)
             logging.debug("Exiting retain_nearest_supply_zone")
 
             return result
 
         except Exception as e:
-            logging.error(f"Error processing request: {e}")
+            logging.error("Error processing request: %s", e)
             logging.error(traceback.format_exc())
             return result  # Or handle appropriately
 
@@ -663,9 +700,9 @@ class GPTClient:
         Constructs a Data Transfer Object (DTO) from the provided zones_result.
         """
         logging.debug("Entering build_zones_dto")
-        logging.debug(f"zones_result: {zones_result}")
-        logging.debug(f"current_market_price: {current_market_price}")
-        logging.debug(f"data_type: {data_type}")
+        logging.debug("zones_result: %s", zones_result)
+        logging.debug("current_market_price: %s", current_market_price)
+        logging.debug("data_type: %s", data_type)
 
         # DTO structure to be returned
         dto = {
@@ -679,27 +716,27 @@ class GPTClient:
 
         # 1) Find the closest (only one) 3mo Demand Zone
         three_mo_zones = self._get_zones(zones_result.get("1mo", []), zone_type="Demand", interval="3mo")
-        logging.debug(f"three_mo_zones: {three_mo_zones}")
+        logging.debug("three_mo_zones: %s", three_mo_zones)
         closest_three_mo_zones = self._get_closest_zones(three_mo_zones, current_market_price, top_n=1)
-        logging.debug(f"closest_three_mo_zones: {closest_three_mo_zones}")
+        logging.debug("closest_three_mo_zones: %s", closest_three_mo_zones)
         single_three_mo_zone = closest_three_mo_zones[0] if closest_three_mo_zones else None
 
         if single_three_mo_zone:
             proximal = single_three_mo_zone.get("proximal")
             distal = single_three_mo_zone.get("distal")
-            logging.debug(f"3mo Demand Zone - proximal: {proximal}, distal: {distal}")
+            logging.debug("3mo Demand Zone - proximal: %s, distal: %s", proximal, distal)
 
             if proximal is not None and distal is not None:
                 if not isinstance(proximal, (float, int)) or not isinstance(distal, (float, int)):
-                    logging.error(f"proximal or distal is not a scalar: proximal={proximal} (type: {type(proximal)}), distal={distal} (type: {type(distal)})")
+                    logging.error("proximal or distal is not a scalar: proximal=%s (type: %s), distal=%s (type: %s)", proximal, type(proximal), distal, type(distal))
                 else:
                     try:
                         proximal = float(proximal)
                         distal = float(distal)
                         dto["3mo_demand_zone"] = f"{proximal:.2f}-{distal:.2f}"
-                        logging.debug(f"Set 3mo_demand_zone: {dto['3mo_demand_zone']}")
+                        logging.debug("Set 3mo_demand_zone: %s", dto['3mo_demand_zone'])
                     except (TypeError, ValueError) as e:
-                        logging.error(f"Error converting proximal/distal to float for 3mo Demand Zone: {e}")
+                        logging.error("Error converting proximal/distal to float for 3mo Demand Zone: %s", e)
             else:
                 logging.warning("3mo Demand Zone found but proximal or distal is missing.")
         else:
@@ -707,27 +744,27 @@ class GPTClient:
 
         # 2) Find the closest (only one) 1mo Demand Zone
         one_mo_zones = self._get_zones(zones_result.get("1mo", []), zone_type="Demand", interval="1mo")
-        logging.debug(f"one_mo_zones: {one_mo_zones}")
+        logging.debug("one_mo_zones: %s", one_mo_zones)
         closest_one_mo_zones = self._get_closest_zones(one_mo_zones, current_market_price, top_n=1)
-        logging.debug(f"closest_one_mo_zones: {closest_one_mo_zones}")
+        logging.debug("closest_one_mo_zones: %s", closest_one_mo_zones)
         single_one_mo_zone = closest_one_mo_zones[0] if closest_one_mo_zones else None
 
         if single_one_mo_zone:
             proximal = single_one_mo_zone.get("proximal")
             distal = single_one_mo_zone.get("distal")
-            logging.debug(f"1mo Demand Zone - proximal: {proximal}, distal: {distal}")
+            logging.debug("1mo Demand Zone - proximal: %s, distal: %s", proximal, distal)
 
             if proximal is not None and distal is not None:
                 if not isinstance(proximal, (float, int)) or not isinstance(distal, (float, int)):
-                    logging.error(f"proximal or distal is not a scalar: proximal={proximal} (type: {type(proximal)}), distal={distal} (type: {type(distal)})")
+                    logging.error("proximal or distal is not a scalar: proximal=%s (type: %s), distal=%s (type: %s)", proximal, type(proximal), distal, type(distal))
                 else:
                     try:
                         proximal = float(proximal)
                         distal = float(distal)
                         dto["1mo_demand_zone"] = f"{proximal:.2f}-{distal:.2f}"
-                        logging.debug(f"Set 1mo_demand_zone: {dto['1mo_demand_zone']}")
+                        logging.debug("Set 1mo_demand_zone: %s", dto['1mo_demand_zone'])
                     except (TypeError, ValueError) as e:
-                        logging.error(f"Error converting proximal/distal to float for 1mo Demand Zone: {e}")
+                        logging.error("Error converting proximal/distal to float for 1mo Demand Zone: %s", e)
             else:
                 logging.warning("1mo Demand Zone found but proximal or distal is missing.")
         else:
@@ -739,37 +776,37 @@ class GPTClient:
             try:
                 three_mo_prox = float(single_three_mo_zone["proximal"])
                 three_mo_dist = float(single_three_mo_zone["distal"])
-                logging.debug(f"three_mo_prox: {three_mo_prox}, three_mo_dist: {three_mo_dist}")
+                logging.debug("three_mo_prox: %s, three_mo_dist: %s", three_mo_prox, three_mo_dist)
             except (TypeError, ValueError, KeyError) as e:
-                logging.error(f"Error converting 3mo proximal/distal to float: {e}")
+                logging.error("Error converting 3mo proximal/distal to float: %s", e)
 
         one_mo_prox, one_mo_dist = None, None
         if single_one_mo_zone:
             try:
                 one_mo_prox = float(single_one_mo_zone["proximal"])
                 one_mo_dist = float(single_one_mo_zone["distal"])
-                logging.debug(f"one_mo_prox: {one_mo_prox}, one_mo_dist: {one_mo_dist}")
+                logging.debug("one_mo_prox: %s, one_mo_dist: %s", one_mo_prox, one_mo_dist)
             except (TypeError, ValueError, KeyError) as e:
-                logging.error(f"Error converting 1mo proximal/distal to float: {e}")
+                logging.error("Error converting 1mo proximal/distal to float: %s", e)
 
         # 3) Collect entries from the 1d Demand Zones, but only if they lie within either the single 1mo or 3mo demand zone
         daily_zones = zones_result.get("1d", [])
-        logging.debug(f"daily_zones: {daily_zones}")
+        logging.debug("daily_zones: %s", daily_zones)
         for dz in daily_zones:
             if dz.get("zoneType") == "Demand":
                 entry_price = dz.get("proximal")
                 stop_loss = dz.get("distal")
-                logging.debug(f"Processing Daily Demand Zone - entry_price: {entry_price}, stop_loss: {stop_loss}")
+                logging.debug("Processing Daily Demand Zone - entry_price: %s, stop_loss: %s", entry_price, stop_loss)
 
                 if entry_price is not None and stop_loss is not None:
                     if not isinstance(entry_price, (float, int)) or not isinstance(stop_loss, (float, int)):
-                        logging.error(f"entry_price or stop_loss is not a scalar: entry_price={entry_price} (type: {type(entry_price)}), stop_loss={stop_loss} (type: {type(stop_loss)})")
+                        logging.error("entry_price or stop_loss is not a scalar: entry_price=%s (type: %s), stop_loss=%s (type: %s)", entry_price, type(entry_price), stop_loss, type(stop_loss))
                         continue
                     try:
                         # Ensure entry_price and stop_loss are floats
                         entry_price_f = float(entry_price)
                         stop_loss_f = float(stop_loss)
-                        logging.debug(f"Converted entry_price_f: {entry_price_f}, stop_loss_f: {stop_loss_f}")
+                        logging.debug("Converted entry_price_f: %s, stop_loss_f: %s", entry_price_f, stop_loss_f)
 
                         # Check if the daily zone is within the 3mo or 1mo zone range
                         in_three_mo = (
@@ -780,7 +817,7 @@ class GPTClient:
                             one_mo_prox is not None and one_mo_dist is not None and 
                             (one_mo_dist <= stop_loss_f) and (entry_price_f <= one_mo_prox)
                         )
-                        logging.debug(f"in_three_mo: {in_three_mo}, in_one_mo: {in_one_mo}")
+                        logging.debug("in_three_mo: %s, in_one_mo: %s", in_three_mo, in_one_mo)
 
                         # Add only if in either the 1mo or 3mo demand zone
                         if in_three_mo or in_one_mo:
@@ -788,9 +825,9 @@ class GPTClient:
                                 "entry": round(entry_price_f, 2),
                                 "stoploss": round(stop_loss_f, 2)
                             })
-                            logging.debug(f"Added entry: {{'entry': {entry_price_f}, 'stoploss': {stop_loss_f}}}")
+                            logging.debug("Added entry: {'entry': %s, 'stoploss': %s}", entry_price_f, stop_loss_f)
                     except (TypeError, ValueError) as e:
-                        logging.error(f"Error converting entry_price/stop_loss to float in entries: {e}")
+                        logging.error("Error converting entry_price/stop_loss to float in entries: %s", e)
                 else:
                     logging.warning("Daily Demand Zone found but entry_price or stop_loss is missing.")
 
@@ -799,7 +836,7 @@ class GPTClient:
             z for z in zones_result.get("1mo", [])
             if z.get("zoneType") == "Supply" and z.get("interval") in ("1mo", "3mo")
         ]
-        logging.debug(f"supply_candidates: {supply_candidates}")
+        logging.debug("supply_candidates: %s", supply_candidates)
 
         if supply_candidates:
             try:
@@ -809,15 +846,15 @@ class GPTClient:
                     key=lambda z: abs(float(z.get("proximal", math.inf)) - current_market_price)
                 )
                 proximal = target_zone.get("proximal")
-                logging.debug(f"Selected target_zone: {target_zone}")
+                logging.debug("Selected target_zone: %s", target_zone)
                 if proximal is not None:
                     proximal = float(proximal)
                     dto["target"] = round(proximal, 2)
-                    logging.debug(f"Set target: {dto['target']}")
+                    logging.debug("Set target: %s", dto['target'])
                 else:
                     logging.warning("Supply Zone found but proximal is missing.")
             except (TypeError, ValueError) as e:
-                logging.error(f"Error determining target from Supply Zones: {e}")
+                logging.error("Error determining target from Supply Zones: %s", e)
         else:
             logging.warning("No Supply Zones found with intervals '1mo' or '3mo'.")
 
@@ -831,11 +868,11 @@ class GPTClient:
             logging.debug("Trade score incremented by 1 for existing 1mo Demand Zone.")
         if len(dto["entries"]) > 0:  # At least one entry
             trade_score += 1
-            logging.debug(f"Trade score incremented by 1 for {len(dto['entries'])} entry(ies).")
+            logging.debug("Trade score incremented by 1 for %s entry(ies).", len(dto['entries']))
         dto["trade_score"] = trade_score
-        logging.debug(f"Calculated trade_score: {trade_score}")
+        logging.debug("Calculated trade_score: %s", trade_score)
 
-        logging.debug(f"Final DTO: {dto}")
+        logging.debug("Final DTO: %s", dto)
         logging.debug("Exiting build_zones_dto")
         return dto
 
@@ -851,9 +888,9 @@ class GPTClient:
         Returns:
             list: A list of matching zone dictionaries.
         """
-        logging.debug(f"Entering _get_zones with zone_type='{zone_type}' and interval='{interval}'")
+        logging.debug("Entering _get_zones with zone_type='%s' and interval='%s'", zone_type, interval)
         matching_zones = [z for z in zones if z.get("zoneType") == zone_type and z.get("interval") == interval]
-        logging.debug(f"Found {len(matching_zones)} zones matching zone_type='{zone_type}' and interval='{interval}': {matching_zones}")
+        logging.debug("Found %s zones matching zone_type='%s' and interval='%s': %s", len(matching_zones), zone_type, interval, matching_zones)
         return matching_zones
 
     def _get_closest_zones(self, zones: List[Dict], current_market_price: float, top_n: int = 2) -> List[Dict]:
@@ -868,7 +905,7 @@ class GPTClient:
         Returns:
             list: A list of the top_n closest zone dictionaries.
         """
-        logging.debug(f"Entering _get_closest_zones with current_market_price={current_market_price} and top_n={top_n}")
+        logging.debug("Entering _get_closest_zones with current_market_price=%s and top_n=%s", current_market_price, top_n)
         valid_zones = []
         for z in zones:
             proximal = z.get("proximal")
@@ -876,19 +913,19 @@ class GPTClient:
                 if isinstance(proximal, (float, int)):
                     valid_zones.append(z)
                 else:
-                    logging.error(f"proximal is not a scalar in zone: {z}")
+                    logging.error("proximal is not a scalar in zone: %s", z)
             else:
-                logging.warning(f"Zone missing 'proximal': {z}")
+                logging.warning("Zone missing 'proximal': %s", z)
 
-        logging.debug(f"Valid zones for closest calculation: {valid_zones}")
+        logging.debug("Valid zones for closest calculation: %s", valid_zones)
 
         try:
             sorted_zones = sorted(valid_zones, key=lambda z: abs(float(z["proximal"]) - current_market_price))
-            logging.debug(f"sorted_zones: {sorted_zones}")
+            logging.debug("sorted_zones: %s", sorted_zones)
         except Exception as e:
-            logging.error(f"Error sorting zones: {e}")
+            logging.error("Error sorting zones: %s", e)
             return []
 
         closest_zones = sorted_zones[:top_n]
-        logging.debug(f"closest_zones (top {top_n}): {closest_zones}")
+        logging.debug("closest_zones (top %s): %s", top_n, closest_zones)
         return closest_zones
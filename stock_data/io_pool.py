@@ -0,0 +1,65 @@
+"""
+Shared thread pool for overlapping the blocking waits of one request.
+
+Yahoo fetches and LLM calls spend their time waiting on sockets with the GIL
+released, so a request that needs several of them (the searched symbol and its
+index, every multi-stock code) submits them here and runs them side by side
+instead of one after another. Under the threaded serving mode (SERVING_MODE in
+gunicorn.conf.py) the same waits also no longer hold a whole worker.
+
+Each task runs in a copy of the submitting thread's contextvars context, so its
+metrics spans still land in that request's Server-Timing header, and a profiled
+request's sampler (stock_data.profiler) also samples the task's thread. Tasks
+must not wait on other tasks of this pool.
+"""
+import os
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from stock_data.metrics import metrics
+from stock_data.profiler import sampled_thread
+
+# Threads shared by all requests of a worker process
+IO_POOL_SIZE = int(os.environ.get('IO_POOL_SIZE', '16'))
+
+
+class IoPool:
+    def __init__(self, size=IO_POOL_SIZE):
+        self.size = size
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def executor(self):
+        """
+        The process's executor, created on first use (threads do not survive a fork,
+        so a preloaded master never hands its pool to the workers).
+        """
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=max(self.size, 1), thread_name_prefix='io')
+                self._pid = os.getpid()
+            return self._executor
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        :return: Future of fn(*args, **kwargs), run in the caller's context.
+        """
+        context = contextvars.copy_context()
+        metrics.inc('io_pool_tasks_total')
+        return self.executor().submit(context.run, _run_task, fn, args, kwargs)
+
+    def map(self, fn, items):
+        """
+        fn over items concurrently; results in order. The first exception is re-raised.
+        """
+        futures = [self.submit(fn, item) for item in items]
+        return [future.result() for future in futures]
+
+
+def _run_task(fn, args, kwargs):
+    with sampled_thread():
+        return fn(*args, **kwargs)
+
+
+io_pool = IoPool()
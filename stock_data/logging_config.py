@@ -0,0 +1,133 @@
+"""
+Process-wide logging setup.
+
+Request threads hand records to a QueueHandler, whose prepare() still renders
+the message (and any traceback) on the calling thread so that later changes to
+the arguments cannot alter it; only the (possibly blocking) stream I/O moves to
+the QueueListener thread. The level comes from LOG_LEVEL (default INFO), so
+debug calls on the zone/GPT hot paths cost a level check unless debugging is
+switched on.
+
+Call sites should pass arguments lazily (``logging.debug("zones: %s", zones)``)
+rather than pre-formatting with f-strings, so nothing is rendered for records
+that are filtered out.
+"""
+import os
+import queue
+import atexit
+import logging
+import logging.handlers
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', '%(asctime)s %(levelname)s:%(message)s')
+# Bound on queued records; when full, records are dropped rather than blocking a request
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
+
+# Noisy third-party loggers held at WARNING unless LOG_LEVEL is DEBUG
+QUIET_LOGGERS = ['urllib3', 'yfinance', 'peewee', 'matplotlib', 'openai', 'httpx', 'httpcore']
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that never blocks the caller: records are dropped when the queue is full.
+    """
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+class LoggingPipeline:
+    _listener = None
+    _pid = None
+    _started = False
+
+    @staticmethod
+    def configure(level=None, fmt=None, stream_handler=None, start=True):
+        """
+        Routes the root logger through a queue to a background listener.
+
+        Idempotent within a process; after a fork call restart_after_fork()
+        because the listener thread does not survive it.
+
+        :param level: Level name or number (defaults to LOG_LEVEL).
+        :param fmt: Format string for the output handler (defaults to LOG_FORMAT).
+        :param stream_handler: Output handler (defaults to a stderr StreamHandler).
+        :param start: Start the listener thread now; with False records queue up until
+                      start_listener() (e.g. until a fork that must see a single thread).
+        """
+        if LoggingPipeline._pid == os.getpid():
+            return LoggingPipeline._listener
+
+        level = level or LOG_LEVEL
+        if isinstance(level, str):
+            level = logging.getLevelName(level)
+            if not isinstance(level, int):
+                level = logging.INFO
+
+        output = stream_handler or logging.StreamHandler()
+        output.setFormatter(logging.Formatter(fmt or LOG_FORMAT))
+
+        log_queue = queue.Queue(LOG_QUEUE_SIZE)
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(DroppingQueueHandler(log_queue))
+        root.setLevel(level)
+
+        for name in QUIET_LOGGERS:
+            logging.getLogger(name).setLevel(max(level, logging.WARNING))
+
+        listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+        if LoggingPipeline._listener is None:
+            atexit.register(LoggingPipeline.shutdown)
+        LoggingPipeline._listener = listener
+        LoggingPipeline._pid = os.getpid()
+        LoggingPipeline._started = False
+        if start:
+            LoggingPipeline.start_listener()
+        return listener
+
+    @staticmethod
+    def start_listener():
+        """
+        Starts the listener thread of a pipeline configured with start=False.
+        """
+        if LoggingPipeline._listener is not None and not LoggingPipeline._started:
+            LoggingPipeline._listener.start()
+            LoggingPipeline._started = True
+
+    @staticmethod
+    def restart_after_fork(start=True):
+        """
+        Routes logging to a fresh queue and listener in a forked process (the parent's
+        thread is not inherited and its queue has nobody reading it).
+
+        :param start: See configure().
+        """
+        if LoggingPipeline._listener is None or LoggingPipeline._pid == os.getpid():
+            return
+        output = LoggingPipeline._listener.handlers
+        LoggingPipeline._pid = None
+        LoggingPipeline._listener = None
+        LoggingPipeline.configure(level=logging.getLogger().level, stream_handler=output[0] if output else None,
+                                  start=start)
+
+    @staticmethod
+    def shutdown():
+        """
+        Flushes queued records and stops the listener.
+        """
+        listener = LoggingPipeline._listener
+        if listener is not None and LoggingPipeline._pid == os.getpid():
+            started = LoggingPipeline._started
+            LoggingPipeline._listener = None
+            LoggingPipeline._pid = None
+            LoggingPipeline._started = False
+            if started:
+                listener.stop()
+
+
+configure_logging = LoggingPipeline.configure
@@ -0,0 +1,117 @@
+"""
+Opt-in per-request memory accounting.
+
+For a sampled request (MEMORY_PROBE_RATE, 0..1) tracemalloc runs for the duration
+of the request: every metrics span records the peak traced allocation reached
+inside it ('stage_peak_memory_bytes'), and the sizes of the DataFrames, figures,
+chart HTML, zone lists and session payload created along the way are observed as
+'object_size_bytes'. Both appear on /metrics.
+
+tracemalloc is process-wide, so peaks are exact with sync workers and approximate
+when several requests run concurrently in one process.
+"""
+import os
+import sys
+import random
+import pickle
+import logging
+import threading
+import tracemalloc
+import numpy as np
+import pandas as pd
+from stock_data.metrics import metrics
+
+MEMORY_PROBE_RATE = float(os.environ.get('MEMORY_PROBE_RATE', '0'))
+
+
+class MemoryProbe:
+    def __init__(self, rate=MEMORY_PROBE_RATE):
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.active = 0
+        self.started_tracing = False
+
+    def start_request(self):
+        """
+        Starts tracing for this request if it is sampled.
+
+        :return: Token for finish_request, or None when the request is not probed.
+        """
+        if self.rate <= 0 or random.random() >= self.rate:
+            return None
+        with self.lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.started_tracing = True
+            self.active += 1
+        return metrics.start_memory_tracking()
+
+    def finish_request(self, token, route=''):
+        metrics.stop_memory_tracking(token, route)
+        with self.lock:
+            self.active -= 1
+            if self.active == 0 and self.started_tracing:
+                tracemalloc.stop()
+                self.started_tracing = False
+
+    @staticmethod
+    def record_size(kind, obj, interval=''):
+        """
+        Observes the deep size of obj under `kind` when the current request is probed.
+        """
+        if not metrics.memory_tracking():
+            return
+        try:
+            metrics.observe('object_size_bytes', deep_sizeof(obj), kind=kind, interval=interval or '')
+        except Exception as e:
+            logging.debug("Could not size %s: %s", kind, e)
+
+    @staticmethod
+    def record_session(session_data, session_interface=None):
+        """
+        Observes the size of the session as its store writes it: the encoded row of the
+        SQLite store (msgpack, zlib-compressed when large), else the pickle the
+        filesystem store writes.
+
+        :param session_interface: The app's session interface.
+        """
+        if not metrics.memory_tracking():
+            return
+        try:
+            encode = getattr(session_interface, 'encode', None)
+            data = dict(session_data)
+            size = len(encode(data)) if encode else len(pickle.dumps(data))
+            metrics.observe('object_size_bytes', size, kind='session', interval='')
+        except Exception as e:
+            logging.debug("Could not size session: %s", e)
+
+
+def deep_sizeof(obj, seen=None):
+    """
+    Approximate retained size of obj in bytes, following containers, pandas and
+    numpy objects and plotly figures.
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if hasattr(obj, 'to_plotly_json'):
+        return deep_sizeof(obj.to_plotly_json(), seen)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    return size
+
+
+memory_probe = MemoryProbe()
@@ -0,0 +1,306 @@
+"""
+Lightweight in-process instrumentation.
+
+``metrics.span(stage, interval)`` times a block and feeds a per-(stage, interval)
+histogram; the current request's spans are also kept so the app can emit a
+``Server-Timing`` header. ``metrics.render_prometheus()`` produces the text
+exposition served at /metrics.
+
+When the memory probe is active for a request (see stock_data.memory_probe),
+spans also record the peak traced allocation reached inside them.
+
+Each gunicorn worker keeps its own registry, so a scrape reflects the worker that
+answered it.
+"""
+import re
+import time
+import threading
+import tracemalloc
+import contextvars
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# Bucket upper bounds for byte-sized observations (1 KiB .. 1 GiB)
+BYTE_BUCKETS = tuple(float(1024 * 4 ** k) for k in range(11))
+
+_request_spans = contextvars.ContextVar('request_spans', default=None)
+# The probed request's _MemoryStacks; io_pool tasks share it through their copied context
+_memory_frames = contextvars.ContextVar('memory_frames', default=None)
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.total += value
+        self.count += 1
+        for idx, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[idx] += 1
+                break
+
+
+class _MemoryStacks:
+    """
+    [start_traced, peak_traced] span frames of one probed request, one stack per thread
+    so io_pool tasks running side by side do not pop each other's frames.
+
+    tracemalloc keeps a single process-wide peak, so whoever resets it first folds it
+    into the innermost frame of every stack. A task thread's outermost frame is merged
+    into the request thread's innermost one when the task ends.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.owner = threading.get_ident()
+        self.stacks = {}
+
+    def enter(self):
+        with self.lock:
+            current, peak = tracemalloc.get_traced_memory()
+            self._fold(peak)
+            tracemalloc.reset_peak()
+            self.stacks.setdefault(threading.get_ident(), []).append([current, current])
+
+    def exit(self, outermost=False):
+        """
+        Closes the calling thread's innermost frame (or all of them).
+
+        :return: Bytes the frame's peak rose above its start.
+        """
+        with self.lock:
+            _, peak = tracemalloc.get_traced_memory()
+            self._fold(peak)
+            ident = threading.get_ident()
+            stack = self.stacks[ident]
+            start, frame_peak = stack[0] if outermost else stack[-1]
+            del stack[0 if outermost else -1:]
+            if stack:
+                stack[-1][1] = max(stack[-1][1], frame_peak)
+            else:
+                del self.stacks[ident]
+                owner = self.stacks.get(self.owner)
+                if owner:
+                    owner[-1][1] = max(owner[-1][1], frame_peak)
+            return frame_peak - start
+
+    def _fold(self, peak):
+        # Called with the lock held
+        for stack in self.stacks.values():
+            stack[-1][1] = max(stack[-1][1], peak)
+
+
+class Metrics:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.histograms = {}   # (metric name, label tuple) -> Histogram
+        self.metric_buckets = {'stage_peak_memory_bytes': BYTE_BUCKETS, 'object_size_bytes': BYTE_BUCKETS}
+        self.counters = {}     # (metric name, label tuple) -> float
+        self.gauges = {}       # (metric name, label tuple) -> float
+
+    # ------------------------------------------------------------------
+    #                   RECORDING
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def span(self, stage, interval=''):
+        """
+        Times the enclosed block as `stage` (optionally per interval).
+        """
+        started = time.perf_counter()
+        frames = _memory_frames.get()
+        if frames is not None:
+            frames.enter()
+        try:
+            yield
+        finally:
+            self.observe_stage(stage, interval, time.perf_counter() - started)
+            if frames is not None:
+                self.observe('stage_peak_memory_bytes', frames.exit(), stage=stage, interval=interval or '')
+
+    def start_memory_tracking(self):
+        """
+        Makes spans in the current context record tracemalloc peaks (tracemalloc must be tracing).
+
+        :return: Token for stop_memory_tracking.
+        """
+        frames = _MemoryStacks()
+        frames.enter()
+        return _memory_frames.set(frames)
+
+    def stop_memory_tracking(self, token, route=''):
+        """
+        Records the whole request's peak as stage 'request:<route>' and stops tracking.
+        """
+        frames = _memory_frames.get()
+        if frames is not None:
+            stage = f"request:{route}" if route else 'request'
+            self.observe('stage_peak_memory_bytes', frames.exit(outermost=True), stage=stage, interval='')
+        _memory_frames.reset(token)
+
+    def memory_tracking(self):
+        return _memory_frames.get() is not None
+
+    def observe_stage(self, stage, interval, seconds):
+        self.observe('stage_duration_seconds', seconds, stage=stage, interval=interval or '')
+        spans = _request_spans.get()
+        if spans is not None:
+            spans.append((stage, interval or '', seconds))
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.metric_buckets.get(name, self.buckets))
+            histogram.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set_gauge(self, name, value, **labels):
+        with self.lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def add_gauge(self, name, amount, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.gauges[key] = self.gauges.get(key, 0) + amount
+
+    def record_cache(self, cache, hit):
+        """
+        Counts a lookup against a named cache; hit ratios are derived at render time.
+        """
+        self.inc('cache_requests_total', cache=cache, result='hit' if hit else 'miss')
+
+    def reset(self):
+        """
+        Drops everything recorded so far, e.g. a preloading master's warm-up inherited by a worker.
+        """
+        with self.lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.gauges.clear()
+
+    # ------------------------------------------------------------------
+    #                   PER-REQUEST SPANS
+    # ------------------------------------------------------------------
+
+    def start_request(self, route):
+        """
+        Marks a request as in flight and starts collecting its spans.
+
+        :return: Opaque token to pass to finish_request.
+        """
+        self.add_gauge('http_requests_in_flight', 1, route=route)
+        return (route, time.perf_counter(), _request_spans.set([]))
+
+    def finish_request(self, token, method, status):
+        route, started, spans_token = token
+        self.add_gauge('http_requests_in_flight', -1, route=route)
+        self.observe('http_request_duration_seconds', time.perf_counter() - started,
+                     route=route, method=method)
+        self.inc('http_requests_total', route=route, method=method, status=str(status))
+        _request_spans.reset(spans_token)
+
+    def request_spans(self):
+        return list(_request_spans.get() or [])
+
+    def server_timing_header(self, token=None):
+        """
+        Builds a Server-Timing header value from the current request's spans,
+        summing repeated stages per interval. With the start_request token a
+        'total' entry is appended.
+        """
+        totals = {}
+        for stage, interval, seconds in self.request_spans():
+            totals[(stage, interval)] = totals.get((stage, interval), 0.0) + seconds
+
+        parts = []
+        for (stage, interval), seconds in totals.items():
+            name = re.sub(r'[^A-Za-z0-9_-]', '_', f"{stage}_{interval}" if interval else stage)
+            parts.append(f"{name};dur={seconds * 1000:.1f}")
+        if token is not None:
+            parts.append(f"total;dur={(time.perf_counter() - token[1]) * 1000:.1f}")
+        return ", ".join(parts)
+
+    # ------------------------------------------------------------------
+    #                   EXPOSITION
+    # ------------------------------------------------------------------
+
+    def render_prometheus(self, prefix='priceaction_'):
+        with self.lock:
+            histograms = {key: (h.buckets, list(h.counts), h.total, h.count) for key, h in self.histograms.items()}
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+
+        lines = []
+        emitted = set()
+
+        def header(name, kind):
+            if name not in emitted:
+                emitted.add(name)
+                lines.append(f"# TYPE {prefix}{name} {kind}")
+
+        for (name, labels), (buckets, counts, total, count) in sorted(histograms.items()):
+            header(name, 'histogram')
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{prefix}{name}_bucket{_labels(labels, le=_number(bound))} {cumulative}")
+            lines.append(f"{prefix}{name}_bucket{_labels(labels, le='+Inf')} {count}")
+            lines.append(f"{prefix}{name}_sum{_labels(labels)} {_number(total)}")
+            lines.append(f"{prefix}{name}_count{_labels(labels)} {count}")
+
+        for (name, labels), value in sorted(counters.items()):
+            header(name, 'counter')
+            lines.append(f"{prefix}{name}{_labels(labels)} {_number(value)}")
+
+        for (name, labels), value in sorted(gauges.items()):
+            header(name, 'gauge')
+            lines.append(f"{prefix}{name}{_labels(labels)} {_number(value)}")
+
+        # Hit ratio per cache, derived from the lookup counters
+        caches = {}
+        for (name, labels), value in counters.items():
+            if name == 'cache_requests_total':
+                label_map = dict(labels)
+                hits, lookups = caches.get(label_map['cache'], (0, 0))
+                caches[label_map['cache']] = (hits + (value if label_map['result'] == 'hit' else 0),
+                                              lookups + value)
+        for cache, (hits, lookups) in sorted(caches.items()):
+            header('cache_hit_ratio', 'gauge')
+            lines.append(f"{prefix}cache_hit_ratio{_labels((('cache', cache),))} "
+                         f"{_number(hits / lookups if lookups else 0)}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels, **extra):
+    items = list(labels) + list(extra.items())
+    if not items:
+        return ''
+    rendered = ','.join(f'{key}="{_escape(value)}"' for key, value in items)
+    return '{' + rendered + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+# Process-wide registry
+metrics = Metrics()
@@ -0,0 +1,252 @@
+"""
+Parameter sweep for the candle classification thresholds.
+
+Loads the universe once into a SharedOHLCV dataset, then evaluates every
+combination of base/exciting thresholds and gap percentage across a process
+pool. Workers attach to the shared arrays by name and derive the
+parameter-independent candle features (body, wicks, previous close) once each,
+so only parameter tuples and small summaries cross the process boundary.
+
+    python -m stock_data.param_sweep --synthetic 20 --base 0.3,0.5,0.7 \
+        --exciting 0.3,0.5,0.7 --gap 0.02,0.03,0.05
+"""
+import sys
+import csv
+import json
+import time
+import logging
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from stock_data.backtest import ZoneBacktester, universe_sources, DEFAULT_TARGET_R, BACKTEST_WORKERS
+from stock_data.shared_ohlcv import SharedOHLCV
+
+SWEEP_FIELDS = ['base_candle_threshold', 'exciting_candle_threshold', 'gap_threshold',
+                'demand_zones', 'supply_zones', 'touched', 'target', 'stop',
+                'hit_rate', 'avg_r', 'total_r']
+
+# Dataset being swept in this process and the features derived from it
+_dataset = None
+_features = {}
+
+
+class SweepEngine:
+    def __init__(self, interval='1d', target_r=DEFAULT_TARGET_R):
+        self.interval = interval
+        self.target_r = target_r
+
+    # ------------------------------------------------------------------
+    #                   FEATURES
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def candle_features(arrays, dates):
+        """
+        Parameter-independent inputs of CandleStickUtils.add_candle_identifiers.
+
+        :param arrays: 'open', 'high', 'low', 'close' float arrays (e.g. SharedOHLCV.arrays).
+        :param dates: Bar timestamps.
+        """
+        open_, high, low, close = arrays['open'], arrays['high'], arrays['low'], arrays['close']
+        return {
+            'open': open_,
+            'high': high,
+            'low': low,
+            'close': close,
+            'body': np.abs(close - open_),
+            'upper_wick': high - np.maximum(close, open_),
+            'lower_wick': np.minimum(close, open_) - low,
+            'prev_close': np.r_[np.nan, close[:-1]],
+            'dates': dates,
+        }
+
+    @staticmethod
+    def candle_arrays(features, base_candle_threshold, exciting_candle_threshold, gap_threshold):
+        """
+        Vectorised add_candle_identifiers over precomputed features, returned in the
+        ZoneScanner.candle_arrays layout.
+        """
+        body = features['body']
+        upper, lower = features['upper_wick'], features['lower_wick']
+        prev_close = features['prev_close']
+        open_ = features['open']
+
+        # NaN previous close on the first bar compares False, as the pandas shift does
+        with np.errstate(invalid='ignore'):
+            gap_up = open_ >= prev_close * (1 + gap_threshold)
+            gap_down = open_ <= prev_close * (1 - gap_threshold)
+        base = (upper > base_candle_threshold * body) | (lower > base_candle_threshold * body)
+        exciting = ((upper < exciting_candle_threshold * body) & (lower < exciting_candle_threshold * body)) | gap_up
+
+        return {
+            'open': open_,
+            'high': features['high'],
+            'low': features['low'],
+            'close': features['close'],
+            'exciting': exciting,
+            'base': base,
+            'gap_up': gap_up,
+            'gap_down': gap_down,
+        }
+
+    def load_universe(self, sources):
+        """
+        Loads every source into a new SharedOHLCV dataset (the caller closes it).
+        """
+        frames = []
+        for source in sources:
+            try:
+                frames.append((source[1], self.interval, ZoneBacktester.load_frame(source, self.interval)))
+            except Exception as e:
+                logging.error("Sweep could not load %s: %s", source[1], e)
+        return SharedOHLCV.create(frames)
+
+    @staticmethod
+    def features(dataset, key):
+        """
+        Candle features for one dataset entry, derived once per process.
+        """
+        features = _features.get(key)
+        if features is None:
+            features = _features[key] = SweepEngine.candle_features(dataset.arrays(*key), dataset.index(*key))
+        return features
+
+    # ------------------------------------------------------------------
+    #                   EVALUATION
+    # ------------------------------------------------------------------
+
+    def evaluate(self, params):
+        """
+        Scans and backtests the whole dataset for one parameter set.
+
+        :param params: (base_candle_threshold, exciting_candle_threshold, gap_threshold).
+        :return: Row dict with the parameters, zone counts and backtest metrics.
+        """
+        base_t, exciting_t, gap = params
+        backtester = ZoneBacktester(self.interval, base_t, exciting_t, gap, self.target_r)
+
+        trades = []
+        for key in _dataset.keys():
+            features = self.features(_dataset, key)
+            arrays = self.candle_arrays(features, base_t, exciting_t, gap)
+            trades.extend(backtester.run_arrays(arrays, features['dates'], key[0]))
+
+        summary = ZoneBacktester.summarize(trades)
+        overall = summary['All']
+        return {
+            'base_candle_threshold': base_t,
+            'exciting_candle_threshold': exciting_t,
+            'gap_threshold': gap,
+            'demand_zones': summary['Demand']['zones'],
+            'supply_zones': summary['Supply']['zones'],
+            'touched': overall['touched'],
+            'target': overall['target'],
+            'stop': overall['stop'],
+            'hit_rate': overall['hit_rate'],
+            'avg_r': overall['avg_r'],
+            'total_r': overall['total_r'],
+        }
+
+    def run(self, dataset, grid, workers=BACKTEST_WORKERS):
+        """
+        Evaluates every parameter set in grid, spread over a process pool whose
+        workers attach to the dataset's shared memory.
+
+        :param dataset: SharedOHLCV holding the universe.
+        :return: Rows sorted by average R-multiple, best first.
+        """
+        global _dataset
+        grid = list(grid)
+        if workers <= 1 or len(grid) <= 1:
+            _dataset = dataset
+            try:
+                rows = [self.evaluate(params) for params in grid]
+            finally:
+                _dataset = None
+                _features.clear()
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach_dataset,
+                                     initargs=(dataset.handle(),)) as pool:
+                rows = list(pool.map(self.evaluate, grid))
+        return sorted(rows, key=lambda row: row['avg_r'] if row['avg_r'] is not None else float('-inf'),
+                      reverse=True)
+
+    @staticmethod
+    def grid(base_thresholds, exciting_thresholds, gap_thresholds):
+        return list(itertools.product(base_thresholds, exciting_thresholds, gap_thresholds))
+
+    # ------------------------------------------------------------------
+    #                   OUTPUT
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def format_report(rows, elapsed, top=20):
+        lines = [f"Evaluated {len(rows)} parameter sets in {elapsed:.1f}s"]
+        lines.append(f"{'base':>6}{'excite':>8}{'gap':>7}{'demand':>8}{'supply':>8}{'touched':>9}"
+                     f"{'hit%':>7}{'avg R':>8}{'total R':>9}")
+        for row in rows[:top]:
+            hit_rate = f"{row['hit_rate'] * 100:.1f}" if row['hit_rate'] is not None else '-'
+            avg_r = f"{row['avg_r']:.3f}" if row['avg_r'] is not None else '-'
+            lines.append(
+                f"{row['base_candle_threshold']:>6.2f}{row['exciting_candle_threshold']:>8.2f}"
+                f"{row['gap_threshold']:>7.3f}{row['demand_zones']:>8}{row['supply_zones']:>8}"
+                f"{row['touched']:>9}{hit_rate:>7}{avg_r:>8}{row['total_r']:>9.1f}"
+            )
+        return "\n".join(lines)
+
+    @staticmethod
+    def write_csv(rows, path):
+        with open(path, 'w', newline='') as handle:
+            writer = csv.DictWriter(handle, fieldnames=SWEEP_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+def _attach_dataset(handle):
+    global _dataset
+    _dataset = SharedOHLCV.attach(handle)
+    _features.clear()
+
+
+def _floats(text):
+    return [float(value) for value in text.split(',') if value.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep candle thresholds and gap percentages over a universe.")
+    parser.add_argument('--symbols', help="Comma-separated symbols fetched through DataFetcher.")
+    parser.add_argument('--period', default='10y')
+    parser.add_argument('--synthetic', type=int, default=0, help="Number of synthetic symbols to add.")
+    parser.add_argument('--bars', type=int, default=2520, help="Bars per synthetic symbol.")
+    parser.add_argument('--interval', default='1d')
+    parser.add_argument('--base', default='0.3,0.5,0.7', help="Base candle thresholds.")
+    parser.add_argument('--exciting', default='0.3,0.5,0.7', help="Exciting candle thresholds.")
+    parser.add_argument('--gap', default='0.02,0.03,0.05', help="Gap thresholds (fraction of previous close).")
+    parser.add_argument('--target-r', type=float, default=DEFAULT_TARGET_R)
+    parser.add_argument('--workers', type=int, default=BACKTEST_WORKERS)
+    parser.add_argument('--csv', help="Write all rows to this CSV file.")
+    parser.add_argument('--json', help="Write all rows to this JSON file.")
+    args = parser.parse_args(argv)
+
+    sources = universe_sources(args.symbols, args.period, args.synthetic, args.bars)
+    if not sources:
+        parser.error("give --symbols and/or --synthetic")
+
+    engine = SweepEngine(args.interval, args.target_r)
+    started = time.perf_counter()
+    grid = SweepEngine.grid(_floats(args.base), _floats(args.exciting), _floats(args.gap))
+    with engine.load_universe(sources) as dataset:
+        rows = engine.run(dataset, grid, args.workers)
+    print(SweepEngine.format_report(rows, time.perf_counter() - started))
+
+    if args.csv:
+        SweepEngine.write_csv(rows, args.csv)
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump(rows, handle, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
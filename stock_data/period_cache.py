@@ -0,0 +1,334 @@
+"""
+Period-superset cache.
+
+Each symbol/interval is fetched once for SUPERSET_PERIOD and scanned once for
+demand and supply zones. A shorter period's bars are a suffix of that frame, so
+a request for '6mo' or '2y' is answered by slicing the bars and reusing the
+superset's zones instead of fetching and scanning again.
+
+Only the start of a slice can differ from the superset: the scanner is
+re-run from the slice's first bar until it reaches a position (and zone_id
+bookkeeping) the superset scan also passed through, after which the remaining
+superset zones are reused with their positions and ids shifted. Freshness only
+depends on the bars after a zone, so it is re-evaluated for the zones found in
+that leading stretch only. The result is the same as scanning the sliced frame.
+
+The superset scan itself, the largest CPU stage of a request, runs in the
+compute pool (stock_data.compute_pool) with the bars passed in shared memory.
+"""
+import os
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+import pandas as pd
+from stock_data.data_fetcher import DataFetcher
+from stock_data.candlestick_utils import CandleStickUtils, BASE_CANDLE_THRESHOLD, EXCITING_CANDLE_THRESHOLD
+from stock_data.zone_scanner import ZoneScanner, ScanState
+from stock_data.bar_pyramid import BarPyramid
+from stock_data.shared_ohlcv import SharedOHLCV
+from stock_data.compute_pool import compute_pool
+from stock_data.metrics import metrics
+
+# Period fetched and scanned per symbol/interval; shorter periods are sliced from it
+SUPERSET_PERIOD = os.environ.get('SUPERSET_PERIOD', 'max')
+# Seconds a superset is reused before it is fetched again
+SUPERSET_CACHE_TTL = float(os.environ.get('SUPERSET_CACHE_TTL', '300'))
+SUPERSET_CACHE_SIZE = int(os.environ.get('SUPERSET_CACHE_SIZE', '128'))
+
+ZONE_TYPES = ('Demand', 'Supply')
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+_PERIOD_PATTERN = re.compile(r'^(\d+)(d|mo|y)$')
+_PERIOD_DAYS = {'d': 1, 'mo': 30.44, 'y': 365.25}
+
+
+def period_days(period):
+    """
+    Approximate calendar length of a yfinance period ('max' is unbounded).
+
+    :return: Days as a float, or None for an unrecognised period.
+    """
+    if period == 'max':
+        return float('inf')
+    if period == 'ytd':
+        return 366.0
+    match = _PERIOD_PATTERN.match(period or '')
+    if not match:
+        return None
+    return int(match.group(1)) * _PERIOD_DAYS[match.group(2)]
+
+
+def period_start(index, period):
+    """
+    First position of index that falls inside period, counted back from the last bar.
+    """
+    if not len(index) or period == 'max':
+        return 0
+    last = index[-1]
+    if period == 'ytd':
+        cutoff = last.normalize().replace(month=1, day=1)
+    else:
+        count, unit = _PERIOD_PATTERN.match(period).groups()
+        count = int(count)
+        if unit == 'd':
+            # Trading days: the last bar counts as the first of them
+            cutoff = last.normalize() - pd.offsets.BDay(count - 1)
+        elif unit == 'mo':
+            cutoff = last - pd.DateOffset(months=count)
+        else:
+            cutoff = last - pd.DateOffset(years=count)
+    return int(index.searchsorted(cutoff, side='left'))
+
+
+class PeriodSlice:
+    """
+    A period's bars and zones, as DemandZoneManager consumes them.
+    """
+
+    def __init__(self, frame, zones, fresh):
+        """
+        :param frame: OHLCV frame with the candle identifier columns (a private copy).
+        :param zones: {'Demand': [pattern, ...], 'Supply': [...]} legacy pattern dicts.
+        :param fresh: {'Demand': [bool, ...], 'Supply': [...]} aligned with zones.
+        """
+        self.frame = frame
+        self.zones = zones
+        self.fresh = fresh
+
+    def all_zones(self, zone_type):
+        return list(self.zones[zone_type])
+
+    def fresh_zones(self, zone_type):
+        return [zone for zone, is_fresh in zip(self.zones[zone_type], self.fresh[zone_type]) if is_fresh]
+
+
+class SupersetScan:
+    """
+    One fetched frame with its full demand/supply scans and the scanner trace
+    used to re-join the scan from any slice start.
+    """
+
+    def __init__(self, frame, interval, scans=None):
+        """
+        :param scans: scan_zones(frame, interval) when it was already computed elsewhere.
+        """
+        self.interval = interval
+        self.ohlcv = frame
+        self.fetched_at = time.monotonic()
+        self._pyramid = None
+        self.scans = scans if scans is not None else self.scan_zones(frame, interval)
+
+    @staticmethod
+    def scan_zones(frame, interval):
+        """
+        Full demand and supply scans of frame.
+
+        :return: {zone_type: (specs, trace, freshness flags)}
+        """
+        marked = CandleStickUtils.add_candle_identifiers(frame.copy(), BASE_CANDLE_THRESHOLD, EXCITING_CANDLE_THRESHOLD)
+        arrays = ZoneScanner.candle_arrays(marked)
+        scans = {}
+        for zone_type in ZONE_TYPES:
+            state = ScanState(zone_type, interval)
+            trace = {}
+            ZoneScanner.advance(state, arrays, trace=trace)
+            scans[zone_type] = (state.specs, trace, SupersetScan.spec_fresh_flags(arrays, state.specs, zone_type))
+        return scans
+
+    @staticmethod
+    def pooled_scan_zones(stock_code, frame, interval):
+        """
+        scan_zones in the compute pool, the bars handed over in shared memory.
+        """
+        if not compute_pool.offloads(len(frame)):
+            return SupersetScan.scan_zones(frame, interval)
+        with SharedOHLCV.create([(stock_code, interval, frame)]) as dataset:
+            return compute_pool.run(_scan_shared, dataset.handle(), stock_code, interval)
+
+    @property
+    def pyramid(self):
+        """
+        BarPyramid over the whole frame, built on first use.
+        """
+        if self._pyramid is None:
+            self._pyramid = BarPyramid(self.ohlcv)
+        return self._pyramid
+
+    def slice(self, period):
+        """
+        :return: PeriodSlice for the bars of period at the end of this frame.
+        """
+        offset = period_start(self.ohlcv.index, period)
+        with metrics.span('slice_candles', self.interval):
+            frame = self.ohlcv.iloc[offset:].copy()
+            CandleStickUtils.add_candle_identifiers(frame, BASE_CANDLE_THRESHOLD, EXCITING_CANDLE_THRESHOLD)
+            arrays = ZoneScanner.candle_arrays(frame)
+            ohlc_rows = ZoneScanner.ohlc_rows(frame)
+
+        zones, fresh = {}, {}
+        for zone_type in ZONE_TYPES:
+            state = ScanState(zone_type, self.interval)
+            specs, flags = self._slice_specs(state, arrays, offset)
+            with metrics.span(f'{zone_type.lower()}_scan', self.interval):
+                zones[zone_type] = [ZoneScanner.to_pattern(frame, state, spec, ohlc_rows) for spec in specs]
+            fresh[zone_type] = flags
+        return PeriodSlice(frame, zones, fresh)
+
+    def _slice_specs(self, state, arrays, offset):
+        """
+        Scans the slice until it joins the superset scan, then reuses the rest.
+
+        :return: (specs in slice positions, freshness flags).
+        """
+        full_specs, trace, full_fresh = self.scans[state.zone_type]
+        if offset == 0:
+            return full_specs, full_fresh
+
+        def joined(st):
+            # Supply bumps zone_id differently before the first pattern, so that must agree too
+            entry = trace.get(st.i + offset)
+            return entry is not None and (entry[1] > 0) == bool(st.specs)
+
+        kind = state.zone_type.lower()
+        with metrics.span(f'{kind}_scan', self.interval):
+            ZoneScanner.advance(state, arrays, until=joined)
+        head = list(state.specs)
+        with metrics.span(f'{kind}_fresh', self.interval):
+            flags = self.spec_fresh_flags(arrays, head, state.zone_type)
+
+        n = len(arrays['close'])
+        if state.i < n - 1:
+            full_zone_id, committed = trace[state.i + offset]
+            shift = state.zone_id - full_zone_id
+            for spec in full_specs[committed:]:
+                head.append(dict(
+                    spec,
+                    start=spec['start'] - offset,
+                    end=spec['end'] - offset,
+                    zone_id=spec['zone_id'] + shift,
+                    score_next=spec['score_next'] - offset if spec['score_next'] is not None else None,
+                ))
+            flags = flags + full_fresh[committed:]
+        return head, flags
+
+    @staticmethod
+    def spec_fresh_flags(arrays, specs, zone_type):
+        """
+        ZoneScanner.fresh_flags over positional specs: untouched by every bar after the zone.
+        """
+        lows, highs = arrays['low'], arrays['high']
+        last = len(lows) - 1
+        return [
+            spec['end'] >= last or ZoneScanner.is_untouched(
+                lows[spec['end'] + 1:], highs[spec['end'] + 1:], spec['proximal'], spec['distal'], zone_type
+            )
+            for spec in specs
+        ]
+
+
+class SupersetCache:
+    def __init__(self, superset_period=SUPERSET_PERIOD, ttl=SUPERSET_CACHE_TTL, size=SUPERSET_CACHE_SIZE):
+        self.superset_period = superset_period
+        self.ttl = ttl
+        self.size = size
+        self._entries = OrderedDict()
+        # key -> Future of the fetch+scan in progress, shared by concurrent requests for it
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def covers(self, period):
+        superset_days, days = period_days(self.superset_period), period_days(period)
+        return superset_days is not None and days is not None and days <= superset_days
+
+    def slice(self, stock_code, interval, period):
+        """
+        Bars and zones for stock_code/interval/period, sliced from the cached superset
+        (periods longer than the superset, or unrecognised, are fetched on their own).
+
+        :raises ValueError: When no data could be fetched, as DataFetcher does.
+        """
+        fetch_period = self.superset_period if self.covers(period) else period
+        scan = self.scan(stock_code, interval, fetch_period)
+        return scan.slice(period if fetch_period != period else 'max')
+
+    def superset(self, stock_code, interval):
+        """
+        The cached SupersetScan (every bar of SUPERSET_PERIOD) for stock_code/interval.
+        """
+        return self.scan(stock_code, interval, self.superset_period)
+
+    def cached(self, stock_code, interval, period=None):
+        """
+        Whether scan() would be answered from the cache, without fetching.
+        """
+        entry = self._entries.get((stock_code, interval, period or self.superset_period))
+        return entry is not None and time.monotonic() - entry.fetched_at < self.ttl
+
+    def scan(self, stock_code, interval, period):
+        """
+        Cached SupersetScan for the key, fetched and scanned on a miss. Concurrent
+        misses for the same key wait for the one fetch in progress.
+        """
+        key = (stock_code, interval, period)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry.fetched_at < self.ttl:
+                self._entries.move_to_end(key)
+                metrics.record_cache('superset', True)
+                return entry
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._pending[key] = Future()
+
+        if not owner:
+            metrics.record_cache('superset_inflight', True)
+            return pending.result()
+
+        metrics.record_cache('superset', False)
+        try:
+            entry = self._fetch_scan(stock_code, interval, period)
+        except BaseException as e:
+            with self._lock:
+                self._pending.pop(key, None)
+            pending.set_exception(e)
+            raise
+
+        with self._lock:
+            self._pending.pop(key, None)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        pending.set_result(entry)
+        return entry
+
+    @staticmethod
+    def _fetch_scan(stock_code, interval, period):
+        with metrics.span('fetch', interval):
+            frame = DataFetcher.fetch_stock_data(stock_code, interval=interval, period=period)
+        if frame.empty:
+            raise ValueError(f"Failed to fetch data for {stock_code}")
+        frame = frame[[column for column in OHLCV_COLUMNS if column in frame]]
+        with metrics.span('superset_scan', interval):
+            entry = SupersetScan(frame, interval, SupersetScan.pooled_scan_zones(stock_code, frame, interval))
+        logging.debug("Scanned %s %s %s superset (%s bars)", stock_code, interval, period, len(frame))
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _scan_shared(handle, stock_code, interval):
+    # Runs in a compute pool process
+    dataset = SharedOHLCV.attach(handle)
+    try:
+        return SupersetScan.scan_zones(dataset.frame(stock_code, interval), interval)
+    finally:
+        dataset.close()
+
+
+superset_cache = SupersetCache()
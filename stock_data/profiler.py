@@ -0,0 +1,275 @@
+"""
+On-demand request profiling.
+
+A request is profiled only when it carries a valid signed ``X-Profile-Request``
+header (see ``RequestProfiler.sign``) or the admin ``?profile=<PROFILE_ADMIN_TOKEN>``
+query flag, and only while the per-process rate cap allows it. A background
+thread samples the stacks of the request thread and of the io_pool threads while
+they run tasks submitted for it (each stack rooted at its thread's name), and
+writes:
+
+  * ``<id>.collapsed`` – one ``frame;frame;frame count`` line per stack, ready for
+    flamegraph.pl / speedscope / inferno,
+  * ``<id>.top.txt``  – the hottest functions by self and inclusive samples.
+
+With PROFILE_MODE=deterministic the request runs under cProfile instead and a
+``<id>.prof`` pstats file is written alongside the top functions; cProfile only
+sees the request thread, so io_pool work shows up as the wait in
+``future.result()``. In either mode the compute pool's processes
+(stock_data.compute_pool) are not profiled: their scans and chart encoding
+appear as the calling thread waiting on the pool.
+
+Generate a header value with:
+
+    python -m stock_data.profiler sign / --secret "$FLASK_SECRET_KEY"
+"""
+import os
+import sys
+import hmac
+import time
+import uuid
+import pstats
+import cProfile
+import hashlib
+import logging
+import argparse
+import threading
+import contextvars
+from contextlib import contextmanager
+from collections import Counter
+
+PROFILE_DIR = os.environ.get('PROFILE_DIR', './profiles/')
+PROFILE_ADMIN_TOKEN = os.environ.get('PROFILE_ADMIN_TOKEN')
+PROFILE_MODE = os.environ.get('PROFILE_MODE', 'sampling').lower()
+PROFILE_SAMPLE_INTERVAL_MS = float(os.environ.get('PROFILE_SAMPLE_INTERVAL_MS', '5'))
+# At most this many profiled requests per process per window
+PROFILE_MAX_PER_WINDOW = int(os.environ.get('PROFILE_MAX_PER_WINDOW', '5'))
+PROFILE_WINDOW_SECONDS = int(os.environ.get('PROFILE_WINDOW_SECONDS', '3600'))
+PROFILE_HEADER = 'X-Profile-Request'
+
+# {thread id: name} sampled for the profiled request; io_pool tasks join it while they run
+_profiled_threads = contextvars.ContextVar('profiled_threads', default=None)
+
+
+@contextmanager
+def sampled_thread():
+    """
+    Adds the calling thread to the current request's profile for the duration of the
+    block (io_pool runs every task in one). A no-op when the request is not profiled.
+    """
+    threads = _profiled_threads.get()
+    if threads is None:
+        yield
+        return
+    ident = threading.get_ident()
+    threads[ident] = threading.current_thread().name
+    try:
+        yield
+    finally:
+        threads.pop(ident, None)
+
+
+class StackSampler(threading.Thread):
+    """
+    Samples the Python stacks of a changing set of threads at a fixed interval.
+    """
+
+    def __init__(self, threads, interval):
+        """
+        :param threads: {thread id: name}, updated by the sampled threads as they come and go.
+        """
+        super().__init__(daemon=True)
+        self.threads = threads
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frames = sys._current_frames()
+            for thread_id, name in list(self.threads.items()):
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(name)
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        return self.stacks
+
+
+class ProfileSession:
+    """
+    One profiled request.
+    """
+
+    def __init__(self, label, mode, interval):
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}_{label}_{uuid.uuid4().hex[:8]}"
+        self.mode = mode
+        self.started = time.perf_counter()
+        if mode == 'deterministic':
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        else:
+            threads = {threading.get_ident(): 'request'}
+            self.context_token = _profiled_threads.set(threads)
+            self.sampler = StackSampler(threads, interval)
+            self.sampler.start()
+
+    def finish(self, directory, top_n=30):
+        """
+        Stops profiling and writes the output files.
+
+        :return: List of written paths.
+        """
+        elapsed = time.perf_counter() - self.started
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, self.id)
+        written = []
+
+        if self.mode == 'deterministic':
+            self.profile.disable()
+            self.profile.dump_stats(f"{base}.prof")
+            written.append(f"{base}.prof")
+            with open(f"{base}.top.txt", 'w') as handle:
+                handle.write(f"# {self.id} – {elapsed * 1000:.1f} ms wall\n")
+                stats = pstats.Stats(self.profile, stream=handle)
+                stats.sort_stats('cumulative').print_stats(top_n)
+                stats.sort_stats('tottime').print_stats(top_n)
+            written.append(f"{base}.top.txt")
+            return written
+
+        stacks = self.sampler.stop()
+        _profiled_threads.reset(self.context_token)
+        with open(f"{base}.collapsed", 'w') as handle:
+            for stack, count in stacks.most_common():
+                handle.write(f"{stack} {count}\n")
+        written.append(f"{base}.collapsed")
+
+        with open(f"{base}.top.txt", 'w') as handle:
+            handle.write(self.format_top(stacks, elapsed, top_n))
+        written.append(f"{base}.top.txt")
+        return written
+
+    def format_top(self, stacks, elapsed, top_n):
+        total = sum(stacks.values()) or 1
+        self_samples = Counter()
+        inclusive = Counter()
+        for stack, count in stacks.items():
+            frames = stack.split(';')
+            self_samples[frames[-1]] += count
+            for frame in set(frames):
+                inclusive[frame] += count
+
+        lines = [f"# {self.id} – {elapsed * 1000:.1f} ms wall, {total} samples", "", "## Self"]
+        lines += [f"{count / total:7.1%}  {count:6d}  {frame}" for frame, count in self_samples.most_common(top_n)]
+        lines += ["", "## Inclusive"]
+        lines += [f"{count / total:7.1%}  {count:6d}  {frame}" for frame, count in inclusive.most_common(top_n)]
+        return "\n".join(lines) + "\n"
+
+
+class RequestProfiler:
+    def __init__(self, secret, directory=PROFILE_DIR, admin_token=PROFILE_ADMIN_TOKEN, mode=PROFILE_MODE,
+                 interval_ms=PROFILE_SAMPLE_INTERVAL_MS, max_per_window=PROFILE_MAX_PER_WINDOW,
+                 window_seconds=PROFILE_WINDOW_SECONDS):
+        """
+        :param secret: Key used to verify signed profiling headers.
+        :param directory: Where profile files are written.
+        :param admin_token: Value accepted in the ?profile= query flag (disabled when unset).
+        :param max_per_window: Rate cap on profiled requests per process per window.
+        """
+        self.secret = secret.encode() if isinstance(secret, str) else secret
+        self.directory = directory
+        self.admin_token = admin_token
+        self.mode = mode
+        self.interval = interval_ms / 1000.0
+        self.max_per_window = max_per_window
+        self.window_seconds = window_seconds
+        self.lock = threading.Lock()
+        self.recent = []
+        self.active = False
+
+    @staticmethod
+    def sign(path, secret, ttl=300):
+        """
+        Builds an X-Profile-Request header value authorising profiling of `path` for `ttl` seconds.
+        """
+        expires = int(time.time()) + ttl
+        key = secret.encode() if isinstance(secret, str) else secret
+        digest = hmac.new(key, f"{path}:{expires}".encode(), hashlib.sha256).hexdigest()
+        return f"{expires}.{digest}"
+
+    def is_authorised(self, path, header_value, query_token):
+        # Compared as bytes: compare_digest raises TypeError on non-ASCII str from the client
+        if self.admin_token and query_token and hmac.compare_digest(query_token.encode(), self.admin_token.encode()):
+            return True
+        if not header_value or not self.secret:
+            return False
+        expires, _, digest = header_value.partition('.')
+        if not (expires.isascii() and expires.isdigit()) or int(expires) < time.time():
+            return False
+        expected = hmac.new(self.secret, f"{path}:{expires}".encode(), hashlib.sha256).hexdigest()
+        return hmac.compare_digest(digest.encode(), expected.encode())
+
+    def start(self, path, header_value=None, query_token=None):
+        """
+        Starts profiling the calling thread if the request is authorised and the
+        rate cap allows it.
+
+        :return: ProfileSession or None.
+        """
+        if not (header_value or query_token):
+            return None
+        if not self.is_authorised(path, header_value, query_token):
+            logging.warning("Rejected profiling request for %s: bad signature or token", path)
+            return None
+
+        now = time.time()
+        with self.lock:
+            self.recent = [t for t in self.recent if now - t < self.window_seconds]
+            # One profile at a time per process; cProfile cannot nest and sampling skews timings
+            if self.active or len(self.recent) >= self.max_per_window:
+                logging.warning("Profiling request for %s skipped: rate cap reached", path)
+                return None
+            self.recent.append(now)
+            self.active = True
+
+        label = path.strip('/').replace('/', '_') or 'root'
+        return ProfileSession(label, self.mode, self.interval)
+
+    def finish(self, session):
+        try:
+            paths = session.finish(self.directory)
+            logging.info("Wrote request profile %s", ', '.join(paths))
+            return paths
+        except Exception as e:
+            logging.error("Failed to write request profile: %s", e)
+            return []
+        finally:
+            with self.lock:
+                self.active = False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Request profiling helpers.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sign = sub.add_parser('sign', help=f"Print an {PROFILE_HEADER} header value.")
+    sign.add_argument('path')
+    sign.add_argument('--secret', default=os.environ.get('FLASK_SECRET_KEY'))
+    sign.add_argument('--ttl', type=int, default=300)
+    args = parser.parse_args(argv)
+
+    if not args.secret:
+        parser.error("--secret or FLASK_SECRET_KEY is required")
+    print(f"{PROFILE_HEADER}: {RequestProfiler.sign(args.path, args.secret, args.ttl)}")
+
+
+if __name__ == '__main__':
+    main()
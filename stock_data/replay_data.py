@@ -0,0 +1,167 @@
+import os
+import re
+import logging
+import numpy as np
+import pandas as pd
+
+# Bar frequency used when synthesizing frames for a yfinance interval
+SYNTHETIC_FREQUENCIES = {
+    '1m': 'min', '2m': '2min', '5m': '5min', '15m': '15min', '30m': '30min',
+    '60m': 'h', '90m': '90min', '1h': 'h',
+    '1d': 'B', '5d': '5B', '1wk': 'W-MON', '1mo': 'MS', '3mo': 'QS',
+}
+
+# Approximate number of trading days covered by a yfinance period
+PERIOD_TRADING_DAYS = {
+    '1d': 1, '5d': 5, '1mo': 21, '3mo': 63, '6mo': 126, '1y': 252,
+    '2y': 504, '5y': 1260, '10y': 2520, 'ytd': 200, 'max': 5040,
+}
+
+# Approximate number of trading days covered by one bar of an interval
+INTERVAL_TRADING_DAYS = {
+    '1m': 1 / 375, '2m': 2 / 375, '5m': 5 / 375, '15m': 15 / 375, '30m': 30 / 375,
+    '60m': 60 / 375, '90m': 90 / 375, '1h': 60 / 375,
+    '1d': 1, '5d': 5, '1wk': 5, '1mo': 21, '3mo': 63,
+}
+
+
+class ReplayDataProvider:
+    """
+    Serves OHLCV frames recorded to disk (or synthesized on demand) in the same
+    shape as DataFetcher.fetch_stock_data, so the zone pipeline can run without
+    reaching Yahoo Finance.
+
+    Recorded frames are CSV files named ``<SYMBOL>_<interval>_<period>.csv`` or,
+    when a recording is valid for any period, ``<SYMBOL>_<interval>.csv``.
+    """
+
+    def __init__(self, data_dir, synthesize=False):
+        """
+        :param data_dir: Directory holding the recorded CSV frames.
+        :param synthesize: Generate a deterministic synthetic frame when no recording exists.
+        """
+        self.data_dir = data_dir
+        self.synthesize = synthesize
+
+    @staticmethod
+    def file_key(stock_code):
+        """
+        Turns a stock code such as 'NIFTY FMCG' or 'M&M' into a filesystem-safe key.
+        """
+        return re.sub(r'[^A-Z0-9_-]+', '_', stock_code.upper())
+
+    def path_for(self, stock_code, interval, period=None):
+        """
+        Returns the path of the recording for the given request, preferring a
+        period-specific file over a period-agnostic one. Returns None if neither exists.
+        """
+        key = self.file_key(stock_code)
+        candidates = []
+        if period:
+            candidates.append(os.path.join(self.data_dir, f"{key}_{interval}_{period}.csv"))
+        candidates.append(os.path.join(self.data_dir, f"{key}_{interval}.csv"))
+        for path in candidates:
+            if os.path.exists(path):
+                return path
+        return None
+
+    def fetch_stock_data(self, stock_code, interval='1d', period='1y'):
+        """
+        Loads the recorded frame for stock_code/interval/period.
+
+        :raises ValueError: If nothing is recorded and synthesis is disabled, mirroring DataFetcher.
+        """
+        path = self.path_for(stock_code, interval, period)
+        if path:
+            logging.debug("Replaying %s %s %s from %s", stock_code, interval, period, path)
+            return self.read_frame(path)
+
+        if self.synthesize:
+            logging.debug("Synthesizing %s %s %s", stock_code, interval, period)
+            return synthetic_ohlcv(stock_code, interval, bars_for_period(interval, period))
+
+        logging.error("No replay data for %s %s %s", stock_code, interval, period)
+        raise ValueError(f"Failed to fetch data for {stock_code}")
+
+    def record(self, stock_code, interval, period, data):
+        """
+        Stores a fetched frame so that it can be replayed later.
+        """
+        os.makedirs(self.data_dir, exist_ok=True)
+        path = os.path.join(self.data_dir, f"{self.file_key(stock_code)}_{interval}_{period}.csv")
+        data.to_csv(path)
+        return path
+
+    def corpus(self):
+        """
+        Yields (stock_code, interval, frame) for every recording in data_dir.
+        """
+        if not os.path.isdir(self.data_dir):
+            return
+        for name in sorted(os.listdir(self.data_dir)):
+            if not name.endswith('.csv'):
+                continue
+            parts = name[:-4].split('_')
+            intervals = [p for p in parts if p in SYNTHETIC_FREQUENCIES]
+            if not intervals:
+                continue
+            interval = intervals[0]
+            stock_code = '_'.join(parts[:parts.index(interval)])
+            yield stock_code, interval, self.read_frame(os.path.join(self.data_dir, name))
+
+    @staticmethod
+    def read_frame(path):
+        data = pd.read_csv(path, index_col=0)
+        data.index = pd.to_datetime(data.index, utc=True).tz_convert('Asia/Kolkata')
+        data.index.name = 'Date'
+        return data
+
+
+def bars_for_period(interval, period):
+    """
+    Approximates how many bars yfinance returns for an interval/period pair.
+    """
+    days = PERIOD_TRADING_DAYS.get(period, 252)
+    per_bar = INTERVAL_TRADING_DAYS.get(interval, 1)
+    return max(int(days / per_bar), 2)
+
+
+def synthetic_ohlcv(stock_code, interval='1d', bars=500, seed=None, volatility=0.02):
+    """
+    Builds a deterministic random-walk OHLCV frame shaped like a yfinance history
+    (tz-aware index, Open/High/Low/Close/Volume/Dividends/Stock Splits columns).
+
+    :param stock_code: Used to derive the seed when none is given, so a symbol always
+                       produces the same frame.
+    :param bars: Number of bars to generate.
+    :param volatility: Standard deviation of the per-bar log return.
+    """
+    if seed is None:
+        seed = sum(ord(ch) * (i + 1) for i, ch in enumerate(f"{stock_code}:{interval}"))
+    rng = np.random.default_rng(seed)
+
+    # Occasional large moves so that gaps and exciting candles actually appear
+    returns = rng.normal(0, volatility, bars)
+    jumps = rng.random(bars) < 0.03
+    returns[jumps] += rng.normal(0, volatility * 4, jumps.sum())
+    close = 100 * np.exp(np.cumsum(returns))
+
+    gaps = rng.normal(0, volatility / 3, bars)
+    gaps[jumps] *= 6
+    open_ = np.r_[close[0], close[:-1]] * (1 + gaps)
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, volatility / 2, bars)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, volatility / 2, bars)))
+
+    freq = SYNTHETIC_FREQUENCIES.get(interval, 'B')
+    index = pd.date_range(end='2025-01-01', periods=bars, freq=freq, name='Date')
+    index = index.tz_localize('Asia/Kolkata', nonexistent='shift_forward', ambiguous=False)
+
+    return pd.DataFrame({
+        'Open': open_,
+        'High': high,
+        'Low': low,
+        'Close': close,
+        'Volume': rng.integers(10_000, 1_000_000, bars),
+        'Dividends': 0.0,
+        'Stock Splits': 0.0,
+    }, index=index)
@@ -0,0 +1,213 @@
+"""
+Server-side sessions in a single SQLite file.
+
+Each session is one row keyed by a random id carried in the (signed) session
+cookie. Payloads are msgpack-encoded and zlib-compressed when large, rows are
+written only when the session changed, and expired rows are purged
+periodically, so the store no longer grows one pickle per visitor.
+
+    app.session_interface = SqliteSessionInterface(SESSION_DB_PATH)
+"""
+import os
+import time
+import zlib
+import sqlite3
+import logging
+import secrets
+import threading
+import msgspec
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import Signer, BadSignature
+from werkzeug.datastructures import CallbackDict
+
+SESSION_DB_PATH = os.environ.get('SESSION_DB_PATH', './flask_session/sessions.sqlite3')
+SESSION_TTL_SECONDS = int(os.environ.get('SESSION_TTL_SECONDS', str(7 * 24 * 3600)))
+# Expired rows are deleted at most once per interval per process
+SESSION_PURGE_INTERVAL = int(os.environ.get('SESSION_PURGE_INTERVAL', '300'))
+# Payloads above this many bytes are zlib-compressed
+SESSION_COMPRESS_MIN_BYTES = 1024
+
+_RAW = b'\x00'
+_ZLIB = b'\x01'
+
+
+class SqliteSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, new=False, expires=None):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.expires = expires
+        self.modified = False
+
+
+class SqliteSessionInterface(SessionInterface):
+    def __init__(self, path=SESSION_DB_PATH, ttl=SESSION_TTL_SECONDS, purge_interval=SESSION_PURGE_INTERVAL,
+                 use_signer=True, salt='priceaction-session'):
+        """
+        :param path: SQLite database file.
+        :param ttl: Seconds of inactivity after which a session expires.
+        :param purge_interval: Minimum seconds between expired-row sweeps.
+        :param use_signer: Sign the session id in the cookie with the app secret.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self.use_signer = use_signer
+        self.salt = salt
+        self.local = threading.local()
+        self.last_purge = 0.0
+        self.encoder = msgspec.msgpack.Encoder(enc_hook=self._enc_hook)
+        self.decoder = msgspec.msgpack.Decoder()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "sid TEXT PRIMARY KEY, data BLOB NOT NULL, expires REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires)")
+
+    # ------------------------------------------------------------------
+    #                   STORAGE
+    # ------------------------------------------------------------------
+
+    def _connection(self):
+        # One connection per thread and process; sqlite handles must not cross a fork
+        conn = getattr(self.local, 'conn', None)
+        if conn is None or self.local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+        return conn
+
+    def load(self, sid):
+        row = self._connection().execute(
+            "SELECT data, expires FROM sessions WHERE sid = ? AND expires > ?", (sid, time.time())
+        ).fetchone()
+        if row is None:
+            return None, None
+        return self.decode(row[0]), row[1]
+
+    def store(self, sid, data, expires):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO sessions (sid, data, expires) VALUES (?, ?, ?)",
+            (sid, self.encode(data), expires)
+        )
+
+    def touch(self, sid, expires):
+        self._connection().execute("UPDATE sessions SET expires = ? WHERE sid = ?", (expires, sid))
+
+    def delete(self, sid):
+        self._connection().execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def purge_expired(self, force=False):
+        """
+        Deletes expired rows, at most once per purge interval unless forced.
+
+        :return: Number of rows deleted.
+        """
+        now = time.time()
+        if not force and now - self.last_purge < self.purge_interval:
+            return 0
+        self.last_purge = now
+        deleted = self._connection().execute("DELETE FROM sessions WHERE expires <= ?", (now,)).rowcount
+        if deleted:
+            logging.info("Purged %d expired sessions", deleted)
+        return deleted
+
+    # ------------------------------------------------------------------
+    #                   ENCODING
+    # ------------------------------------------------------------------
+
+    def encode(self, data):
+        payload = self.encoder.encode(data)
+        if len(payload) >= SESSION_COMPRESS_MIN_BYTES:
+            return _ZLIB + zlib.compress(payload, 6)
+        return _RAW + payload
+
+    def decode(self, blob):
+        blob = bytes(blob)
+        payload = zlib.decompress(blob[1:]) if blob[:1] == _ZLIB else blob[1:]
+        return self.decoder.decode(payload)
+
+    @staticmethod
+    def _enc_hook(obj):
+        # numpy scalars and other stragglers from the zone DTOs
+        if hasattr(obj, 'item'):
+            return obj.item()
+        if hasattr(obj, 'isoformat'):
+            return obj.isoformat()
+        return str(obj)
+
+    # ------------------------------------------------------------------
+    #                   FLASK INTERFACE
+    # ------------------------------------------------------------------
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt=self.salt, key_derivation='hmac')
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        sid = None
+        if cookie:
+            if self.use_signer:
+                try:
+                    sid = self._signer(app).unsign(cookie).decode()
+                except BadSignature:
+                    sid = None
+            else:
+                sid = cookie
+
+        if sid:
+            try:
+                data, expires = self.load(sid)
+            except (sqlite3.Error, msgspec.DecodeError, zlib.error) as e:
+                logging.error("Failed to load session: %s", e)
+                data, expires = None, None
+            if data is not None:
+                return SqliteSession(data, sid=sid, expires=expires)
+
+        return SqliteSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified and not session.new:
+                self.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        now = time.time()
+        expires = now + self.ttl
+        try:
+            if session.modified or session.new:
+                self.store(session.sid, dict(session), expires)
+            elif session.expires is not None and session.expires - now < self.ttl / 2:
+                # Read-only request: extend the expiry cheaply, and only occasionally
+                self.touch(session.sid, expires)
+            else:
+                return
+            self.purge_expired()
+        except sqlite3.Error as e:
+            logging.error("Failed to save session: %s", e)
+            return
+
+        cookie = self._signer(app).sign(session.sid).decode() if self.use_signer else session.sid
+        response.set_cookie(
+            name, cookie,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
@@ -0,0 +1,153 @@
+"""
+Shared-memory OHLCV dataset for process-pool workers.
+
+The universe is loaded once into two ``multiprocessing.shared_memory`` blocks:
+a (5, total_bars) float64 array of Open/High/Low/Close/Volume and a matching
+int64 array of UTC timestamps (ns). An offset table maps (symbol, interval) to
+its slice. Workers receive only ``handle()`` – block names plus the table – and
+``attach`` to the same memory without copying.
+
+    with SharedOHLCV.create(frames) as dataset:
+        pool = ProcessPoolExecutor(initializer=worker_init, initargs=(dataset.handle(),))
+
+    def worker_init(handle):
+        dataset = SharedOHLCV.attach(handle)
+        arrays = dataset.arrays('TCS', '1d')   # zero-copy read-only views
+"""
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+class SharedOHLCV:
+    def __init__(self, table, values_block, times_block, total, owner):
+        """
+        Use create() or attach() rather than constructing directly.
+
+        :param table: {(symbol, interval): (start, length, tz)}.
+        """
+        self.table = table
+        self.total = total
+        self.owner = owner
+        self._values_block = values_block
+        self._times_block = times_block
+        self.values = np.ndarray((len(COLUMNS), total), dtype=np.float64, buffer=values_block.buf)
+        self.times = np.ndarray((total,), dtype=np.int64, buffer=times_block.buf)
+        if not owner:
+            self.values.flags.writeable = False
+            self.times.flags.writeable = False
+
+    @classmethod
+    def create(cls, frames):
+        """
+        Copies frames into new shared blocks.
+
+        :param frames: Iterable of (symbol, interval, DataFrame) with the COLUMNS
+                       (a missing Volume column is stored as zeros).
+        """
+        frames = [(symbol, interval, frame) for symbol, interval, frame in frames]
+        total = sum(len(frame) for _, _, frame in frames)
+        # Zero-sized blocks are not allowed
+        values_block = shared_memory.SharedMemory(create=True, size=max(1, total * len(COLUMNS) * 8))
+        times_block = shared_memory.SharedMemory(create=True, size=max(1, total * 8))
+        dataset = cls({}, values_block, times_block, total, owner=True)
+
+        start = 0
+        for symbol, interval, frame in frames:
+            length = len(frame)
+            for row, column in enumerate(COLUMNS):
+                if column in frame:
+                    dataset.values[row, start:start + length] = frame[column].to_numpy(dtype=np.float64)
+                else:
+                    dataset.values[row, start:start + length] = 0.0
+            index = pd.DatetimeIndex(frame.index)
+            tz = str(index.tz) if index.tz is not None else None
+            utc = index.tz_convert('UTC') if tz else index
+            dataset.times[start:start + length] = utc.asi8
+            dataset.table[(symbol, interval)] = (start, length, tz)
+            start += length
+        return dataset
+
+    def handle(self):
+        """
+        Small picklable description of the dataset for attach().
+        """
+        return {
+            'values': self._values_block.name,
+            'times': self._times_block.name,
+            'total': self.total,
+            'table': dict(self.table),
+        }
+
+    @classmethod
+    def attach(cls, handle):
+        """
+        Maps an existing dataset by name; the arrays are read-only views.
+        """
+        values_block = shared_memory.SharedMemory(name=handle['values'])
+        times_block = shared_memory.SharedMemory(name=handle['times'])
+        return cls(handle['table'], values_block, times_block, handle['total'], owner=False)
+
+    # ------------------------------------------------------------------
+    #                   ACCESS
+    # ------------------------------------------------------------------
+
+    def keys(self):
+        return list(self.table)
+
+    def __contains__(self, key):
+        return key in self.table
+
+    def __len__(self):
+        return len(self.table)
+
+    def arrays(self, symbol, interval):
+        """
+        :return: {'open', 'high', 'low', 'close', 'volume'} views into shared memory.
+        """
+        start, length, _ = self.table[(symbol, interval)]
+        block = self.values[:, start:start + length]
+        return {column.lower(): block[row] for row, column in enumerate(COLUMNS)}
+
+    def index(self, symbol, interval):
+        start, length, tz = self.table[(symbol, interval)]
+        index = pd.DatetimeIndex(self.times[start:start + length].copy(), name='Date')
+        if tz:
+            index = index.tz_localize('UTC').tz_convert(tz)
+        return index
+
+    def frame(self, symbol, interval):
+        """
+        Materialises one entry as a DataFrame (a copy, safe to mutate).
+        """
+        start, length, _ = self.table[(symbol, interval)]
+        data = {column: self.values[row, start:start + length].copy() for row, column in enumerate(COLUMNS)}
+        return pd.DataFrame(data, index=self.index(symbol, interval))
+
+    # ------------------------------------------------------------------
+    #                   LIFECYCLE
+    # ------------------------------------------------------------------
+
+    def close(self):
+        """
+        Detaches this process. Views returned by arrays() must no longer be in use.
+        """
+        if self._values_block is None:
+            return
+        self.values = None
+        self.times = None
+        self._values_block.close()
+        self._times_block.close()
+        if self.owner:
+            self._values_block.unlink()
+            self._times_block.unlink()
+        self._values_block = None
+        self._times_block = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,218 @@
+"""
+Fingerprinted, precompressed static assets.
+
+A build step copies every file under static/ to static/dist/ with a content
+hash in its name (``js/main.js`` -> ``js/main.3f9c2a1b7d40.js``) next to
+``.gz`` (and, with the ``brotli`` package, ``.br``) copies compressed at the
+maximum levels, and writes a manifest mapping logical names to hashed ones.
+Because a hashed name never changes content, the app serves those files with
+a one-year ``immutable`` Cache-Control, picking the precompressed variant
+from the request's Accept-Encoding.
+
+The plotly.js bundle is taken from the installed plotly package, so the
+client library always matches the figure JSON the server emits.
+
+    python -m stock_data.static_assets            # build into static/dist
+    python -m stock_data.static_assets --clean    # remove stale hashed files too
+
+Until the build has run, asset URLs fall back to the plain /static files
+(and plotly.js to its CDN build).
+"""
+import os
+import sys
+import json
+import hashlib
+import logging
+import argparse
+import mimetypes
+from stock_data.compression import brotli, compress, choose_encoding, COMPRESSIBLE_TYPES
+
+STATIC_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+STATIC_ASSETS_DIR = os.environ.get('STATIC_ASSETS_DIR', os.path.join(STATIC_ROOT, 'dist'))
+MANIFEST_NAME = 'manifest.json'
+# Cache lifetime of hashed assets; their URL changes whenever their content does
+ASSET_MAX_AGE = int(os.environ.get('ASSET_MAX_AGE', str(365 * 24 * 3600)))
+PLOTLY_ASSET = 'js/plotly.min.js'
+# Files under static/ that are not shipped
+SKIP_NAMES = {'.DS_Store'}
+# Precompressed variants, most preferred first
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def generated_assets():
+    """
+    Assets produced from installed packages rather than read from static/.
+
+    :return: {logical name: bytes}
+    """
+    from plotly.offline import get_plotlyjs
+    return {PLOTLY_ASSET: get_plotlyjs().encode('utf-8')}
+
+
+def fallback_urls():
+    """
+    URLs used for generated assets while no build is present.
+    """
+    from plotly.offline import get_plotlyjs_version
+    return {PLOTLY_ASSET: f'https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js'}
+
+
+class StaticAssets:
+    def __init__(self, root=STATIC_ROOT, out_dir=STATIC_ASSETS_DIR):
+        self.root = root
+        self.out_dir = out_dir
+        self._manifest = None
+
+    # ------ BUILD ------
+
+    @staticmethod
+    def hashed_name(name, content):
+        """
+        name with the first 12 hex digits of content's SHA-256 before the last extension.
+        """
+        digest = hashlib.sha256(content).hexdigest()[:12]
+        stem, ext = os.path.splitext(name)
+        return f'{stem}.{digest}{ext}'
+
+    def sources(self):
+        """
+        :return: {logical name: bytes} of every asset to build, '/'-separated names.
+        """
+        assets = {}
+        out_dir = os.path.abspath(self.out_dir)
+        for directory, subdirs, files in os.walk(self.root):
+            subdirs[:] = [d for d in subdirs if os.path.abspath(os.path.join(directory, d)) != out_dir]
+            for filename in files:
+                if filename in SKIP_NAMES:
+                    continue
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, self.root).replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    assets[name] = f.read()
+        assets.update(generated_assets())
+        return assets
+
+    def build(self, clean=False):
+        """
+        Writes the hashed files, their compressed variants and the manifest.
+
+        :param clean: Delete files of earlier builds that the new manifest no longer lists.
+        :return: The manifest, {logical name: hashed name}.
+        """
+        manifest = {}
+        written = {MANIFEST_NAME}
+        for name, content in sorted(self.sources().items()):
+            hashed = self.hashed_name(name, content)
+            manifest[name] = hashed
+            path = os.path.join(self.out_dir, hashed)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._write(path, content)
+            written.add(hashed)
+
+            if self.mimetype(name) not in COMPRESSIBLE_TYPES:
+                continue
+            for encoding, suffix in ENCODING_SUFFIXES.items():
+                if encoding == 'br' and brotli is None:
+                    continue
+                packed = compress(content, encoding, build=True)
+                if len(packed) < len(content):
+                    self._write(path + suffix, packed)
+                    written.add(hashed + suffix)
+            logging.info("Built %s -> %s (%s bytes)", name, hashed, len(content))
+
+        if brotli is None:
+            logging.warning("brotli not installed; built gzip variants only")
+        if clean:
+            self._remove_stale(written)
+        self._write(os.path.join(self.out_dir, MANIFEST_NAME),
+                    json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'), overwrite=True)
+        self._manifest = manifest
+        return manifest
+
+    @staticmethod
+    def _write(path, content, overwrite=False):
+        # Content-addressed files are written once; rebuilding the same content is a no-op
+        if not overwrite and os.path.exists(path):
+            return
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(content)
+        os.replace(tmp, path)
+
+    def _remove_stale(self, written):
+        for directory, _, files in os.walk(self.out_dir):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                if os.path.relpath(path, self.out_dir).replace(os.sep, '/') not in written:
+                    os.remove(path)
+                    logging.info("Removed stale asset %s", path)
+
+    # ------ SERVE ------
+
+    def manifest(self):
+        """
+        The built manifest, read once; empty when no build is present.
+        """
+        if self._manifest is None:
+            try:
+                with open(os.path.join(self.out_dir, MANIFEST_NAME), encoding='utf-8') as f:
+                    self._manifest = json.load(f)
+            except FileNotFoundError:
+                logging.warning("No static asset build in %s; serving unhashed static files", self.out_dir)
+                self._manifest = {}
+        return self._manifest
+
+    def hashed(self, name):
+        """
+        :return: Hashed name of a built asset, or None.
+        """
+        return self.manifest().get(name)
+
+    def fallback(self, name):
+        return fallback_urls().get(name)
+
+    @staticmethod
+    def mimetype(name):
+        return mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+    def resolve(self, hashed_name, accept_encodings):
+        """
+        File to send for a hashed asset.
+
+        :param accept_encodings: The request's parsed Accept-Encoding.
+        :return: (path, Content-Encoding or None, mimetype), or None when hashed_name is not
+                 part of the build.
+        """
+        if hashed_name not in set(self.manifest().values()):
+            return None
+        path = os.path.join(self.out_dir, hashed_name)
+        candidates = [encoding for encoding, suffix in ENCODING_SUFFIXES.items()
+                      if os.path.exists(path + suffix)]
+        encoding = choose_encoding(accept_encodings, candidates)
+        if encoding is not None:
+            path += ENCODING_SUFFIXES[encoding]
+        return path, encoding, self.mimetype(hashed_name)
+
+
+static_assets = StaticAssets()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build fingerprinted, precompressed static assets.")
+    parser.add_argument('--root', default=STATIC_ROOT, help="Source static directory")
+    parser.add_argument('--out', default=STATIC_ASSETS_DIR, help="Output directory")
+    parser.add_argument('--clean', action='store_true', help="Remove files of earlier builds")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s:%(message)s')
+    if os.path.abspath(args.out) == os.path.abspath(args.root):
+        parser.error("--out must differ from --root")
+    manifest = StaticAssets(args.root, args.out).build(clean=args.clean)
+    import plotly
+    from plotly.offline import get_plotlyjs_version
+    print(f"Built {len(manifest)} assets into {args.out} (plotly.js {plotly.__version__}/{get_plotlyjs_version()})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
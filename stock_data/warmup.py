@@ -0,0 +1,127 @@
+"""
+Start-up warm-up for a preloading server master.
+
+Run once in the gunicorn master before it forks (see gunicorn.conf.py): the
+heavy libraries are imported and exercised, every symbol of the universe gets
+its superset fetched and scanned (the OHLCV and computed-zone caches), and the
+zones API payloads are built. Then the GC is frozen, so the warmed objects are
+never touched by a worker's collections and stay shared copy-on-write instead
+of being copied into every worker.
+
+The warm-up runs once, when the master is ready, and its entries expire like
+any other: after SUPERSET_CACHE_TTL (bars and zones) and ZONES_API_TTL (API
+payloads). Workers forked within those windows start with the caches hot; a
+worker forked later (one replacing a recycled or crashed worker) still shares
+the imported modules and warmed library state, but fetches each symbol again
+on its first request for it.
+
+    WARMUP_SYMBOLS=TCS,INFY,ITC gunicorn -c gunicorn.conf.py app:application
+
+A symbol whose data cannot be fetched is logged and skipped; warm-up never
+stops the server from starting.
+"""
+import os
+import gc
+import time
+import logging
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+from stock_data.period_cache import superset_cache
+from stock_data.zones_api import ZONES_API_INTERVALS
+from stock_data.stocks_config import special_stocks_map
+
+# Comma-separated symbols to warm; unset falls back to the caller's default universe
+WARMUP_SYMBOLS = os.environ.get('WARMUP_SYMBOLS')
+# Period whose zones API payloads are pre-built (the API's default)
+WARMUP_PERIOD = os.environ.get('WARMUP_PERIOD', '2y')
+# Concurrent symbol fetches; warm-up is network bound
+WARMUP_WORKERS = int(os.environ.get('WARMUP_WORKERS', '4'))
+
+# Imported (and so initialised) in the master rather than on a worker's first request
+HEAVY_MODULES = ['numpy', 'pandas', 'plotly.graph_objects', 'plotly.io', 'yfinance', 'openai']
+
+
+class Warmup:
+
+    @staticmethod
+    def symbols(default=()):
+        """
+        The universe to warm: WARMUP_SYMBOLS, else default, plus the index each symbol is
+        shown with on the search page.
+        """
+        symbols = [s.strip().upper() for s in WARMUP_SYMBOLS.split(',')] if WARMUP_SYMBOLS else list(default)
+        universe = []
+        for symbol in filter(None, symbols):
+            for code in (symbol, special_stocks_map.get(symbol)):
+                if code and code not in universe:
+                    universe.append(code)
+        return universe
+
+    @staticmethod
+    def import_modules(modules=HEAVY_MODULES):
+        """
+        Imports the heavy libraries and builds their lazily created state
+        (plotly templates and JSON encoder, the static asset manifest).
+        """
+        for name in modules:
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                logging.debug("Warm-up skipped %s (not installed)", name)
+
+        import numpy as np
+        from plotly.io.json import to_json_plotly
+        from stock_data.figure_builder import template
+        from stock_data.static_assets import static_assets
+        template()
+        to_json_plotly({'x': np.arange(3.0)})
+        static_assets.manifest()
+
+    @staticmethod
+    def warm_symbol(symbol, intervals, period, zones_api=None):
+        """
+        :return: Number of intervals whose superset was cached.
+        """
+        warmed = 0
+        for interval in intervals:
+            try:
+                superset_cache.superset(symbol, interval)
+                warmed += 1
+            except ValueError as e:
+                logging.warning("Warm-up could not fetch %s %s: %s", symbol, interval, e)
+        if zones_api is not None and warmed:
+            try:
+                zones_api.get(symbol, list(intervals), period, False)
+            except Exception as e:
+                logging.warning("Warm-up could not build zones for %s: %s", symbol, e)
+        return warmed
+
+    @staticmethod
+    def run(symbols, intervals=ZONES_API_INTERVALS, period=WARMUP_PERIOD, zones_api=None, workers=WARMUP_WORKERS):
+        """
+        Imports the heavy modules and fills the caches for symbols.
+
+        :param zones_api: ZonesApi instance whose response cache is also filled.
+        :return: Number of symbol/interval supersets cached.
+        """
+        started = time.perf_counter()
+        Warmup.import_modules()
+        if len(symbols) * len(intervals) > superset_cache.size:
+            logging.warning("Warm-up universe (%s supersets) exceeds SUPERSET_CACHE_SIZE=%s; the oldest are evicted",
+                            len(symbols) * len(intervals), superset_cache.size)
+
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+            warmed = sum(pool.map(lambda symbol: Warmup.warm_symbol(symbol, intervals, period, zones_api), symbols))
+        logging.info("Warm-up cached %s supersets for %s symbols in %.1fs",
+                     warmed, len(symbols), time.perf_counter() - started)
+        return warmed
+
+    @staticmethod
+    def freeze():
+        """
+        Collects garbage once, then moves every surviving object to the GC's permanent
+        generation so collections in forked children leave those pages alone.
+        """
+        gc.collect()
+        gc.freeze()
+        logging.info("Froze %s objects before fork", gc.get_freeze_count())
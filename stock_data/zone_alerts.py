@@ -0,0 +1,382 @@
+"""
+Zone-touch alerts across a universe of symbols.
+
+AlertEngine keeps, per symbol, the fresh demand zones and the supply (target)
+zones ordered by proximal line. Each incoming price is checked with a bisect:
+
+  * 'demand_entry'   – price inside a fresh demand zone (distal <= price <= proximal),
+  * 'target_reached' – price at or above a supply zone's proximal line.
+
+A triggered zone leaves the index (it is no longer fresh), and a zone that fired
+is not alerted again within the debounce window even if a later scan registers
+it anew. Alerts go to pluggable sinks: LogSink, WebhookSink and SSESink.
+
+Zones come from a search (update_zones) or from StreamingZoneEngine events
+(on_stream_event). State, including the SSE subscribers, is per process, so
+the app only serves alerts from a single worker process.
+
+    python -m stock_data.zone_alerts --symbols 300 --bars 500
+"""
+import os
+import sys
+import json
+import time
+import queue
+import random
+import bisect
+import logging
+import argparse
+import threading
+import requests
+
+ALERT_DEBOUNCE_SECONDS = float(os.environ.get('ALERT_DEBOUNCE_SECONDS', '900'))
+ALERT_WEBHOOK_URL = os.environ.get('ALERT_WEBHOOK_URL')
+# Seconds an SSE connection is kept before the client is made to reconnect
+ALERT_STREAM_LIFETIME = float(os.environ.get('ALERT_STREAM_LIFETIME', '120'))
+# Reconnect delay sent to SSE clients
+ALERT_STREAM_RETRY_MS = int(os.environ.get('ALERT_STREAM_RETRY_MS', '3000'))
+
+ALERT_KINDS = ['demand_entry', 'target_reached']
+
+
+class LogSink:
+    def send(self, alert):
+        logging.info("Zone alert %s %s %s zone %s-%s at %s", alert['symbol'], alert['kind'],
+                     alert['interval'], alert['distal'], alert['proximal'], alert['price'])
+
+
+class WebhookSink:
+    """
+    POSTs alerts as JSON from a background thread so checks never wait on the network.
+    Without a URL it only logs what it would have sent.
+    """
+
+    def __init__(self, url=ALERT_WEBHOOK_URL, timeout=5, max_pending=1000):
+        self.url = url
+        self.timeout = timeout
+        self.pending = queue.Queue(max_pending)
+        self.worker = None
+
+    def send(self, alert):
+        if not self.url:
+            logging.debug("Webhook stub: would POST %s", alert)
+            return
+        if self.worker is None or not self.worker.is_alive():
+            self.worker = threading.Thread(target=self._deliver, daemon=True)
+            self.worker.start()
+        try:
+            self.pending.put_nowait(alert)
+        except queue.Full:
+            logging.warning("Webhook queue full; dropping alert for %s", alert['symbol'])
+
+    def _deliver(self):
+        while True:
+            alert = self.pending.get()
+            try:
+                requests.post(self.url, json=alert, timeout=self.timeout)
+            except requests.RequestException as e:
+                logging.error("Webhook delivery failed: %s", e)
+
+
+class SSESink:
+    """
+    Fans alerts out to Server-Sent Events subscribers.
+    """
+
+    def __init__(self, max_pending=100, keepalive=15, lifetime=ALERT_STREAM_LIFETIME, retry_ms=ALERT_STREAM_RETRY_MS):
+        """
+        :param lifetime: Seconds after which a stream ends; the client reconnects after retry_ms.
+        """
+        self.max_pending = max_pending
+        self.keepalive = keepalive
+        self.lifetime = lifetime
+        self.retry_ms = retry_ms
+        self.subscribers = []
+        self.lock = threading.Lock()
+
+    def send(self, alert):
+        payload = json.dumps(alert, default=str)
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for pending in subscribers:
+            try:
+                pending.put_nowait(payload)
+            except queue.Full:
+                # A stalled client loses alerts rather than holding memory
+                pass
+
+    def stream(self, symbols=None):
+        """
+        Generator of SSE frames for one client; pass it to a streaming response. It ends
+        after lifetime seconds so no connection holds a worker thread indefinitely.
+
+        :param symbols: Optional set of symbols the client wants.
+        """
+        pending = queue.Queue(self.max_pending)
+        deadline = time.monotonic() + self.lifetime
+        with self.lock:
+            self.subscribers.append(pending)
+        try:
+            yield f"retry: {self.retry_ms}\n: connected\n\n"
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    payload = pending.get(timeout=min(self.keepalive, remaining))
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if symbols and json.loads(payload)['symbol'] not in symbols:
+                    continue
+                yield f"event: alert\ndata: {payload}\n\n"
+        finally:
+            with self.lock:
+                self.subscribers.remove(pending)
+
+
+class SymbolZones:
+    """
+    One symbol's alertable zones, each list ordered by proximal line.
+    """
+
+    def __init__(self):
+        self.demand_keys, self.demand = [], []
+        self.supply_keys, self.supply = [], []
+
+    def __len__(self):
+        return len(self.demand) + len(self.supply)
+
+    def add(self, zone):
+        keys, zones = (self.demand_keys, self.demand) if zone['zoneType'] == 'Demand' else (self.supply_keys, self.supply)
+        pos = bisect.bisect_right(keys, zone['proximal'])
+        keys.insert(pos, zone['proximal'])
+        zones.insert(pos, zone)
+
+    def remove(self, zone):
+        keys, zones = (self.demand_keys, self.demand) if zone['zoneType'] == 'Demand' else (self.supply_keys, self.supply)
+        for pos in range(bisect.bisect_left(keys, zone['proximal']), len(keys)):
+            if zones[pos] is zone:
+                del keys[pos]
+                del zones[pos]
+                return True
+            if keys[pos] != zone['proximal']:
+                break
+        return False
+
+    def triggered(self, price):
+        """
+        Removes and returns the (kind, zone) pairs this price triggers.
+        """
+        hits = []
+        # Demand: only zones with proximal >= price can contain it
+        start = bisect.bisect_left(self.demand_keys, price)
+        entered = [pos for pos in range(start, len(self.demand)) if self.demand[pos]['distal'] <= price]
+        hits += [('demand_entry', self.demand[pos]) for pos in entered]
+        for pos in reversed(entered):
+            del self.demand_keys[pos]
+            del self.demand[pos]
+
+        # Supply: every zone with proximal <= price has been reached
+        end = bisect.bisect_right(self.supply_keys, price)
+        hits += [('target_reached', zone) for zone in self.supply[:end]]
+        del self.supply_keys[:end]
+        del self.supply[:end]
+        return hits
+
+
+class AlertEngine:
+    def __init__(self, sinks=None, debounce_seconds=ALERT_DEBOUNCE_SECONDS):
+        """
+        :param sinks: Objects with send(alert); defaults to a LogSink.
+        :param debounce_seconds: How long a fired zone stays muted.
+        """
+        self.sinks = sinks if sinks is not None else [LogSink()]
+        self.debounce_seconds = debounce_seconds
+        self.symbols = {}
+        self.fired = {}     # zone key -> time it last fired
+        self.lock = threading.Lock()
+        self.counts = dict.fromkeys(ALERT_KINDS + ['suppressed'], 0)
+
+    @staticmethod
+    def zone_key(symbol, zone):
+        return (symbol, zone['zoneType'], zone.get('interval'),
+                round(float(zone['proximal']), 2), round(float(zone['distal']), 2))
+
+    # ------------------------------------------------------------------
+    #                   ZONES
+    # ------------------------------------------------------------------
+
+    def update_zones(self, symbol, demand_zones=(), supply_zones=(), price=None):
+        """
+        Replaces a symbol's zones, e.g. with the fresh zones of a new scan.
+
+        :param price: Current price; when given, only demand zones at or below it and
+                      supply zones above it are kept, so nothing fires on registration.
+        """
+        index = SymbolZones()
+        for zone in list(demand_zones) + list(supply_zones):
+            zone = self._normalise(zone)
+            if price is not None:
+                if zone['zoneType'] == 'Demand' and zone['distal'] > price:
+                    continue
+                if zone['zoneType'] == 'Supply' and zone['proximal'] <= price:
+                    continue
+            index.add(zone)
+        with self.lock:
+            self.symbols[symbol] = index
+
+    def add_zone(self, symbol, zone):
+        with self.lock:
+            self.symbols.setdefault(symbol, SymbolZones()).add(self._normalise(zone))
+
+    def on_stream_event(self, event):
+        """
+        Keeps a symbol's zones in sync with a StreamingZoneEngine (subscribe this method).
+        A streamed touch of a tracked zone is alerted like a price check would be.
+        """
+        zone = {'zoneType': event['zone_type'], 'interval': event['interval'], 'zone_id': event['zone_id'],
+                'proximal': event['proximal'], 'distal': event['distal']}
+        symbol = event['symbol']
+        if event['event'] == 'zone_created' and event['fresh']:
+            self.add_zone(symbol, zone)
+        elif event['event'] == 'zone_touched':
+            with self.lock:
+                index = self.symbols.get(symbol)
+                tracked = index is not None and self._remove_matching(index, zone)
+            if tracked:
+                kind = 'demand_entry' if zone['zoneType'] == 'Demand' else 'target_reached'
+                self._fire([(kind, zone)], symbol, None, event.get('bar_time'))
+
+    @staticmethod
+    def _normalise(zone):
+        return {
+            'zoneType': zone['zoneType'],
+            'interval': zone.get('interval'),
+            'zone_id': zone.get('zone_id'),
+            'proximal': float(zone['proximal']),
+            'distal': float(zone['distal']),
+        }
+
+    @staticmethod
+    def _remove_matching(index, zone):
+        zones = index.demand if zone['zoneType'] == 'Demand' else index.supply
+        for candidate in zones:
+            if (candidate['zone_id'] == zone['zone_id'] and candidate['interval'] == zone['interval']
+                    and candidate['proximal'] == zone['proximal']):
+                return index.remove(candidate)
+        return False
+
+    # ------------------------------------------------------------------
+    #                   PRICES
+    # ------------------------------------------------------------------
+
+    def check(self, symbol, price, at=None):
+        """
+        Checks one price against the symbol's zones.
+
+        :return: Alerts delivered for this price.
+        """
+        with self.lock:
+            index = self.symbols.get(symbol)
+            if index is None or not len(index):
+                return []
+            hits = index.triggered(float(price))
+        if not hits:
+            return []
+        return self._fire(hits, symbol, price, at)
+
+    def check_many(self, prices, at=None):
+        """
+        :param prices: {symbol: price}.
+        """
+        alerts = []
+        for symbol, price in prices.items():
+            alerts.extend(self.check(symbol, price, at))
+        return alerts
+
+    def _fire(self, hits, symbol, price, at):
+        now = time.time()
+        alerts = []
+        with self.lock:
+            for kind, zone in hits:
+                key = self.zone_key(symbol, zone)
+                last = self.fired.get(key)
+                if last is not None and now - last < self.debounce_seconds:
+                    self.counts['suppressed'] += 1
+                    continue
+                self.fired[key] = now
+                self.counts[kind] += 1
+                alerts.append({
+                    'symbol': symbol,
+                    'kind': kind,
+                    'zone_type': zone['zoneType'],
+                    'interval': zone['interval'],
+                    'zone_id': zone['zone_id'],
+                    'proximal': round(zone['proximal'], 2),
+                    'distal': round(zone['distal'], 2),
+                    'price': price,
+                    'time': str(at) if at is not None else time.strftime('%Y-%m-%dT%H:%M:%S'),
+                })
+            # Forget mutes that have expired so the map stays bounded
+            if len(self.fired) > 10000:
+                self.fired = {k: t for k, t in self.fired.items() if now - t < self.debounce_seconds}
+
+        for alert in alerts:
+            for sink in self.sinks:
+                try:
+                    sink.send(alert)
+                except Exception as e:
+                    logging.error("Alert sink %s failed: %s", type(sink).__name__, e)
+        return alerts
+
+    def stats(self):
+        with self.lock:
+            return {
+                'symbols': len(self.symbols),
+                'zones': sum(len(index) for index in self.symbols.values()),
+                **self.counts,
+            }
+
+
+def main(argv=None):
+    from stock_data.zone_stream import StreamingZoneEngine, ReplayFeed
+
+    parser = argparse.ArgumentParser(description="Drive the alert engine with replayed intraday bars.")
+    parser.add_argument('--symbols', type=int, default=300, help="Synthetic symbols.")
+    parser.add_argument('--bars', type=int, default=500, help="Bars per symbol.")
+    parser.add_argument('--interval', default='5m')
+    parser.add_argument('--ticks', type=int, default=200000, help="Random price checks for the timing run.")
+    args = parser.parse_args(argv)
+
+    counter = {'delivered': 0}
+
+    class CountingSink:
+        def send(self, alert):
+            counter['delivered'] += 1
+
+    engine = AlertEngine(sinks=[CountingSink()])
+    last_close = {}
+    started = time.perf_counter()
+    for n in range(args.symbols):
+        symbol = f"SYN{n}"
+        stream = StreamingZoneEngine(symbol, args.interval)
+        stream.subscribe(engine.on_stream_event)
+        for bars in ReplayFeed.from_source(symbol, args.interval, bars=args.bars, batch=50):
+            stream.append(bars)
+        last_close[symbol] = float(stream.columns['close'][stream.n - 1])
+    print(f"Streamed {args.symbols} symbols in {time.perf_counter() - started:.1f}s: {engine.stats()}")
+
+    symbols = list(last_close)
+    ticks = [(s, last_close[s] * random.uniform(0.9, 1.1)) for s in random.choices(symbols, k=args.ticks)]
+    started = time.perf_counter()
+    for symbol, price in ticks:
+        engine.check(symbol, price)
+    elapsed = time.perf_counter() - started
+    print(f"{args.ticks} price checks in {elapsed:.2f}s ({args.ticks / elapsed:,.0f}/s), "
+          f"{counter['delivered']} alerts delivered: {engine.stats()}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""
+Differential harness for zone engines.
+
+Runs the legacy identifiers/freshness checks and a candidate engine (by default the
+array-based ZoneScanner) side by side, diffs every zone field and reports per-stage
+timings. Usable from the command line (exit status 1 on any mismatch) and as a
+sampled shadow check of the superset slices in DemandZoneManager
+(see ZONE_ENGINE_SHADOW_RATE).
+
+    python -m stock_data.zone_engine_diff --replay-dir replay_data --synthetic 20
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from stock_data.demand_zone_identifier import DemandZoneIdentifier
+from stock_data.supply_zone_identifier import SupplyZoneIdentifier
+from stock_data.demand_zone_utils import DemandZoneUtils
+from stock_data.candlestick_utils import CandleStickUtils
+from stock_data.zone_scanner import ZoneScanner
+from stock_data.replay_data import ReplayDataProvider, synthetic_ohlcv
+
+# Fraction of production zone computations re-run through the candidate engine
+SHADOW_SAMPLE_RATE = float(os.environ.get('ZONE_ENGINE_SHADOW_RATE', '0'))
+
+ZONE_FIELDS = ['zone_id', 'proximal', 'distal', 'score', 'interval', 'zoneType']
+STAGES = ['demand_scan', 'supply_scan', 'demand_fresh', 'supply_fresh']
+
+
+class LegacyZoneEngine:
+    """
+    The current production zone engine behind the same interface as ZoneScanner.
+    """
+    identify_demand_zones = staticmethod(DemandZoneIdentifier.identify_demand_zones)
+    identify_supply_zones = staticmethod(SupplyZoneIdentifier.identify_supply_zones)
+    is_fresh_demand_zone = staticmethod(DemandZoneUtils.is_fresh_demand_zone)
+    is_fresh_supply_zone = staticmethod(DemandZoneUtils.is_fresh_supply_zone)
+
+
+class ZoneEngineDiff:
+    def __init__(self, legacy=LegacyZoneEngine, candidate=ZoneScanner):
+        """
+        :param legacy: Reference engine (identify_*_zones / is_fresh_*_zone callables).
+        :param candidate: Engine under test, same interface.
+        """
+        self.legacy = legacy
+        self.candidate = candidate
+
+    # ------------------------------------------------------------------
+    #                   CORPUS
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def prepare_frame(stock_data):
+        """
+        Adds the candle identifier columns the engines read, as Plotter would.
+        """
+        if 'ExcitingCandle' in stock_data and 'BaseCandle' in stock_data:
+            return stock_data
+        return CandleStickUtils.add_candle_identifiers(stock_data.copy(), 0.5, 0.5)
+
+    @staticmethod
+    def default_corpus(replay_dir=None, synthetic=10, bars=750, intervals=('1d', '1wk', '1mo', '3mo')):
+        """
+        Yields (label, interval, frame) for recorded symbols in replay_dir followed by
+        synthetic frames across the given intervals, plus degenerate short frames.
+        """
+        if replay_dir:
+            for stock_code, interval, frame in ReplayDataProvider(replay_dir).corpus():
+                yield f"{stock_code}:{interval}", interval, frame
+
+        for seed in range(synthetic):
+            for interval in intervals:
+                volatility = 0.01 + 0.01 * (seed % 4)
+                frame = synthetic_ohlcv(f"SYN{seed}", interval, bars, seed=seed, volatility=volatility)
+                yield f"SYN{seed}:{interval}", interval, frame
+
+        for length in (1, 2, 3, 5):
+            yield f"SHORT{length}:1d", '1d', synthetic_ohlcv('SHORT', '1d', length, seed=length)
+
+    # ------------------------------------------------------------------
+    #                   COMPARISON
+    # ------------------------------------------------------------------
+
+    def compare_frame(self, stock_data, interval, label=''):
+        """
+        Runs both engines over one frame.
+
+        Freshness is compared on the legacy zone list so that a scan mismatch does not
+        cascade into the freshness stage.
+
+        :return: Dict with 'label', 'interval', 'bars', 'mismatches' and 'timings'
+                 ({stage: {'legacy': seconds, 'candidate': seconds}}).
+        """
+        stock_data = self.prepare_frame(stock_data)
+        timings = {}
+        mismatches = []
+
+        for zone_type in ('Demand', 'Supply'):
+            prefix = zone_type.lower()
+            method = f"identify_{prefix}_zones"
+
+            legacy_zones, legacy_time = self._timed(getattr(self.legacy, method), stock_data, interval)
+            candidate_zones, candidate_time = self._timed(getattr(self.candidate, method), stock_data, interval)
+            timings[f"{prefix}_scan"] = {'legacy': legacy_time, 'candidate': candidate_time}
+            mismatches.extend(self.diff_zones(legacy_zones, candidate_zones, label, interval, f"{prefix}_scan"))
+
+            fresh_method = f"is_fresh_{prefix}_zone"
+            legacy_fresh, legacy_time = self._timed(
+                lambda: [getattr(self.legacy, fresh_method)(stock_data, z) for z in legacy_zones]
+            )
+            candidate_fresh, candidate_time = self._timed(
+                lambda: [getattr(self.candidate, fresh_method)(stock_data, z) for z in legacy_zones]
+            )
+            timings[f"{prefix}_fresh"] = {'legacy': legacy_time, 'candidate': candidate_time}
+            for zone, expected, actual in zip(legacy_zones, legacy_fresh, candidate_fresh):
+                if bool(expected) != bool(actual):
+                    mismatches.append(self._mismatch(label, interval, f"{prefix}_fresh",
+                                                     zone['zone_id'], 'fresh', expected, actual))
+
+        return {
+            'label': label,
+            'interval': interval,
+            'bars': len(stock_data),
+            'mismatches': mismatches,
+            'timings': timings
+        }
+
+    def run(self, corpus):
+        """
+        Compares the engines over a corpus of (label, interval, frame) tuples.
+
+        :return: Summary dict with 'frames', 'mismatches' and per-stage 'timings'
+                 including the legacy/candidate 'speedup'.
+        """
+        frames = 0
+        mismatches = []
+        totals = {stage: {'legacy': 0.0, 'candidate': 0.0} for stage in STAGES}
+
+        for label, interval, frame in corpus:
+            report = self.compare_frame(frame, interval, label)
+            frames += 1
+            mismatches.extend(report['mismatches'])
+            for stage, timing in report['timings'].items():
+                totals[stage]['legacy'] += timing['legacy']
+                totals[stage]['candidate'] += timing['candidate']
+
+        for timing in totals.values():
+            timing['speedup'] = timing['legacy'] / timing['candidate'] if timing['candidate'] else None
+
+        return {'frames': frames, 'mismatches': mismatches, 'timings': totals}
+
+    @staticmethod
+    def diff_zones(expected, actual, label='', interval='', stage=''):
+        """
+        Field-by-field diff of two zone lists.
+
+        :return: List of mismatch dicts ('label', 'interval', 'stage', 'zone_id', 'field',
+                 'legacy', 'candidate').
+        """
+        mismatches = []
+        if len(expected) != len(actual):
+            mismatches.append(ZoneEngineDiff._mismatch(
+                label, interval, stage, None, 'count', len(expected), len(actual)))
+
+        for legacy_zone, candidate_zone in zip(expected, actual):
+            zone_id = legacy_zone.get('zone_id')
+            for field in ZONE_FIELDS:
+                if legacy_zone.get(field) != candidate_zone.get(field):
+                    mismatches.append(ZoneEngineDiff._mismatch(
+                        label, interval, stage, zone_id, field,
+                        legacy_zone.get(field), candidate_zone.get(field)))
+
+            legacy_dates = list(legacy_zone.get('dates', []))
+            candidate_dates = list(candidate_zone.get('dates', []))
+            if legacy_dates != candidate_dates:
+                mismatches.append(ZoneEngineDiff._mismatch(
+                    label, interval, stage, zone_id, 'dates', legacy_dates, candidate_dates))
+
+            if legacy_zone.get('candles') != candidate_zone.get('candles'):
+                mismatches.append(ZoneEngineDiff._mismatch(
+                    label, interval, stage, zone_id, 'candles',
+                    legacy_zone.get('candles'), candidate_zone.get('candles')))
+
+        return mismatches
+
+    @staticmethod
+    def format_report(summary, max_mismatches=20):
+        lines = [f"Compared {summary['frames']} frames: {len(summary['mismatches'])} mismatches"]
+        lines.append(f"{'stage':<14}{'legacy (s)':>12}{'candidate (s)':>15}{'speedup':>10}")
+        for stage, timing in summary['timings'].items():
+            speedup = f"{timing['speedup']:.1f}x" if timing['speedup'] else '-'
+            lines.append(f"{stage:<14}{timing['legacy']:>12.4f}{timing['candidate']:>15.4f}{speedup:>10}")
+        for mismatch in summary['mismatches'][:max_mismatches]:
+            lines.append(
+                f"  {mismatch['label']} {mismatch['stage']} zone {mismatch['zone_id']} "
+                f"{mismatch['field']}: legacy={mismatch['legacy']!r} candidate={mismatch['candidate']!r}"
+            )
+        return "\n".join(lines)
+
+    # ------------------------------------------------------------------
+    #                   SHADOW MODE
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def shadow_sampled():
+        """
+        Decides whether the current zone computation should be shadowed.
+        """
+        return SHADOW_SAMPLE_RATE > 0 and random.random() < SHADOW_SAMPLE_RATE
+
+    # ------------------------------------------------------------------
+    #                   HELPERS
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _timed(func, *args):
+        started = time.perf_counter()
+        result = func(*args)
+        return result, time.perf_counter() - started
+
+    @staticmethod
+    def _mismatch(label, interval, stage, zone_id, field, legacy, candidate):
+        return {
+            'label': label,
+            'interval': interval,
+            'stage': stage,
+            'zone_id': zone_id,
+            'field': field,
+            'legacy': legacy,
+            'candidate': candidate
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diff the legacy and candidate zone engines.")
+    parser.add_argument('--replay-dir', help="Directory of recorded frames (see ReplayDataProvider).")
+    parser.add_argument('--synthetic', type=int, default=10, help="Number of synthetic symbols.")
+    parser.add_argument('--bars', type=int, default=750, help="Bars per synthetic frame.")
+    args = parser.parse_args(argv)
+
+    diff = ZoneEngineDiff()
+    summary = diff.run(ZoneEngineDiff.default_corpus(args.replay_dir, args.synthetic, args.bars))
+    print(ZoneEngineDiff.format_report(summary))
+    return 1 if summary['mismatches'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,298 @@
+"""
+Bulk export of universe zones and DTOs to Parquet or Arrow.
+
+Symbols are scanned in a process pool (the same scan /api/zones runs) and
+results are streamed to the writers as they complete. Only a bounded number of
+symbols are in flight and buffered rows are flushed as row groups, so memory
+does not grow with the universe. Output is partitioned by interval:
+
+    <out>/zones/interval=1d/part-0.parquet    one row per zone
+    <out>/zones/interval=1wk/part-0.parquet
+    <out>/dtos/part-0.parquet                 one row per symbol, DTO as JSON
+
+    python -m stock_data.zone_export --symbols TCS,INFY,ITC --period 2y --out ./export
+    python -m stock_data.zone_export --symbols-file nifty500.txt --format arrow --workers 8
+
+Needs pyarrow, which the web app itself does not: ``pip install -r requirements-export.txt``.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait, as_completed
+import pandas as pd
+from stock_data.zones_api import ZonesApi, ZONES_API_INTERVALS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    import pyarrow.ipc as ipc
+except ImportError:
+    pa = pq = ipc = None
+
+EXPORT_WORKERS = int(os.environ.get('EXPORT_WORKERS', str(os.cpu_count() or 1)))
+# Rows buffered per partition before a row group / record batch is written
+EXPORT_ROW_GROUP = int(os.environ.get('EXPORT_ROW_GROUP', '50000'))
+FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+# Scanner of this worker process
+_api = None
+
+
+def zone_schema():
+    timestamp = pa.timestamp('ns', tz='UTC')
+    return pa.schema([
+        ('symbol', pa.string()),
+        ('period', pa.string()),
+        ('interval', pa.string()),
+        ('zone_type', pa.string()),
+        ('zone_id', pa.int32()),
+        ('proximal', pa.float64()),
+        ('distal', pa.float64()),
+        ('score', pa.float64()),
+        ('fresh', pa.bool_()),
+        ('start', timestamp),
+        ('end', timestamp),
+        ('dates', pa.list_(timestamp)),
+    ])
+
+
+def dto_schema():
+    return pa.schema([
+        ('symbol', pa.string()),
+        ('period', pa.string()),
+        ('current_price', pa.float64()),
+        ('zone_count', pa.int32()),
+        ('dto', pa.string()),
+    ])
+
+
+class PartitionWriter:
+    """
+    Appends rows to one file per partition, writing a row group (Parquet) or a
+    record batch (Arrow IPC) whenever a partition's buffer reaches row_group rows.
+    """
+
+    def __init__(self, directory, schema, fmt='parquet', row_group=EXPORT_ROW_GROUP):
+        self.directory = directory
+        self.schema = schema
+        self.fmt = fmt
+        self.row_group = row_group
+        self.buffers = {}
+        self.writers = {}
+        self.rows_written = 0
+
+    def append(self, partition, rows):
+        """
+        :param partition: Partition value (e.g. an interval), or None for an unpartitioned file.
+        :param rows: Dicts keyed by the schema's column names.
+        """
+        buffer = self.buffers.setdefault(partition, [])
+        buffer.extend(rows)
+        if len(buffer) >= self.row_group:
+            self._flush(partition)
+
+    def _flush(self, partition):
+        rows = self.buffers.get(partition)
+        if not rows:
+            return
+        table = pa.Table.from_pylist(rows, schema=self.schema)
+        writer = self.writers.get(partition)
+        if writer is None:
+            writer = self.writers[partition] = self._open(partition)
+        if self.fmt == 'parquet':
+            writer.write_table(table)
+        else:
+            writer.write_table(table, max_chunksize=self.row_group)
+        self.rows_written += table.num_rows
+        self.buffers[partition] = []
+
+    def _open(self, partition):
+        directory = self.directory
+        if partition is not None:
+            directory = os.path.join(directory, f"interval={partition}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"part-0{FORMATS[self.fmt]}")
+        if self.fmt == 'parquet':
+            return pq.ParquetWriter(path, self.schema, compression='zstd')
+        return ipc.new_file(path, self.schema)
+
+    def close(self):
+        for partition in list(self.buffers):
+            self._flush(partition)
+        for writer in self.writers.values():
+            writer.close()
+        self.writers = {}
+
+
+class ZoneExporter:
+    def __init__(self, out_dir, period='2y', intervals=None, fmt='parquet', row_group=EXPORT_ROW_GROUP):
+        """
+        :param out_dir: Root directory; 'zones/' and 'dtos/' are created below it.
+        :param intervals: Intervals to scan (default ZONES_API_INTERVALS).
+        :param fmt: 'parquet' or 'arrow' (Arrow IPC file).
+        """
+        if pa is None:
+            raise RuntimeError("Zone export needs pyarrow: pip install -r requirements-export.txt")
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown export format {fmt!r}; expected one of {', '.join(FORMATS)}")
+        self.out_dir = out_dir
+        self.period = period
+        self.intervals = list(intervals or ZONES_API_INTERVALS)
+        self.fmt = fmt
+        self.row_group = row_group
+
+    # ------------------------------------------------------------------
+    #                   SCAN (worker side)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def scan_symbol(symbol, period, intervals):
+        """
+        Scans one symbol. Runs inside worker processes.
+
+        :return: (symbol, zone rows, dto row) with zone rows as plain dicts, or
+                 (symbol, [], None) when the symbol could not be fetched or scanned.
+        """
+        global _api
+        if _api is None:
+            _api = ZonesApi(ttl=0, cache_size=0)
+        try:
+            slices, _ = _api.fetch(symbol, intervals, period)
+            results = _api.scan(symbol, intervals, slices)
+            rows = [ZoneExporter.zone_row(symbol, period, zone, is_fresh)
+                    for zone, is_fresh in _api.iter_zones(results)]
+            dto = _api.build_dto(results)
+        except Exception as e:
+            logging.error("Export scan failed for %s: %s", symbol, e)
+            return symbol, [], None
+
+        price = results['1d']['current_price'] if '1d' in results else None
+        dto_row = {
+            'symbol': symbol,
+            'period': period,
+            'current_price': float(price) if price is not None else None,
+            'zone_count': len(rows),
+            'dto': json.dumps(dto, default=ZonesApi.json_default) if dto is not None else None,
+        }
+        return symbol, rows, dto_row
+
+    @staticmethod
+    def zone_row(symbol, period, zone, is_fresh):
+        dates = [ZoneExporter._utc(date) for date in zone.get('dates', [])]
+        return {
+            'symbol': symbol,
+            'period': period,
+            'interval': zone['interval'],
+            'zone_type': zone['zoneType'],
+            'zone_id': int(zone['zone_id']),
+            'proximal': float(zone['proximal']),
+            'distal': float(zone['distal']),
+            'score': float(zone.get('score', 0)),
+            'fresh': bool(is_fresh),
+            'start': dates[0] if dates else None,
+            'end': dates[-1] if dates else None,
+            'dates': dates,
+        }
+
+    @staticmethod
+    def _utc(value):
+        stamp = pd.Timestamp(value)
+        return stamp.tz_localize('UTC') if stamp.tz is None else stamp.tz_convert('UTC')
+
+    # ------------------------------------------------------------------
+    #                   EXPORT (parent side)
+    # ------------------------------------------------------------------
+
+    def results(self, symbols, workers=EXPORT_WORKERS):
+        """
+        Yields scan_symbol results in completion order, keeping at most
+        2 * workers symbols in flight.
+        """
+        symbols = list(symbols)
+        if workers <= 1 or len(symbols) <= 1:
+            for symbol in symbols:
+                yield self.scan_symbol(symbol, self.period, self.intervals)
+            return
+
+        pending = set()
+        remaining = iter(symbols)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for symbol in remaining:
+                pending.add(pool.submit(self.scan_symbol, symbol, self.period, self.intervals))
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            for future in as_completed(pending):
+                yield future.result()
+
+    def export(self, symbols, workers=EXPORT_WORKERS):
+        """
+        Scans the universe and writes the partitioned zones and the DTO files.
+
+        :return: {'symbols', 'failed', 'zones', 'dtos'} counts.
+        """
+        zones = PartitionWriter(os.path.join(self.out_dir, 'zones'), zone_schema(), self.fmt, self.row_group)
+        dtos = PartitionWriter(os.path.join(self.out_dir, 'dtos'), dto_schema(), self.fmt, self.row_group)
+        stats = {'symbols': 0, 'failed': 0}
+        try:
+            for symbol, rows, dto_row in self.results(symbols, workers):
+                stats['symbols'] += 1
+                if dto_row is None:
+                    stats['failed'] += 1
+                    continue
+                by_interval = {}
+                for row in rows:
+                    by_interval.setdefault(row['interval'], []).append(row)
+                for interval, interval_rows in by_interval.items():
+                    zones.append(interval, interval_rows)
+                dtos.append(None, [dto_row])
+                logging.debug("Exported %s: %s zones", symbol, len(rows))
+        finally:
+            zones.close()
+            dtos.close()
+        stats['zones'] = zones.rows_written
+        stats['dtos'] = dtos.rows_written
+        return stats
+
+
+def _symbols(args):
+    symbols = []
+    if args.symbols:
+        symbols += [s.strip().upper() for s in args.symbols.split(',') if s.strip()]
+    if args.symbols_file:
+        with open(args.symbols_file) as handle:
+            symbols += [line.strip().upper() for line in handle if line.strip() and not line.startswith('#')]
+    return list(dict.fromkeys(symbols))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export universe zones and DTOs to partitioned Parquet/Arrow.")
+    parser.add_argument('--symbols', help="Comma-separated symbols fetched through DataFetcher.")
+    parser.add_argument('--symbols-file', help="File with one symbol per line.")
+    parser.add_argument('--period', default='2y')
+    parser.add_argument('--intervals', help="Comma-separated subset of %s." % ','.join(ZONES_API_INTERVALS))
+    parser.add_argument('--format', default='parquet', choices=sorted(FORMATS))
+    parser.add_argument('--out', default='./zone_export')
+    parser.add_argument('--workers', type=int, default=EXPORT_WORKERS)
+    parser.add_argument('--row-group', type=int, default=EXPORT_ROW_GROUP)
+    args = parser.parse_args(argv)
+
+    symbols = _symbols(args)
+    if not symbols:
+        parser.error("give --symbols and/or --symbols-file")
+
+    exporter = ZoneExporter(args.out, args.period, ZonesApi.parse_intervals(args.intervals),
+                            args.format, args.row_group)
+    started = time.perf_counter()
+    stats = exporter.export(symbols, args.workers)
+    print(f"Exported {stats['zones']} zones and {stats['dtos']} DTOs for {stats['symbols']} symbols "
+          f"({stats['failed']} failed) to {args.out} in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
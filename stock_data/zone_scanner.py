@@ -0,0 +1,359 @@
+import numpy as np
+
+# Intervals that allow up to 5 base candles (both identifiers)
+EXTENDED_BASE_INTERVALS = ['1mo', '3mo', '6mo', '1y', '2y', '5y', '10y']
+# Intervals on which the second candle must close beyond the base candles.
+# The demand identifier includes '1wk' here, the supply identifier does not.
+DEMAND_CLOSE_CHECK_INTERVALS = ['1wk', '1mo', '3mo', '6mo', '1y', '2y', '5y', '10y']
+SUPPLY_CLOSE_CHECK_INTERVALS = ['1mo', '3mo', '6mo', '1y', '2y', '5y', '10y']
+
+
+class ScanState:
+    """
+    Position of the zone scanner inside a frame. Keeping it separate from the scan
+    itself lets a caller resume scanning after bars are appended.
+    """
+
+    def __init__(self, zone_type, interval):
+        self.zone_type = zone_type
+        self.interval = interval
+        self.i = 1           # next candle the scanner looks at
+        self.zone_id = 1     # id given to the next pattern
+        self.specs = []      # committed patterns as positional specs
+
+
+class ZoneScanner:
+    """
+    Array-based implementation of DemandZoneIdentifier / SupplyZoneIdentifier and
+    the DemandZoneUtils freshness checks.
+
+    The state machine is a line-by-line port of the legacy identifiers (including
+    their zone_id numbering), but every decision reads from numpy arrays instead of
+    ``stock_data.iloc[i][...]``. Pattern dicts reproduce the legacy fields exactly;
+    run ``python -m stock_data.zone_engine_diff`` after touching either engine.
+    """
+
+    # ------------------------------------------------------------------
+    #                   PUBLIC API (drop-in for the legacy engine)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def identify_demand_zones(stock_data, interval, gap_threshold=0.03):
+        arrays = ZoneScanner.candle_arrays(stock_data)
+        state = ScanState('Demand', interval)
+        ZoneScanner.advance(state, arrays)
+        return ZoneScanner.to_patterns(stock_data, state, state.specs)
+
+    @staticmethod
+    def identify_supply_zones(stock_data, interval, gap_threshold=0.03):
+        arrays = ZoneScanner.candle_arrays(stock_data)
+        state = ScanState('Supply', interval)
+        ZoneScanner.advance(state, arrays)
+        return ZoneScanner.to_patterns(stock_data, state, state.specs)
+
+    @staticmethod
+    def is_fresh_demand_zone(stock_data, zone):
+        return ZoneScanner.fresh_flags(stock_data, [zone], 'Demand')[0]
+
+    @staticmethod
+    def is_fresh_supply_zone(stock_data, zone):
+        return ZoneScanner.fresh_flags(stock_data, [zone], 'Supply')[0]
+
+    @staticmethod
+    def fresh_flags(stock_data, zones, zone_type):
+        """
+        Evaluates freshness for a batch of zones with one pass over the arrays per zone.
+
+        :param stock_data: DataFrame with 'Low' and 'High' columns.
+        :param zones: Zone dicts with 'proximal', 'distal' and 'dates'.
+        :param zone_type: 'Demand' or 'Supply'.
+        :return: List of booleans, True where the zone was never retested.
+        """
+        index = stock_data.index
+        lows = stock_data['Low'].to_numpy()
+        highs = stock_data['High'].to_numpy()
+        end_date = index[-1]
+        last_pos = len(index) - 1
+
+        flags = []
+        for zone in zones:
+            zone_end_date = zone['dates'][-1]
+            if zone_end_date >= end_date:
+                flags.append(True)
+                continue
+            pos = index.get_loc(zone_end_date)
+            if pos == last_pos:
+                flags.append(True)
+                continue
+            flags.append(ZoneScanner.is_untouched(
+                lows[pos + 1:], highs[pos + 1:], zone['proximal'], zone['distal'], zone_type
+            ))
+        return flags
+
+    @staticmethod
+    def is_untouched(lows, highs, proximal, distal, zone_type):
+        """
+        True if none of the given candles overlaps the zone.
+        """
+        if zone_type == 'Demand':
+            touched = (lows <= proximal) & (highs >= distal)
+        else:
+            touched = (highs >= proximal) & (lows <= distal)
+        return not touched.any()
+
+    # ------------------------------------------------------------------
+    #                   SCANNER CORE
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def candle_arrays(stock_data):
+        """
+        Extracts the columns the scanner reads as numpy arrays.
+        """
+        def flags(column):
+            if column in stock_data:
+                return stock_data[column].to_numpy(dtype=bool)
+            return np.zeros(len(stock_data), dtype=bool)
+
+        return {
+            'open': stock_data['Open'].to_numpy(),
+            'high': stock_data['High'].to_numpy(),
+            'low': stock_data['Low'].to_numpy(),
+            'close': stock_data['Close'].to_numpy(),
+            'exciting': flags('ExcitingCandle'),
+            'base': flags('BaseCandle'),
+            'gap_up': flags('GapUp'),
+            'gap_down': flags('GapDown'),
+        }
+
+    @staticmethod
+    def advance(state, arrays, final=True, until=None, trace=None):
+        """
+        Runs the scanner from state.i to the end of the arrays, appending specs to state.
+
+        :param final: When False, stop before any step whose outcome could still change
+                      once more candles arrive, leaving state.i on that step.
+        :param until: Optional predicate on the state, checked before every step; the
+                      scan stops (leaving state.i on that step) once it returns True.
+        :param trace: Optional dict filled with {state.i: (state.zone_id, len(state.specs))}
+                      for every step taken.
+        :return: List of specs committed by this call.
+        """
+        n = len(arrays['close'])
+        step = ZoneScanner._demand_step if state.zone_type == 'Demand' else ZoneScanner._supply_step
+        committed = []
+
+        while state.i < n - 1:
+            if until is not None and until(state):
+                break
+            if trace is not None:
+                trace[state.i] = (state.zone_id, len(state.specs))
+            spec, next_i, bump, at_edge = step(arrays, state, n)
+            if at_edge and not final:
+                break
+            if spec is not None:
+                spec['zone_id'] = state.zone_id
+                spec['score'], spec['score_next'] = ZoneScanner.score(
+                    arrays, state.zone_type, spec['end'] + 1, n
+                )
+                state.specs.append(spec)
+                committed.append(spec)
+            if bump:
+                state.zone_id += 1
+            state.i = next_i
+
+        return committed
+
+    @staticmethod
+    def score(arrays, zone_type, start_idx, n, score=0):
+        """
+        Counts consecutive follow-through candles from start_idx.
+
+        :return: (score, next_idx) where next_idx == n means the run reached the last candle
+                 and could still grow when more candles arrive.
+        """
+        exciting = arrays['exciting']
+        close = arrays['close']
+        open_ = arrays['open']
+        gap = arrays['gap_up'] if zone_type == 'Demand' else arrays['gap_down']
+        k = start_idx
+        while k < n:
+            if zone_type == 'Demand':
+                directional = exciting[k] and close[k] > open_[k]
+            else:
+                directional = exciting[k] and close[k] < open_[k]
+            if directional or gap[k]:
+                score += 1
+            else:
+                return score, None
+            k += 1
+        return score, k
+
+    @staticmethod
+    def _collect_base(arrays, i, n, gap, max_base_candles):
+        base = arrays['base']
+        exciting = arrays['exciting']
+        j = i + 1
+        while j < n and j - i - 1 < max_base_candles:
+            if base[j] and not exciting[j] and not gap[j]:
+                j += 1
+            else:
+                break
+        return j
+
+    @staticmethod
+    def _demand_step(arrays, state, n):
+        """
+        One iteration of DemandZoneIdentifier.identify_demand_zones' main loop.
+
+        :return: (spec or None, next_i, bump_zone_id, at_edge)
+        """
+        i = state.i
+        o, l, c = arrays['open'], arrays['low'], arrays['close']
+        exciting, gap_up = arrays['exciting'], arrays['gap_up']
+
+        # Red Exciting -> Green Exciting
+        if exciting[i] and c[i] < o[i]:
+            j = i + 1
+            if exciting[j] and c[j] > o[j] and c[j] > o[i]:
+                spec = {'kind': 'pair', 'start': i, 'end': j,
+                        'proximal': o[j], 'distal': min(l[i], l[j])}
+                return spec, i + 1, True, False
+
+        if not (exciting[i] or gap_up[i]):
+            return None, i + 1, False, False
+
+        max_base = 5 if state.interval in EXTENDED_BASE_INTERVALS else 3
+        j = ZoneScanner._collect_base(arrays, i, n, gap_up, max_base)
+        at_edge = j >= n
+        if j == i + 1:
+            return None, j, False, at_edge
+        if j >= n or not (exciting[j] or gap_up[j]):
+            return None, j, False, at_edge
+        if not (c[j] > o[j] or gap_up[j]):
+            return None, j, False, False
+        if state.interval in DEMAND_CLOSE_CHECK_INTERVALS and c[j] <= min(l[i + 1:j]):
+            return None, j, False, False
+
+        if c[i] > o[i] or gap_up[i]:
+            lows = list(l[i + 1:j + 1])
+        else:
+            lows = list(l[i:j + 1])
+        spec = {'kind': 'base', 'start': i, 'end': j,
+                'proximal': max(o[j - 1], c[j - 1]), 'distal': min(lows)}
+        return spec, j, True, False
+
+    @staticmethod
+    def _supply_step(arrays, state, n):
+        """
+        One iteration of SupplyZoneIdentifier.identify_supply_zones' main loop.
+
+        :return: (spec or None, next_i, bump_zone_id, at_edge)
+        """
+        i = state.i
+        o, h, c = arrays['open'], arrays['high'], arrays['close']
+        exciting, gap_down = arrays['exciting'], arrays['gap_down']
+
+        # Green Exciting -> Red Exciting
+        if exciting[i] and c[i] > o[i]:
+            j = i + 1
+            if exciting[j] and c[j] < o[j] and c[j] < o[i]:
+                spec = {'kind': 'pair', 'start': i, 'end': j,
+                        'proximal': o[j], 'distal': max(h[i], h[j])}
+                return spec, i + 1, True, False
+
+        if not (exciting[i] or gap_down[i]):
+            return None, i + 1, False, False
+
+        max_base = 5 if state.interval in EXTENDED_BASE_INTERVALS else 3
+        j = ZoneScanner._collect_base(arrays, i, n, gap_down, max_base)
+        if j == i + 1 or j >= n:
+            return None, j, False, j >= n
+
+        spec = None
+        second_valid = (exciting[j] and c[j] < o[j]) or gap_down[j]
+        if second_valid and not (
+            state.interval in SUPPLY_CLOSE_CHECK_INTERVALS and c[j] >= max(h[i + 1:j])
+        ):
+            highs = list(h[i + 1:j + 1])
+            if c[i] > o[i] or gap_down[i]:
+                highs.insert(0, h[i])
+            spec = {'kind': 'base', 'start': i, 'end': j,
+                    'proximal': min(min(o[k], c[k]) for k in range(i + 1, j)),
+                    'distal': max(highs)}
+
+        # The legacy loop bumps zone_id after every base check once any pattern exists
+        bump = spec is not None or bool(state.specs)
+        return spec, j, bump, False
+
+    # ------------------------------------------------------------------
+    #                   PATTERN CONSTRUCTION
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def to_patterns(stock_data, state, specs):
+        """
+        Builds the legacy pattern dicts for a list of positional specs.
+        """
+        ohlc_rows = ZoneScanner.ohlc_rows(stock_data)
+        return [ZoneScanner.to_pattern(stock_data, state, spec, ohlc_rows) for spec in specs]
+
+    @staticmethod
+    def ohlc_rows(stock_data):
+        """
+        Precomputes the 'ohlc' dict the legacy identifiers build per candle with
+        ``stock_data.iloc[idx][['Open', 'High', 'Low', 'Close']].round(2).to_dict()``.
+
+        That row is float64 (and therefore rounded) only when every column of the frame
+        is numeric; once the boolean identifier columns are present it is an object row
+        and ``round`` leaves the values untouched.
+        """
+        columns = ['Open', 'High', 'Low', 'Close']
+        values = stock_data[columns].to_numpy(dtype=float)
+        if all(dtype.kind in 'fiu' for dtype in stock_data.dtypes):
+            values = values.round(2)
+        return [dict(zip(columns, row)) for row in values.tolist()]
+
+    @staticmethod
+    def to_pattern(stock_data, state, spec, ohlc_rows=None):
+        """
+        Builds the legacy pattern dict for a positional spec.
+        """
+        if ohlc_rows is None:
+            ohlc_rows = ZoneScanner.ohlc_rows(stock_data)
+        i, j = spec['start'], spec['end']
+        zone_type = state.zone_type
+        index = stock_data.index
+
+        def candle(idx, candle_type):
+            return {
+                'date': index[idx],
+                'type': candle_type,
+                'ohlc': dict(ohlc_rows[idx])
+            }
+
+        if spec['kind'] == 'pair':
+            if zone_type == 'Demand':
+                types = ('First (Red Exciting)', 'Second (Green Exciting)')
+            else:
+                types = ('First (Green Exciting)', 'Second (Red Exciting)')
+            dates = index[i:i + 2]
+            candles = [candle(i, types[0]), candle(i + 1, types[1])]
+        else:
+            dates = index[i:j + 1]
+            candles = (
+                [candle(i, 'First')] +
+                [candle(idx, 'Base') for idx in range(i + 1, j)] +
+                [candle(j, 'Second')]
+            )
+
+        return {
+            'zone_id': spec['zone_id'],
+            'dates': dates,
+            'proximal': spec['proximal'],
+            'distal': spec['distal'],
+            'score': spec['score'],
+            'interval': state.interval,
+            'zoneType': zone_type,
+            'candles': candles
+        }
@@ -0,0 +1,391 @@
+"""
+Streaming zone tracking for intraday intervals.
+
+StreamingZoneEngine accepts bars as they arrive and keeps demand/supply zones
+current without rescanning the frame:
+
+  * candle identifiers are computed for the new bars only,
+  * the ZoneScanner state machine resumes from its saved ScanState and stops
+    before any step whose outcome still depends on bars that have not arrived,
+  * follow-through scores of the latest zones keep growing while the run lasts,
+  * fresh zones sit in lists sorted by proximal, so each new bar finds the zones
+    it touches with a bisect instead of re-walking every zone's future bars.
+
+Every change is reported as an event dict to subscribed callbacks.
+
+    python -m stock_data.zone_stream --symbol TCS --interval 5m --bars 3000 --verify
+"""
+import sys
+import time
+import bisect
+import logging
+import argparse
+import numpy as np
+from stock_data.zone_scanner import ZoneScanner, ScanState
+from stock_data.candlestick_utils import (
+    CandleStickUtils, BASE_CANDLE_THRESHOLD, EXCITING_CANDLE_THRESHOLD, GAP_THRESHOLD
+)
+from stock_data.replay_data import ReplayDataProvider, synthetic_ohlcv
+
+EVENT_TYPES = ['zone_created', 'zone_updated', 'zone_touched']
+ARRAY_COLUMNS = ['open', 'high', 'low', 'close', 'exciting', 'base', 'gap_up', 'gap_down']
+
+
+class ReplayFeed:
+    """
+    Replays a recorded or synthetic frame as a sequence of appended bar batches.
+    """
+
+    def __init__(self, frame, batch=1, warmup=0):
+        """
+        :param batch: Bars per emitted batch.
+        :param warmup: Bars delivered together in the first batch.
+        """
+        self.frame = frame
+        self.batch = max(1, batch)
+        self.warmup = warmup
+
+    @classmethod
+    def from_source(cls, stock_code, interval, period=None, data_dir=None, bars=2000, **kwargs):
+        """
+        Uses a recording from data_dir when given, otherwise a synthetic frame.
+        """
+        if data_dir:
+            frame = ReplayDataProvider(data_dir).fetch_stock_data(stock_code, interval, period or '1mo')
+        else:
+            frame = synthetic_ohlcv(stock_code, interval, bars)
+        return cls(frame, **kwargs)
+
+    def __iter__(self):
+        start = 0
+        if self.warmup:
+            yield self.frame.iloc[:self.warmup]
+            start = self.warmup
+        for pos in range(start, len(self.frame), self.batch):
+            yield self.frame.iloc[pos:pos + self.batch]
+
+
+class ZoneIndex:
+    """
+    Fresh zones of one type ordered by proximal line.
+
+    Demand zones lie below price, so a bar can only touch those whose proximal is at
+    or above its low (a suffix of the order); supply zones mirror this with a prefix.
+    Within that range the overlap test settles each zone, and touched zones leave
+    the index.
+    """
+
+    def __init__(self, zone_type):
+        self.zone_type = zone_type
+        self.keys = []
+        self.zones = []
+
+    def __len__(self):
+        return len(self.zones)
+
+    def add(self, zone):
+        pos = bisect.bisect_right(self.keys, zone['proximal'])
+        self.keys.insert(pos, zone['proximal'])
+        self.zones.insert(pos, zone)
+
+    def touched_by(self, low, high):
+        """
+        Removes and returns the zones a bar with this range overlaps.
+        """
+        if self.zone_type == 'Demand':
+            lo, hi = bisect.bisect_left(self.keys, low), len(self.keys)
+            hits = [k for k in range(lo, hi) if high >= self.zones[k]['distal']]
+        else:
+            lo, hi = 0, bisect.bisect_right(self.keys, high)
+            hits = [k for k in range(lo, hi) if low <= self.zones[k]['distal']]
+        touched = [self.zones[k] for k in hits]
+        for k in reversed(hits):
+            del self.keys[k]
+            del self.zones[k]
+        return touched
+
+
+class StreamingZoneEngine:
+    def __init__(self, stock_code, interval, base_candle_threshold=BASE_CANDLE_THRESHOLD,
+                 exciting_candle_threshold=EXCITING_CANDLE_THRESHOLD, gap_threshold=GAP_THRESHOLD):
+        """
+        :param stock_code: Symbol reported in events.
+        :param interval: Bar interval (drives the identifiers' base rules).
+        """
+        self.stock_code = stock_code
+        self.interval = interval
+        self.base_candle_threshold = base_candle_threshold
+        self.exciting_candle_threshold = exciting_candle_threshold
+        self.gap_threshold = gap_threshold
+
+        self.n = 0
+        self.capacity = 0
+        self.columns = {}
+        self.dates = []
+        self.states = {zone_type: ScanState(zone_type, interval) for zone_type in ('Demand', 'Supply')}
+        self.zones = {'Demand': [], 'Supply': []}
+        self.fresh = {zone_type: ZoneIndex(zone_type) for zone_type in ('Demand', 'Supply')}
+        # Zones whose follow-through run reached the last bar and may still grow
+        self.growing = []
+        self.listeners = []
+
+    def subscribe(self, callback):
+        """
+        Registers callback(event) for every emitted event.
+        """
+        self.listeners.append(callback)
+
+    # ------------------------------------------------------------------
+    #                   INGEST
+    # ------------------------------------------------------------------
+
+    def append(self, bars):
+        """
+        Appends new bars and updates zones incrementally.
+
+        :param bars: DataFrame with Open/High/Low/Close, indexed by bar time, strictly
+                     after the bars already seen.
+        :return: List of events produced by these bars.
+        """
+        if bars is None or not len(bars):
+            return []
+        first_new = self.n
+        self._extend(bars)
+        arrays = self.arrays()
+        events = []
+
+        # Follow-through runs that reached the previous last bar
+        still_growing = []
+        for zone, spec in self.growing:
+            score, next_idx = ZoneScanner.score(arrays, zone['zoneType'], spec['score_next'], self.n, spec['score'])
+            spec['score'], spec['score_next'] = score, next_idx
+            if score != zone['score']:
+                zone['score'] = score
+                events.append(self._event('zone_updated', zone))
+            if next_idx is not None:
+                still_growing.append((zone, spec))
+        self.growing = still_growing
+
+        # New bars touch existing fresh zones
+        for idx in range(first_new, self.n):
+            events.extend(self._touch(idx))
+
+        # Resume the scanners; zones formed earlier than the newest bars are checked
+        # against the bars that already followed them
+        for zone_type, state in self.states.items():
+            for spec in ZoneScanner.advance(state, arrays, final=False):
+                events.extend(self._commit(zone_type, spec))
+
+        self._emit(events)
+        return events
+
+    def flush(self):
+        """
+        Ends the stream: resolves the scanner steps that were waiting for more bars,
+        exactly as a batch scan of the same frame would.
+
+        :return: Events for zones committed by the flush.
+        """
+        arrays = self.arrays()
+        events = []
+        for zone_type, state in self.states.items():
+            for spec in ZoneScanner.advance(state, arrays, final=True):
+                events.extend(self._commit(zone_type, spec))
+        self._emit(events)
+        return events
+
+    def _extend(self, bars):
+        count = len(bars)
+        needed = self.n + count
+        if needed > self.capacity:
+            capacity = max(needed, 2 * self.capacity, 256)
+            for name in ARRAY_COLUMNS:
+                dtype = bool if name in ('exciting', 'base', 'gap_up', 'gap_down') else float
+                grown = np.zeros(capacity, dtype=dtype)
+                if self.n:
+                    grown[:self.n] = self.columns[name][:self.n]
+                self.columns[name] = grown
+            self.capacity = capacity
+
+        start, end = self.n, needed
+        open_ = bars['Open'].to_numpy(dtype=float)
+        high = bars['High'].to_numpy(dtype=float)
+        low = bars['Low'].to_numpy(dtype=float)
+        close = bars['Close'].to_numpy(dtype=float)
+        previous = self.columns['close'][start - 1] if start else np.nan
+        prev_close = np.r_[previous, close[:-1]]
+        flags = CandleStickUtils.identifier_arrays(
+            open_, high, low, close, prev_close,
+            self.base_candle_threshold, self.exciting_candle_threshold, self.gap_threshold
+        )
+
+        self.columns['open'][start:end] = open_
+        self.columns['high'][start:end] = high
+        self.columns['low'][start:end] = low
+        self.columns['close'][start:end] = close
+        for name, values in flags.items():
+            self.columns[name][start:end] = values
+        self.dates.extend(bars.index)
+        self.n = end
+
+    def arrays(self):
+        """
+        Current bars in the ZoneScanner.candle_arrays layout (views, no copy).
+        """
+        return {name: self.columns[name][:self.n] for name in ARRAY_COLUMNS}
+
+    # ------------------------------------------------------------------
+    #                   ZONES
+    # ------------------------------------------------------------------
+
+    def _commit(self, zone_type, spec):
+        zone = {
+            'zone_id': spec['zone_id'],
+            'zoneType': zone_type,
+            'interval': self.interval,
+            'proximal': float(spec['proximal']),
+            'distal': float(spec['distal']),
+            'score': spec['score'],
+            'start': self.dates[spec['start']],
+            'end': self.dates[spec['end']],
+            'end_idx': spec['end'],
+            'fresh': True,
+            'touched_at': None,
+        }
+        self.zones[zone_type].append(zone)
+        events = [self._event('zone_created', zone)]
+        if spec['score_next'] is not None:
+            self.growing.append((zone, spec))
+
+        # Bars that arrived after the zone formed but before the scanner committed it
+        after = spec['end'] + 1
+        if after < self.n:
+            lows = self.columns['low'][after:self.n]
+            highs = self.columns['high'][after:self.n]
+            if zone_type == 'Demand':
+                hits = np.flatnonzero((lows <= zone['proximal']) & (highs >= zone['distal']))
+            else:
+                hits = np.flatnonzero((highs >= zone['proximal']) & (lows <= zone['distal']))
+            if len(hits):
+                zone['fresh'] = False
+                zone['touched_at'] = self.dates[after + hits[0]]
+                events.append(self._event('zone_touched', zone))
+                return events
+
+        self.fresh[zone_type].add(zone)
+        return events
+
+    def _touch(self, idx):
+        low = self.columns['low'][idx]
+        high = self.columns['high'][idx]
+        events = []
+        for zone_type, index in self.fresh.items():
+            for zone in index.touched_by(low, high):
+                zone['fresh'] = False
+                zone['touched_at'] = self.dates[idx]
+                events.append(self._event('zone_touched', zone))
+        return events
+
+    def active_zones(self, zone_type=None, fresh_only=False):
+        """
+        :return: Committed zone dicts, optionally for one type and/or only fresh ones.
+        """
+        types = [zone_type] if zone_type else ['Demand', 'Supply']
+        return [zone for t in types for zone in self.zones[t] if zone['fresh'] or not fresh_only]
+
+    # ------------------------------------------------------------------
+    #                   EVENTS
+    # ------------------------------------------------------------------
+
+    def _event(self, kind, zone):
+        return {
+            'event': kind,
+            'symbol': self.stock_code,
+            'interval': self.interval,
+            'zone_type': zone['zoneType'],
+            'zone_id': zone['zone_id'],
+            'proximal': zone['proximal'],
+            'distal': zone['distal'],
+            'score': zone['score'],
+            'fresh': zone['fresh'],
+            'bar_time': self.dates[-1],
+        }
+
+    def _emit(self, events):
+        for event in events:
+            for callback in self.listeners:
+                try:
+                    callback(event)
+                except Exception as e:
+                    logging.error("Zone stream listener failed on %s: %s", event['event'], e)
+
+
+def verify(engine, frame):
+    """
+    Compares a flushed engine with a batch scan of the same frame.
+
+    :return: List of difference descriptions (empty when identical).
+    """
+    stock_data = CandleStickUtils.add_candle_identifiers(
+        frame[['Open', 'High', 'Low', 'Close']].copy(),
+        engine.base_candle_threshold, engine.exciting_candle_threshold, engine.gap_threshold)
+    differences = []
+    for zone_type in ('Demand', 'Supply'):
+        method = ZoneScanner.identify_demand_zones if zone_type == 'Demand' else ZoneScanner.identify_supply_zones
+        expected = method(stock_data, engine.interval)
+        fresh = ZoneScanner.fresh_flags(stock_data, expected, zone_type)
+        actual = engine.zones[zone_type]
+        if len(expected) != len(actual):
+            differences.append(f"{zone_type}: {len(expected)} batch zones, {len(actual)} streamed")
+        for batch_zone, is_fresh, zone in zip(expected, fresh, actual):
+            batch = (batch_zone['zone_id'], float(batch_zone['proximal']), float(batch_zone['distal']),
+                     batch_zone['score'], bool(is_fresh))
+            streamed = (zone['zone_id'], zone['proximal'], zone['distal'], zone['score'], zone['fresh'])
+            if batch != streamed:
+                differences.append(f"{zone_type}: batch {batch} != streamed {streamed}")
+    return differences
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay bars through the streaming zone engine.")
+    parser.add_argument('--symbol', default='TCS')
+    parser.add_argument('--interval', default='5m')
+    parser.add_argument('--period', help="Recorded period to replay (with --replay-dir).")
+    parser.add_argument('--replay-dir', help="Replay a recording instead of a synthetic frame.")
+    parser.add_argument('--bars', type=int, default=3000, help="Synthetic bars.")
+    parser.add_argument('--batch', type=int, default=1, help="Bars per append.")
+    parser.add_argument('--warmup', type=int, default=0, help="Bars in the first append.")
+    parser.add_argument('--verify', action='store_true', help="Compare with a batch scan at the end.")
+    args = parser.parse_args(argv)
+
+    feed = ReplayFeed.from_source(args.symbol, args.interval, args.period, args.replay_dir, args.bars,
+                                  batch=args.batch, warmup=args.warmup)
+    engine = StreamingZoneEngine(args.symbol, args.interval)
+    counts = dict.fromkeys(EVENT_TYPES, 0)
+    engine.subscribe(lambda event: counts.__setitem__(event['event'], counts[event['event']] + 1))
+
+    latencies = []
+    for bars in feed:
+        started = time.perf_counter()
+        engine.append(bars)
+        latencies.append(time.perf_counter() - started)
+    engine.flush()
+
+    latencies = np.array(latencies) * 1000
+    print(f"{engine.n} bars in {len(latencies)} appends: "
+          f"mean {latencies.mean():.3f} ms, p99 {np.percentile(latencies, 99):.3f} ms, "
+          f"max {latencies.max():.3f} ms per append")
+    print(", ".join(f"{kind}={count}" for kind, count in counts.items()))
+    print(f"fresh zones: {len(engine.active_zones(fresh_only=True))} of {len(engine.active_zones())}")
+
+    if args.verify:
+        differences = verify(engine, feed.frame)
+        for line in differences[:20]:
+            print(line)
+        print("batch scan matches" if not differences else f"{len(differences)} differences")
+        return 1 if differences else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
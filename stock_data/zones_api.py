@@ -0,0 +1,271 @@
+"""
+JSON zones API with ETag-based conditional responses.
+
+A response is identified by the request (symbol, intervals, period, fresh) and
+the version of every fetched frame (bar count, last timestamp, last close).
+Within ZONES_API_TTL seconds a cached entry is answered without fetching; after
+that the bars are sliced again from the superset cache, and only when a version
+changed are the zones collected and the DTO rebuilt. A client sending the current ETag in
+If-None-Match gets a 304 without any zone computation.
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from stock_data.period_cache import superset_cache
+from stock_data.demand_zone_manager import DemandZoneManager
+from stock_data.gpt_client import GPTClient
+from stock_data.metrics import metrics
+
+# Seconds a computed response is served without re-fetching the underlying data
+ZONES_API_TTL = float(os.environ.get('ZONES_API_TTL', '60'))
+ZONES_API_CACHE_SIZE = int(os.environ.get('ZONES_API_CACHE_SIZE', '256'))
+# Highest timeframe first, as the monthly zones are merged into the daily ones
+ZONES_API_INTERVALS = ['3mo', '1mo', '1wk', '1d']
+# Bump when the payload layout changes so old ETags stop matching
+ZONES_API_SCHEMA = 1
+
+
+class ZonesApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class ZonesApi:
+    schema = ZONES_API_SCHEMA
+    # Prefix of this API's metric names
+    metrics_name = 'zones_api'
+
+    def __init__(self, ttl=ZONES_API_TTL, cache_size=ZONES_API_CACHE_SIZE):
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._dto_client = GPTClient.offline()
+
+    # ------------------------------------------------------------------
+    #                   REQUEST
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def parse_intervals(text):
+        """
+        :param text: Comma-separated intervals, or None/empty for all of ZONES_API_INTERVALS.
+        :return: The requested intervals in processing order.
+        """
+        if not text:
+            return list(ZONES_API_INTERVALS)
+        requested = {value.strip() for value in text.split(',') if value.strip()}
+        unknown = requested.difference(ZONES_API_INTERVALS)
+        if unknown:
+            raise ZonesApiError(f"Unsupported intervals: {', '.join(sorted(unknown))}")
+        return [interval for interval in ZONES_API_INTERVALS if interval in requested]
+
+    def get(self, symbol, intervals, period, fresh, if_none_match=None, admit=None):
+        """
+        Resolves one request.
+
+        :param if_none_match: ETags from the If-None-Match header (a collection, or None).
+        :param admit: Called (and may raise) before the data is fetched and the payload
+                      built, so only requests that do that work are admission-controlled.
+        :return: (etag, body) where body is None when the client's copy is current.
+        """
+        key = (symbol, tuple(intervals), period, bool(fresh))
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+        if entry is not None and now - entry['checked'] < self.ttl:
+            metrics.inc(f'{self.metrics_name}_requests_total', result='hit')
+            return entry['etag'], self._body_unless_current(entry, if_none_match)
+
+        if admit is not None:
+            admit()
+        slices, versions = self.fetch(symbol, intervals, period)
+        if entry is not None and entry['versions'] == versions:
+            metrics.inc(f'{self.metrics_name}_requests_total', result='revalidated')
+            entry['checked'] = now
+            return entry['etag'], self._body_unless_current(entry, if_none_match)
+
+        etag = self.etag(key, versions)
+        if if_none_match and etag in if_none_match:
+            # The client already holds this version, so the payload is never built
+            metrics.inc(f'{self.metrics_name}_requests_total', result='not_modified')
+            return etag, None
+
+        metrics.inc(f'{self.metrics_name}_requests_total', result='miss')
+        with metrics.span(f'{self.metrics_name}_build'):
+            payload = self.build(symbol, intervals, period, fresh, slices, versions)
+        body = self.serialize(payload)
+        entry = {'etag': etag, 'versions': versions, 'body': body, 'checked': now}
+        with self._lock:
+            self._cache[key] = entry
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return etag, body
+
+    @staticmethod
+    def _body_unless_current(entry, if_none_match):
+        if if_none_match and entry['etag'] in if_none_match:
+            return None
+        return entry['body']
+
+    # ------------------------------------------------------------------
+    #                   VERSIONING
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def fetch(symbol, intervals, period):
+        """
+        :return: ({interval: PeriodSlice}, {interval: version}) for the intervals with data.
+        """
+        slices, versions = {}, {}
+        for interval in intervals:
+            with metrics.span('slice', interval):
+                try:
+                    period_slice = superset_cache.slice(symbol, interval, period)
+                except ValueError as e:
+                    logging.warning("Zones API could not fetch %s %s: %s", symbol, interval, e)
+                    continue
+            if period_slice.frame.empty:
+                continue
+            slices[interval] = period_slice
+            versions[interval] = ZonesApi.data_version(period_slice.frame)
+        if not slices:
+            raise ZonesApiError(f"No data for {symbol}", status=404)
+        return slices, versions
+
+    @staticmethod
+    def data_version(frame):
+        """
+        Cheap identity of a frame: bar count, last timestamp and last close.
+        A new bar, or a revised close on the live bar, changes it.
+        """
+        last = frame.index[-1]
+        return f"{len(frame)}:{pd.Timestamp(last).value}:{float(frame['Close'].iloc[-1])!r}"
+
+    @classmethod
+    def etag(cls, key, versions):
+        digest = hashlib.sha1(repr((cls.schema, key, sorted(versions.items()))).encode()).hexdigest()
+        return digest[:32]
+
+    # ------------------------------------------------------------------
+    #                   PAYLOAD
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def scan(symbol, intervals, slices):
+        """
+        Runs DemandZoneManager.compute_zones over the fetched intervals, highest first.
+
+        :return: {interval: compute_zones result}
+        """
+        manager = DemandZoneManager(symbol)
+        return {interval: manager.compute_zones(slices[interval], interval)
+                for interval in intervals if interval in slices}
+
+    @staticmethod
+    def iter_zones(results, fresh=False):
+        """
+        Yields (zone, is_fresh) once per zone, under the interval it was found on.
+
+        :param fresh: Only the fresh zones rather than all of them.
+        """
+        for interval, result in results.items():
+            fresh_keys = {ZonesApi._zone_key(zone) for category in ('demand', 'supply')
+                          for zone in result['fresh_zones'][category]}
+            listed = result['fresh_zones'] if fresh else result['all_zones']
+            for category in ('demand', 'supply'):
+                for zone in listed[category]:
+                    # Daily lists also carry the merged monthly zones
+                    if zone.get('interval', interval) != interval:
+                        continue
+                    yield zone, ZonesApi._zone_key(zone) in fresh_keys
+
+    def build(self, symbol, intervals, period, fresh, slices, versions):
+        """
+        Collects the zones of every fetched interval and assembles the response payload.
+        """
+        results = self.scan(symbol, intervals, slices)
+        return {
+            'symbol': symbol,
+            'period': period,
+            'intervals': list(results),
+            'fresh': bool(fresh),
+            'current_price': results['1d']['current_price'] if '1d' in results else None,
+            'data_version': versions,
+            'zones': [self.serialize_zone(zone, is_fresh) for zone, is_fresh in self.iter_zones(results, fresh)],
+            'dto': self.build_dto(results),
+        }
+
+    def build_dto(self, results):
+        """
+        Same DTO the index page hands to the AI, from the monthly, weekly and daily scans.
+        Needs the daily interval for the current price; None otherwise.
+        """
+        if '1d' not in results:
+            return None
+        monthly_all = []
+        for interval in ('1mo', '3mo'):
+            if interval in results:
+                monthly_all.extend(results[interval]['all_zones']['demand'] + results[interval]['all_zones']['supply'])
+        wk_demand = results['1wk']['all_zones']['demand'] if '1wk' in results else []
+        daily = results['1d']
+        with metrics.span('prepare_zones'):
+            return self._dto_client.prepare_zones(
+                monthly_all, daily['fresh_zones']['demand'], daily['current_price'], wk_demand, "Main Stock Data"
+            )
+
+    @staticmethod
+    def _zone_key(zone):
+        return zone.get('interval'), zone.get('zoneType'), zone.get('zone_id')
+
+    @staticmethod
+    def serialize_zone(zone, is_fresh):
+        dates = list(zone.get('dates', []))
+        return {
+            'zone_id': int(zone['zone_id']),
+            'zone_type': zone['zoneType'],
+            'interval': zone['interval'],
+            'proximal': float(zone['proximal']),
+            'distal': float(zone['distal']),
+            'score': float(zone.get('score', 0)),
+            'fresh': is_fresh,
+            'start': ZonesApi._iso(dates[0]) if dates else None,
+            'end': ZonesApi._iso(dates[-1]) if dates else None,
+            'candles': [
+                {
+                    'date': ZonesApi._iso(candle['date']),
+                    'type': candle['type'],
+                    'ohlc': {name: float(value) for name, value in candle['ohlc'].items()},
+                }
+                for candle in zone.get('candles', [])
+            ],
+        }
+
+    def serialize(self, payload):
+        return json.dumps(payload, separators=(',', ':'), default=self.json_default)
+
+    @staticmethod
+    def _iso(value):
+        return pd.Timestamp(value).isoformat()
+
+    @staticmethod
+    def json_default(value):
+        if isinstance(value, (pd.Timestamp, np.datetime64)):
+            return pd.Timestamp(value).isoformat()
+        if isinstance(value, np.generic):
+            return value.item()
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
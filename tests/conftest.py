@@ -0,0 +1,14 @@
+"""
+Environment for the tests: replayed synthetic bars instead of Yahoo, and a
+throwaway session database. Set before any stock_data module reads it.
+"""
+import os
+import tempfile
+
+_scratch = tempfile.mkdtemp(prefix='priceaction-tests-')
+os.environ.setdefault('DATA_PROVIDER', 'replay')
+os.environ.setdefault('REPLAY_SYNTHESIZE', '1')
+os.environ.setdefault('REPLAY_DATA_DIR', os.path.join(_scratch, 'replay'))
+os.environ.setdefault('SESSION_DB_PATH', os.path.join(_scratch, 'sessions.sqlite3'))
+os.environ.setdefault('FLASK_SECRET_KEY', 'tests')
+os.environ.setdefault('COMPUTE_WORKERS', '0')
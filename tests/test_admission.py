@@ -0,0 +1,80 @@
+"""
+Token and slot accounting of AdmissionController.
+"""
+import threading
+import pytest
+from stock_data.admission import AdmissionController, AdmissionRejected
+
+
+def controller(**overrides):
+    settings = dict(rate=0, burst=2, client_concurrency=1, max_concurrent=1, max_queue=0, queue_timeout=0)
+    settings.update(overrides)
+    return AdmissionController(**settings)
+
+
+def tokens(admission, client):
+    return admission._buckets[client][0]
+
+
+def test_tokens_run_out_without_refill():
+    admission = controller()
+    for _ in range(2):
+        admission.release(admission.acquire('search', 'a'))
+    with pytest.raises(AdmissionRejected) as rejected:
+        admission.acquire('search', 'a')
+    assert (rejected.value.status, rejected.value.reason) == (429, 'rate')
+    assert tokens(admission, 'a') == 0
+
+
+def test_client_concurrency_is_limited_per_client():
+    admission = controller(max_concurrent=2)
+    ticket = admission.acquire('search', 'a')
+    with pytest.raises(AdmissionRejected) as rejected:
+        admission.acquire('search', 'a')
+    assert (rejected.value.status, rejected.value.reason) == (429, 'client_concurrency')
+    other = admission.acquire('search', 'b')
+    admission.release(ticket)
+    admission.release(other)
+    assert admission._in_flight == 0
+    assert admission._buckets['a'][2] == admission._buckets['b'][2] == 0
+
+
+def test_full_server_rejects_and_refunds_the_token():
+    admission = controller()
+    ticket = admission.acquire('search', 'a')
+    with pytest.raises(AdmissionRejected) as rejected:
+        admission.acquire('search', 'b', policy='reject')
+    assert (rejected.value.status, rejected.value.reason) == (503, 'overloaded')
+    assert tokens(admission, 'b') == 2
+    assert admission._in_flight == 1
+    admission.release(ticket)
+    assert admission._in_flight == 0
+
+
+def test_queued_request_takes_the_freed_slot():
+    admission = controller(max_queue=1, queue_timeout=5)
+    ticket = admission.acquire('search', 'a')
+    admitted = []
+    waiter = threading.Thread(target=lambda: admitted.append(admission.acquire('search', 'b')))
+    waiter.start()
+    while admission._queued == 0:
+        threading.Event().wait(0.01)
+    admission.release(ticket)
+    waiter.join(5)
+    assert len(admitted) == 1 and admission._in_flight == 1 and admission._queued == 0
+    admission.release(admitted[0])
+    assert admission._in_flight == 0
+
+
+def test_queue_timeout_gives_503():
+    admission = controller(max_queue=1, queue_timeout=0.05)
+    admission.acquire('search', 'a')
+    with pytest.raises(AdmissionRejected) as rejected:
+        admission.acquire('search', 'b')
+    assert (rejected.value.status, rejected.value.reason) == (503, 'queue_timeout')
+    assert admission._queued == 0 and admission._in_flight == 1
+
+
+def test_unknown_policy_is_refused():
+    with pytest.raises(ValueError):
+        controller().acquire('search', 'a', policy='drop')
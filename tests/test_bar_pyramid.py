@@ -0,0 +1,71 @@
+"""
+Bar pyramid levels and range queries.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+import app as app_module
+from stock_data.bar_pyramid import BarPyramid, PIXELS_PER_BAR
+from stock_data.replay_data import synthetic_ohlcv
+
+
+@pytest.fixture(scope='module')
+def frame():
+    return synthetic_ohlcv('PYR', '1d', 2000, seed=3)
+
+
+@pytest.fixture(scope='module')
+def pyramid(frame):
+    return BarPyramid(frame, factor=4, min_bars=100)
+
+
+def test_levels_aggregate_ohlc(frame, pyramid):
+    assert [len(level['times']) for level in pyramid.levels] == [2000, 500, 125, 32]
+    coarse = pyramid.levels[2]
+    for bucket in (0, 17, len(coarse['times']) - 1):
+        bars = frame.iloc[bucket * 16:(bucket + 1) * 16]
+        assert coarse['open'][bucket] == bars['Open'].iloc[0]
+        assert coarse['high'][bucket] == bars['High'].max()
+        assert coarse['low'][bucket] == bars['Low'].min()
+        assert coarse['close'][bucket] == bars['Close'].iloc[-1]
+        assert coarse['bars'][bucket] == len(bars)
+    assert all(level['bars'].sum() == len(frame) for level in pyramid.levels)
+
+
+def test_query_picks_the_finest_level_that_fits(frame, pyramid):
+    width = 300
+    number, level = pyramid.query(width=width)
+    assert number == 2 and len(level['times']) <= width / PIXELS_PER_BAR
+
+    start, end = frame.index[1000], frame.index[1099]
+    number, level = pyramid.query(start, end, width=width)
+    assert number == 0
+    # The requested bars plus one either side
+    assert len(level['times']) == 102
+    assert level['times'][1] == start.value and level['times'][-2] == end.value
+
+
+def test_query_accepts_naive_wall_clock_times(frame, pyramid):
+    start, end = frame.index[500], frame.index[520]
+    aware = pyramid.query(start, end)
+    naive = pyramid.query(start.tz_localize(None).isoformat(), end.tz_localize(None).isoformat())
+    assert aware[0] == naive[0]
+    assert np.array_equal(aware[1]['times'], naive[1]['times'])
+
+
+def test_json_uses_wall_clock_dates(frame, pyramid):
+    number, level = pyramid.query(frame.index[0], frame.index[5])
+    payload = pyramid.to_json(number, level)
+    assert payload['x'][0] == frame.index[0].tz_localize(None).isoformat()
+    assert payload['levels'] == len(pyramid.levels)
+
+
+def test_bars_endpoint():
+    client = app_module.app.test_client()
+    client.post('/user_info', data={'name': 'tester', 'email': 'tester@example.com'})
+    response = client.get('/api/bars/TCS?interval=1d&width=200')
+    payload = response.get_json()
+    assert response.status_code == 200 and payload['level'] > 0
+    assert len(payload['x']) <= 200 / PIXELS_PER_BAR + 2
+    assert client.get('/api/bars/TCS?interval=2h').status_code == 400
+    assert client.get('/api/bars/TCS?start=not-a-date').status_code == 400
@@ -0,0 +1,64 @@
+"""
+Charts API: ETag revalidation without rebuilding, and the merged chart intervals.
+"""
+import json
+import pytest
+import app as app_module
+from stock_data.charts_api import ChartsApi
+from stock_data.zones_api import ZonesApi, ZonesApiError
+
+
+class CountingChartsApi(ChartsApi):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.builds = 0
+
+    def build(self, *args):
+        self.builds += 1
+        return super().build(*args)
+
+
+@pytest.mark.parametrize('interval, expected', [
+    ('1d', ['1mo', '1d']),
+    ('1wk', ['1wk']),
+    ('1mo', ['1mo']),
+])
+def test_chart_intervals(interval, expected):
+    assert ChartsApi.chart_intervals(interval) == expected
+
+
+def test_unsupported_interval_is_rejected():
+    with pytest.raises(ZonesApiError):
+        ChartsApi.chart_intervals('2h')
+
+
+def test_current_etag_gets_no_body():
+    api = CountingChartsApi(ttl=0)
+    etag, body = api.get_chart('TCS', '1d', '1y')
+    payload = json.loads(body)
+    assert payload['interval'] == '1d' and set(payload['data_version']) == {'1mo', '1d'}
+    assert set(payload['charts']) == {'all_zones', 'fresh_zones'}
+    assert payload['charts']['all_zones']['data'][0]['type'] == 'candlestick'
+    assert api.get_chart('TCS', '1d', '1y', {etag}) == (etag, None)
+    assert api.get_chart('TCS', '1d', '1y', {'"other"'}) == (etag, body)
+    assert api.builds == 1
+
+
+def test_etag_differs_from_the_zones_api():
+    charts_etag, _ = ChartsApi(ttl=60).get_chart('TCS', '1d', '1y')
+    zones_etag, _ = ZonesApi(ttl=60).get('TCS', ['1mo', '1d'], '1y', False)
+    assert charts_etag != zones_etag
+    assert ChartsApi(ttl=60).get_chart('TCS', '1wk', '1y')[0] != charts_etag
+
+
+def test_http_conditional_request():
+    client = app_module.app.test_client()
+    assert client.get('/api/charts/ITC?interval=1wk&period=1y').status_code == 401
+    client.post('/user_info', data={'name': 'tester', 'email': 'tester@example.com'})
+    response = client.get('/api/charts/ITC?interval=1wk&period=1y')
+    assert response.status_code == 200 and response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+    revalidated = client.get('/api/charts/ITC?interval=1wk&period=1y',
+                             headers={'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 304 and revalidated.headers['ETag'] == response.headers['ETag']
+    assert client.get('/api/charts/ITC?interval=2h').status_code == 400
@@ -0,0 +1,138 @@
+"""
+Response compression and the fingerprinted, precompressed asset build.
+"""
+import gzip
+import json
+import os
+import pytest
+from flask import Flask, Response
+from werkzeug.http import parse_accept_header
+import app as app_module
+from stock_data import compression, static_assets as static_assets_module
+from stock_data.compression import choose_encoding, compress, compress_response, COMPRESS_MIN_SIZE
+from stock_data.static_assets import StaticAssets
+
+LARGE_JSON = json.dumps([{'symbol': 'TCS', 'zone': n} for n in range(500)])
+
+
+def accept(value):
+    return parse_accept_header(value)
+
+
+@pytest.mark.parametrize('header, encodings, expected', [
+    ('gzip, deflate, br', ['br', 'gzip'], 'br'),
+    ('gzip, deflate', ['br', 'gzip'], 'gzip'),
+    ('br;q=0, gzip', ['br', 'gzip'], 'gzip'),
+    ('identity', ['br', 'gzip'], None),
+    ('*', ['gzip'], 'gzip'),
+    ('', ['gzip'], None),
+])
+def test_choose_encoding(header, encodings, expected):
+    assert choose_encoding(accept(header), encodings) == expected
+
+
+def test_gzip_is_reproducible():
+    data = LARGE_JSON.encode('utf-8')
+    packed = compress(data, 'gzip')
+    assert gzip.decompress(packed) == data
+    assert compress(data, 'gzip') == packed
+    with pytest.raises(ValueError):
+        compress(data, 'deflate')
+
+
+@pytest.mark.skipif(compression.brotli is None, reason="brotli not installed")
+def test_brotli_round_trip():
+    data = LARGE_JSON.encode('utf-8')
+    assert compression.brotli.decompress(compress(data, 'br')) == data
+
+
+def compressed(body, mimetype='application/json', header='gzip', **kwargs):
+    with Flask(__name__).test_request_context():
+        response = Response(body, mimetype=mimetype, **kwargs)
+        return compress_response(response, accept(header))
+
+
+def test_large_json_is_compressed_with_a_weak_etag():
+    response = compressed(LARGE_JSON, header='gzip')
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.vary
+    assert json.loads(gzip.decompress(response.get_data())) == json.loads(LARGE_JSON)
+
+
+def test_strong_etag_becomes_weak():
+    with Flask(__name__).test_request_context():
+        response = Response(LARGE_JSON, mimetype='application/json')
+        response.set_etag('v1')
+        compress_response(response, accept('gzip'))
+        assert response.get_etag() == ('v1', True)
+
+
+@pytest.mark.parametrize('body, mimetype, header, status', [
+    ('x' * (COMPRESS_MIN_SIZE - 1), 'application/json', 'gzip', 200),
+    (LARGE_JSON, 'image/png', 'gzip', 200),
+    (LARGE_JSON, 'application/json', 'identity', 200),
+    (LARGE_JSON, 'application/json', 'gzip', 206),
+])
+def test_left_alone(body, mimetype, header, status):
+    response = compressed(body, mimetype, header, status=status)
+    assert 'Content-Encoding' not in response.headers
+    assert response.get_data(as_text=True) == body
+
+
+def test_already_encoded_response_is_left_alone():
+    response = compressed(LARGE_JSON, headers={'Content-Encoding': 'br'})
+    assert response.headers['Content-Encoding'] == 'br'
+    assert response.get_data(as_text=True) == LARGE_JSON
+
+
+@pytest.fixture
+def assets(tmp_path, monkeypatch):
+    root = tmp_path / 'static'
+    (root / 'js').mkdir(parents=True)
+    (root / 'js' / 'main.js').write_text('console.log("zones");\n' * 200)
+    (root / 'favicon.ico').write_bytes(os.urandom(512))
+    (root / '.DS_Store').write_bytes(b'junk')
+    # Keep the plotly.js bundle out of the test build
+    monkeypatch.setattr(static_assets_module, 'generated_assets', lambda: {})
+    return StaticAssets(str(root), str(root / 'dist'))
+
+
+def test_build_fingerprints_and_precompresses(assets):
+    manifest = assets.build()
+    assert set(manifest) == {'js/main.js', 'favicon.ico'}
+    main_js = manifest['js/main.js']
+    content = open(os.path.join(assets.root, 'js', 'main.js'), 'rb').read()
+    assert main_js == StaticAssets.hashed_name('js/main.js', content)
+    dist = os.path.join(assets.out_dir, main_js)
+    assert gzip.decompress(open(dist + '.gz', 'rb').read()) == content
+    # Binary assets are not compressed
+    assert not os.path.exists(os.path.join(assets.out_dir, manifest['favicon.ico'] + '.gz'))
+
+    assert assets.resolve(main_js, accept('gzip')) == (dist + '.gz', 'gzip', 'text/javascript')
+    assert assets.resolve(main_js, accept('identity')) == (dist, None, 'text/javascript')
+    assert assets.resolve('js/main.000000000000.js', accept('gzip')) is None
+
+
+def test_rebuild_renames_changed_files_and_cleans_stale_ones(assets):
+    old = assets.build()['js/main.js']
+    with open(os.path.join(assets.root, 'js', 'main.js'), 'a') as f:
+        f.write('console.log("alerts");\n')
+    new = assets.build(clean=True)['js/main.js']
+    assert new != old
+    assert not os.path.exists(os.path.join(assets.out_dir, old))
+    # A fresh instance reads the manifest written by the build
+    assert StaticAssets(assets.root, assets.out_dir).hashed('js/main.js') == new
+
+
+def test_asset_endpoint_serves_the_precompressed_file(assets, monkeypatch):
+    manifest = assets.build()
+    monkeypatch.setattr(app_module, 'static_assets', assets)
+    client = app_module.app.test_client()
+    url = f"/assets/{manifest['js/main.js']}"
+    response = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'immutable' in response.headers['Cache-Control']
+    assert gzip.decompress(response.data).startswith(b'console.log')
+    with app_module.app.test_request_context():
+        assert app_module.asset_url('js/main.js') == url
@@ -0,0 +1,106 @@
+"""
+FigureBuilder's dict figures against the go.Figure path they replace.
+"""
+import itertools
+import numpy as np
+import pytest
+import plotly.graph_objects as go
+from stock_data.candlestick_utils import CandleStickUtils, BASE_CANDLE_THRESHOLD, EXCITING_CANDLE_THRESHOLD
+from stock_data.figure_builder import FigureBuilder
+from stock_data.replay_data import synthetic_ohlcv
+
+
+def plain(value):
+    return value.to_plotly_json() if hasattr(value, 'to_plotly_json') else value
+
+
+def zones_of(frame):
+    index = frame.index
+    return [
+        {'dates': [index[40], index[42]], 'distal': 95.0, 'proximal': 98.0},
+        {'dates': [index[80], index[83]], 'distal': 101.0, 'proximal': 104.5},
+    ]
+
+
+def old_figure(frame, stock_code, zones):
+    """
+    The chart as Plotter and CandleStickUtils built it before FigureBuilder.
+    """
+    frame = CandleStickUtils.add_candle_identifiers(frame, BASE_CANDLE_THRESHOLD, EXCITING_CANDLE_THRESHOLD)
+    frame['EMA20'] = frame['Close'].ewm(span=20, adjust=False).mean()
+    fig = CandleStickUtils.highlightCandlesAsExcitingOrBase(frame)
+    fig.add_trace(go.Scatter(x=frame.index, y=frame['EMA20'], mode='lines', name='EMA20',
+                             line=dict(color='blue', width=2)))
+    CandleStickUtils.markDemandZoneInfoOnChart(stock_code, fig, zones, itertools.cycle(['green']))
+    return fig
+
+
+def new_figure(frame, stock_code, zones, max_points=0):
+    figure = FigureBuilder.candlestick(frame, stock_code, '1d', zones, max_points)
+    return go.Figure(FigureBuilder.with_zones(figure, stock_code, zones, []))
+
+
+def test_traces_match_the_old_figure():
+    frame = synthetic_ohlcv('FIG', '1d', 300, seed=5)
+    zones = zones_of(frame)
+    old = old_figure(frame.copy(), 'FIG', zones)
+    new = new_figure(frame.copy(), 'FIG', zones)
+
+    assert [trace.name for trace in new.data] == [trace.name for trace in old.data]
+    for old_trace, new_trace in zip(old.data, new.data):
+        # Marker traces moved to WebGL; the trace contents are unchanged
+        assert new_trace.type.replace('scattergl', 'scatter') == old_trace.type
+        assert np.array_equal(np.asarray(new_trace.x), np.asarray(old_trace.x))
+        for field in ('open', 'high', 'low', 'close', 'y'):
+            if field in old_trace:
+                assert np.allclose(np.asarray(new_trace[field], dtype=float),
+                                   np.asarray(old_trace[field], dtype=float)), field
+        for field in ('mode', 'marker', 'line', 'increasing', 'decreasing'):
+            if field in old_trace:
+                assert plain(new_trace[field]) == plain(old_trace[field]), field
+
+
+def test_zone_shapes_and_layout_match_the_old_figure():
+    frame = synthetic_ohlcv('FIG', '1d', 300, seed=5)
+    zones = zones_of(frame)
+    old = old_figure(frame.copy(), 'FIG', zones)
+    new = new_figure(frame.copy(), 'FIG', zones)
+
+    assert new.layout.shapes == old.layout.shapes
+    for field in ('title', 'height', 'width', 'margin', 'font', 'plot_bgcolor', 'paper_bgcolor'):
+        assert new.layout[field] == old.layout[field], field
+    assert new.layout.xaxis.title == old.layout.xaxis.title
+    assert new.layout.yaxis.title == old.layout.yaxis.title
+    assert new.layout.xaxis.rangeslider.visible is False
+
+
+def test_with_zones_leaves_the_base_figure_alone():
+    frame = synthetic_ohlcv('FIG', '1d', 120, seed=6)
+    zones = zones_of(frame)[:1]
+    base = FigureBuilder.candlestick(frame, 'FIG', '1d', zones)
+    title = dict(base['layout']['title'])
+    zoned = FigureBuilder.with_zones(base, 'FIG', zones, zones, supply_colors=itertools.cycle(['red']))
+    assert 'shapes' not in base['layout'] and base['layout']['title'] == title
+    assert [shape['fillcolor'] for shape in zoned['layout']['shapes']] == ['green', 'red']
+    assert zoned['data'] is base['data']
+
+
+@pytest.mark.parametrize('max_points', [100, 0])
+def test_reduced_chart_keeps_zone_bars(max_points):
+    frame = synthetic_ohlcv('FIG', '1d', 1000, seed=7)
+    zones = zones_of(frame)
+    figure = FigureBuilder.candlestick(frame, 'FIG', '1d', zones, max_points)
+    candles = figure['data'][0]
+    if max_points:
+        assert len(candles['x']) < len(frame)
+    else:
+        assert len(candles['x']) == len(frame)
+    for zone in zones:
+        for date in zone['dates']:
+            assert date in candles['x']
+    # Markers sit on candle highs of the reduced data
+    highs = dict(zip(candles['x'], candles['high']))
+    for markers in figure['data'][1:3]:
+        assert all(highs[x] == y for x, y in zip(markers['x'], markers['y']))
+    # The figure round-trips through the plotly.js serializer
+    assert 'Plotly.newPlot' in FigureBuilder.to_html(figure)
@@ -0,0 +1,45 @@
+"""
+A search and the chart loads of the page it renders are charged one admission.
+"""
+import re
+import pytest
+import app as app_module
+from stock_data.admission import AdmissionController
+
+INTERVALS = ('3mo', '1mo', '1wk', '1d')
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # A fresh controller with the shipped defaults, so earlier tests do not drain its buckets
+    monkeypatch.setattr(app_module, 'admission', AdmissionController())
+    client = app_module.app.test_client()
+    client.post('/user_info', data={'name': 'tester', 'email': 'tester@example.com'})
+    return client
+
+
+def page_charts(html):
+    return re.findall(r'data-symbol="([^"]+)" data-interval="([^"]+)" data-period="([^"]+)"', html)
+
+
+def test_search_page_charts_are_not_rate_limited(client):
+    page = client.post('/', data={'stock_code': 'INFY', 'period': '1y'})
+    assert page.status_code == 200
+    charts = page_charts(page.get_data(as_text=True))
+    assert {symbol for symbol, _, _ in charts} == {'INFY', 'NIFTY50'}
+    assert len(charts) == 2 * len(INTERVALS)
+
+    for symbol, interval, period in charts:
+        response = client.get(f'/api/charts/{symbol}?interval={interval}&period={period}')
+        assert response.status_code == 200, (symbol, interval, response.get_data(as_text=True))
+
+    # The chart loads took no tokens, so the next search is admitted too
+    assert client.post('/', data={'stock_code': 'TCS', 'period': '1y'}).status_code == 200
+
+
+def test_charts_outside_the_page_are_still_admitted(client):
+    client.post('/', data={'stock_code': 'INFY', 'period': '1y'})
+    app_module.admission.burst = 0
+    response = client.get('/api/charts/INFY?interval=1d&period=2y')
+    assert response.status_code == 429
+    assert response.headers['Retry-After']
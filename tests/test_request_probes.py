@@ -0,0 +1,63 @@
+"""
+Memory attribution and profiling of requests whose work overlaps in io_pool threads.
+"""
+import threading
+import tracemalloc
+import pytest
+from stock_data.metrics import Metrics
+from stock_data.io_pool import IoPool
+from stock_data import profiler
+
+
+def peak(metrics, stage):
+    histogram = metrics.histograms[('stage_peak_memory_bytes', (('interval', ''), ('stage', stage)))]
+    return histogram.total
+
+
+@pytest.fixture
+def tracing():
+    tracemalloc.start()
+    yield
+    tracemalloc.stop()
+
+
+def test_overlapping_spans_keep_their_own_peaks(tracing):
+    metrics = Metrics()
+    pool = IoPool(size=2)
+    token = metrics.start_memory_tracking()
+    big_allocated, small_entered, big_exited = threading.Event(), threading.Event(), threading.Event()
+
+    def big():
+        with metrics.span('big'):
+            block = bytearray(8 * 1024 * 1024)
+            big_allocated.set()
+            small_entered.wait(5)
+            del block
+        big_exited.set()
+
+    def small():
+        big_allocated.wait(5)
+        # Opened after big's and closed after it: a shared stack would pop this frame for big
+        with metrics.span('small'):
+            small_entered.set()
+            big_exited.wait(5)
+
+    futures = [pool.submit(big), pool.submit(small)]
+    for future in futures:
+        future.result(10)
+    metrics.stop_memory_tracking(token, 'test')
+
+    assert peak(metrics, 'big') >= 8 * 1024 * 1024
+    assert peak(metrics, 'request:test') >= 8 * 1024 * 1024
+
+
+def test_profile_samples_io_pool_threads(tmp_path):
+    pool = IoPool(size=1)
+    session = profiler.ProfileSession('test', 'sampling', 0.002)
+    pool.submit(lambda: threading.Event().wait(0.2)).result()
+    session.finish(str(tmp_path))
+
+    collapsed = next(tmp_path.glob('*.collapsed')).read_text().splitlines()
+    roots = {line.split(';', 1)[0] for line in collapsed}
+    assert 'request' in roots
+    assert any(root.startswith('io') for root in roots)
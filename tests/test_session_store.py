@@ -0,0 +1,48 @@
+"""
+SQLite session store: encoding, TTL expiry and the chat history cap.
+"""
+import time
+import pytest
+import app as app_module
+from stock_data.session_store import SqliteSessionInterface, SESSION_COMPRESS_MIN_BYTES
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SqliteSessionInterface(str(tmp_path / 'sessions.sqlite3'), ttl=60, purge_interval=0)
+
+
+def test_round_trip_compresses_large_payloads(store):
+    small = {'name': 'a', 'history': [1, 2.5, None]}
+    large = {'history': [{'query': 'x' * 40}] * 100}
+    assert store.decode(store.encode(small)) == small
+    assert store.decode(store.encode(large)) == large
+    assert len(store.encode(large)) < SESSION_COMPRESS_MIN_BYTES < len(str(large))
+
+
+def test_expired_sessions_are_not_loaded_and_get_purged(store):
+    now = time.time()
+    store.store('live', {'name': 'a'}, now + 60)
+    store.store('stale', {'name': 'b'}, now - 1)
+    assert store.load('live') == ({'name': 'a'}, now + 60)
+    assert store.load('stale') == (None, None)
+    assert store.purge_expired(force=True) == 1
+    assert store.purge_expired(force=True) == 0
+
+
+def test_touch_extends_expiry(store):
+    store.store('sid', {'name': 'a'}, time.time() - 1)
+    store.touch('sid', time.time() + 60)
+    assert store.load('sid')[0] == {'name': 'a'}
+
+
+def test_chat_history_is_capped(monkeypatch):
+    monkeypatch.setattr(app_module, 'CHAT_HISTORY_MAX', 3)
+    client = app_module.app.test_client()
+    client.post('/user_info', data={'name': 'tester', 'email': 'tester@example.com'})
+    # Searching another symbol clears the history, so the same one is searched each time
+    for period in ('3mo', '6mo', '1y', '2y', '5y'):
+        assert client.post('/', data={'stock_code': 'TCS', 'period': period}).status_code == 200
+
+    history = client.get('/get_chat_history').get_json()['chat_history']
+    assert [entry['query'] for entry in history] == [f"Searched TCS period {period}" for period in ('1y', '2y', '5y')]
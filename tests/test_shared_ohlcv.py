@@ -0,0 +1,56 @@
+"""
+Round trip of frames through the shared-memory OHLCV dataset.
+"""
+import pickle
+import numpy as np
+import pandas as pd
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from stock_data.replay_data import synthetic_ohlcv
+from stock_data.shared_ohlcv import SharedOHLCV, COLUMNS
+
+
+def frames():
+    daily = synthetic_ohlcv('TCS', '1d', 300, seed=1)[COLUMNS]
+    weekly = synthetic_ohlcv('TCS', '1wk', 120, seed=2)[COLUMNS]
+    naive = daily.iloc[:50].tz_localize(None).drop(columns='Volume')
+    return [('TCS', '1d', daily), ('TCS', '1wk', weekly), ('NAIVE', '1d', naive)]
+
+
+def _close_sum(handle, symbol, interval):
+    with SharedOHLCV.attach(handle) as dataset:
+        return float(dataset.arrays(symbol, interval)['close'].sum())
+
+
+def test_frames_round_trip():
+    with SharedOHLCV.create(frames()) as dataset:
+        assert sorted(dataset.keys()) == [('NAIVE', '1d'), ('TCS', '1d'), ('TCS', '1wk')]
+        for symbol, interval, frame in frames():
+            restored = dataset.frame(symbol, interval)
+            expected = frame.reindex(columns=COLUMNS, fill_value=0.0).astype(np.float64)
+            pd.testing.assert_frame_equal(restored, expected, check_names=False, check_freq=False)
+            assert restored.index.tz == frame.index.tz
+
+
+def test_attached_views_are_read_only_and_shared():
+    with SharedOHLCV.create(frames()) as dataset:
+        handle = pickle.loads(pickle.dumps(dataset.handle()))
+        with SharedOHLCV.attach(handle) as attached:
+            view = attached.arrays('TCS', '1d')['close']
+            with pytest.raises(ValueError):
+                view[0] = 0.0
+            dataset.values[3, dataset.table[('TCS', '1d')][0]] = -1.0
+            assert view[0] == -1.0
+
+
+def test_child_process_reads_the_same_bars():
+    with SharedOHLCV.create(frames()) as dataset:
+        expected = float(frames()[1][2]['Close'].sum())
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('fork')) as pool:
+            assert pool.submit(_close_sum, dataset.handle(), 'TCS', '1wk').result() == pytest.approx(expected)
+
+
+def test_empty_dataset():
+    with SharedOHLCV.create([]) as dataset:
+        assert len(dataset) == 0 and dataset.total == 0
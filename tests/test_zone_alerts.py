@@ -0,0 +1,88 @@
+"""
+Zone-touch alerts: the per-symbol index, debouncing and SSE delivery.
+"""
+import json
+import threading
+from stock_data import zone_alerts
+from stock_data.zone_alerts import AlertEngine, SymbolZones, SSESink
+
+
+class ListSink:
+    def __init__(self):
+        self.alerts = []
+
+    def send(self, alert):
+        self.alerts.append(alert)
+
+
+def demand(proximal, distal, zone_id=1):
+    return {'zoneType': 'Demand', 'interval': '1d', 'zone_id': zone_id, 'proximal': proximal, 'distal': distal}
+
+
+def supply(proximal, distal, zone_id=1):
+    return {'zoneType': 'Supply', 'interval': '1d', 'zone_id': zone_id, 'proximal': proximal, 'distal': distal}
+
+
+def test_index_triggers_only_zones_the_price_reaches():
+    index = SymbolZones()
+    for zone in (demand(100, 95, 1), demand(90, 85, 2), supply(120, 125, 3), supply(130, 135, 4)):
+        index.add(zone)
+
+    assert [(kind, zone['zone_id']) for kind, zone in index.triggered(97)] == [('demand_entry', 1)]
+    assert index.triggered(97) == []
+    assert [(kind, zone['zone_id']) for kind, zone in index.triggered(125)] == [('target_reached', 3)]
+    assert len(index) == 2
+
+
+def test_registration_skips_zones_the_price_is_already_past():
+    engine = AlertEngine(sinks=[ListSink()])
+    engine.update_zones('TCS', [demand(100, 95), demand(110, 105)], [supply(98, 99), supply(120, 125)], price=102)
+    assert engine.stats()['zones'] == 2
+    assert engine.check('TCS', 102) == []
+
+
+def test_fired_zone_is_debounced_across_rescans(monkeypatch):
+    sink = ListSink()
+    engine = AlertEngine(sinks=[sink], debounce_seconds=900)
+    clock = [1000.0]
+    monkeypatch.setattr(zone_alerts.time, 'time', lambda: clock[0])
+
+    engine.update_zones('TCS', [demand(100, 95)])
+    assert len(engine.check('TCS', 97)) == 1
+    # A later scan registers the same zone again: muted within the window
+    engine.update_zones('TCS', [demand(100, 95)])
+    assert engine.check('TCS', 97) == []
+    assert engine.stats()['suppressed'] == 1
+
+    clock[0] += 901
+    engine.update_zones('TCS', [demand(100, 95)])
+    assert len(engine.check('TCS', 97)) == 1
+    assert [alert['kind'] for alert in sink.alerts] == ['demand_entry', 'demand_entry']
+
+
+def test_stream_touch_of_tracked_zone_alerts_once():
+    sink = ListSink()
+    engine = AlertEngine(sinks=[sink])
+    event = {'symbol': 'TCS', 'interval': '5m', 'zone_type': 'Supply', 'zone_id': 7,
+             'proximal': 120.0, 'distal': 125.0, 'fresh': True, 'bar_time': 't'}
+    engine.on_stream_event(dict(event, event='zone_created'))
+    engine.on_stream_event(dict(event, event='zone_touched', fresh=False))
+    engine.on_stream_event(dict(event, event='zone_touched', fresh=False))
+    assert [alert['kind'] for alert in sink.alerts] == ['target_reached']
+
+
+def test_sse_stream_filters_symbols_and_ends():
+    sink = SSESink(keepalive=0.05, lifetime=0.5, retry_ms=1234)
+    frames = []
+    reader = threading.Thread(target=lambda: frames.extend(sink.stream({'TCS'})))
+    reader.start()
+    while not sink.subscribers:
+        threading.Event().wait(0.01)
+    sink.send({'symbol': 'INFY', 'kind': 'demand_entry'})
+    sink.send({'symbol': 'TCS', 'kind': 'target_reached'})
+    reader.join(5)
+
+    assert not reader.is_alive() and not sink.subscribers
+    assert frames[0].startswith('retry: 1234\n')
+    alerts = [json.loads(frame.split('data: ', 1)[1]) for frame in frames if frame.startswith('event: alert')]
+    assert alerts == [{'symbol': 'TCS', 'kind': 'target_reached'}]
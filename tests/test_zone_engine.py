@@ -0,0 +1,39 @@
+"""
+The array-based zone engine against the legacy identifiers, and superset slices
+against direct scans of the same bars.
+"""
+import pytest
+from stock_data.period_cache import SupersetScan, OHLCV_COLUMNS
+from stock_data.replay_data import synthetic_ohlcv
+from stock_data.zone_engine_diff import ZoneEngineDiff
+from stock_data.zone_scanner import ZoneScanner
+
+INTERVALS = ('1d', '1wk', '1mo', '3mo')
+
+
+@pytest.mark.parametrize('interval', INTERVALS)
+def test_engines_agree_on_synthetic_frames(interval):
+    corpus = [(label, frame_interval, frame)
+              for label, frame_interval, frame in ZoneEngineDiff.default_corpus(synthetic=4, bars=400)
+              if frame_interval == interval]
+    summary = ZoneEngineDiff().run(corpus)
+    assert summary['frames'] == len(corpus)
+    assert summary['mismatches'] == [], ZoneEngineDiff.format_report(summary)
+
+
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('period', ['1mo', '6mo', '1y', '2y', 'ytd', 'max'])
+def test_superset_slice_matches_direct_scan(seed, period):
+    frame = synthetic_ohlcv(f"SLICE{seed}", '1d', 1300, seed=seed, volatility=0.01 + 0.01 * seed)[OHLCV_COLUMNS]
+    period_slice = SupersetScan(frame, '1d').slice(period)
+    bars = period_slice.frame
+
+    for zone_type in ('Demand', 'Supply'):
+        prefix = zone_type.lower()
+        direct = getattr(ZoneScanner, f"identify_{prefix}_zones")(bars, '1d')
+        sliced = period_slice.all_zones(zone_type)
+        assert ZoneEngineDiff.diff_zones(direct, sliced, f"SLICE{seed}:{period}", '1d', prefix) == []
+
+        is_fresh = getattr(ZoneScanner, f"is_fresh_{prefix}_zone")
+        expected = [zone for zone in direct if is_fresh(bars, zone)]
+        assert ZoneEngineDiff.diff_zones(expected, period_slice.fresh_zones(zone_type)) == []
@@ -0,0 +1,47 @@
+"""
+The streaming zone engine against a batch scan of the same bars.
+"""
+import pytest
+from stock_data.replay_data import synthetic_ohlcv
+from stock_data.zone_stream import StreamingZoneEngine, ReplayFeed, ZoneIndex, verify
+
+
+def stream(frame, interval, **feed):
+    engine = StreamingZoneEngine('SYN', interval)
+    events = []
+    engine.subscribe(events.append)
+    for bars in ReplayFeed(frame, **feed):
+        engine.append(bars)
+    engine.flush()
+    return engine, events
+
+
+@pytest.mark.parametrize('interval', ['5m', '1d'])
+@pytest.mark.parametrize('feed', [{'batch': 1}, {'batch': 7}, {'batch': 1, 'warmup': 300}])
+@pytest.mark.parametrize('seed', range(3))
+def test_stream_matches_batch_scan(interval, feed, seed):
+    frame = synthetic_ohlcv('SYN', interval, 800, seed=seed, volatility=0.005 + 0.01 * seed)
+    engine, _ = stream(frame, interval, **feed)
+    assert verify(engine, frame) == []
+
+
+def test_events_follow_zone_state():
+    frame = synthetic_ohlcv('SYN', '1d', 800, seed=4)
+    engine, events = stream(frame, '1d', batch=1)
+    zones = engine.active_zones()
+    assert zones
+
+    created = [event for event in events if event['event'] == 'zone_created']
+    touched = {(event['zone_type'], event['zone_id']) for event in events if event['event'] == 'zone_touched'}
+    assert len(created) == len(zones)
+    assert touched == {(zone['zoneType'], zone['zone_id']) for zone in zones if not zone['fresh']}
+
+
+def test_zone_index_returns_only_overlapping_zones():
+    index = ZoneIndex('Demand')
+    for proximal, distal in ((100, 95), (90, 85), (80, 75)):
+        index.add({'proximal': proximal, 'distal': distal})
+    touched = index.touched_by(low=88, high=120)
+    assert [zone['proximal'] for zone in touched] == [90, 100]
+    assert len(index) == 1
+    assert index.touched_by(low=81, high=120) == []
@@ -0,0 +1,79 @@
+"""
+Zones API: ETag revalidation, TTL hits and rebuilds on new data.
+"""
+import json
+import pytest
+import app as app_module
+from stock_data.zones_api import ZonesApi, ZonesApiError
+
+INTERVALS = ['1mo', '1wk', '1d']
+
+
+class CountingZonesApi(ZonesApi):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.builds = 0
+
+    def build(self, *args):
+        self.builds += 1
+        return super().build(*args)
+
+
+def test_current_etag_gets_no_body():
+    api = CountingZonesApi(ttl=60)
+    etag, body = api.get('TCS', INTERVALS, '1y', False)
+    payload = json.loads(body)
+    assert payload['intervals'] == INTERVALS and payload['zones']
+    assert api.get('TCS', INTERVALS, '1y', False, {etag}) == (etag, None)
+    assert api.get('TCS', INTERVALS, '1y', False, {'"other"'}) == (etag, body)
+    assert api.builds == 1
+
+
+def test_expired_entry_is_revalidated_without_rebuilding():
+    api = CountingZonesApi(ttl=0)
+    etag, body = api.get('TCS', INTERVALS, '1y', False)
+    assert api.get('TCS', INTERVALS, '1y', False, {etag}) == (etag, None)
+    assert api.get('TCS', INTERVALS, '1y', False) == (etag, body)
+    assert api.builds == 1
+
+
+def test_new_data_changes_the_etag(monkeypatch):
+    api = CountingZonesApi(ttl=0)
+    etag, _ = api.get('TCS', INTERVALS, '1y', False)
+    original = ZonesApi.data_version
+    monkeypatch.setattr(ZonesApi, 'data_version', staticmethod(lambda frame: original(frame) + ':new-bar'))
+    new_etag, body = api.get('TCS', INTERVALS, '1y', False, {etag})
+    assert new_etag != etag and body is not None
+    assert api.builds == 2
+
+
+def test_etag_covers_the_request():
+    api = ZonesApi(ttl=60)
+    etags = {api.get('TCS', INTERVALS, '1y', fresh)[0] for fresh in (False, True)}
+    etags.add(api.get('TCS', INTERVALS, '2y', False)[0])
+    etags.add(api.get('TCS', ['1d'], '1y', False)[0])
+    assert len(etags) == 4
+
+
+def test_admit_is_only_called_when_data_is_fetched():
+    api = ZonesApi(ttl=60)
+    calls = []
+    api.get('TCS', INTERVALS, '1y', False, admit=lambda: calls.append(1))
+    api.get('TCS', INTERVALS, '1y', False, admit=lambda: calls.append(1))
+    assert calls == [1]
+
+
+def test_unknown_interval_is_rejected():
+    with pytest.raises(ZonesApiError):
+        ZonesApi.parse_intervals('1d,2h')
+
+
+def test_http_conditional_request():
+    client = app_module.app.test_client()
+    client.post('/user_info', data={'name': 'tester', 'email': 'tester@example.com'})
+    response = client.get('/api/zones/ITC?intervals=1wk,1d&period=1y')
+    assert response.status_code == 200 and response.headers['ETag']
+    revalidated = client.get('/api/zones/ITC?intervals=1wk,1d&period=1y',
+                             headers={'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 304 and revalidated.headers['ETag'] == response.headers['ETag']
+    assert client.get('/api/zones/ITC?intervals=2h').status_code == 400